@@ -0,0 +1,78 @@
+"""
+Caché circular de velas cerradas.
+CandleGenerator la alimenta una vez por vela nueva (con los datos que ya
+descarga para detectarla) y la estrategia lee de ella, de modo que cada
+vela cuesta una sola llamada al terminal.
+"""
+
+from collections import deque
+from itertools import islice
+
+from bot_console.bar_source import BarSource
+
+
+class BarCache(BarSource):
+    def __init__(self, depth=50):
+        """
+        :param depth: número de velas cerradas que se conservan (patrones multi-vela)
+        """
+        self.depth = depth
+        self.bars = deque(maxlen=depth)
+        self.total = 0  # velas añadidas desde el inicio (no se reinicia al rotar)
+
+    def __len__(self):
+        return len(self.bars)
+
+    def push(self, bar):
+        """Añade una vela cerrada; ignora duplicados o velas más antiguas"""
+        if self.bars and bar.time <= self.bars[-1].time:
+            return False
+        self.bars.append(bar)
+        self.total += 1
+        return True
+
+    def extend(self, bars):
+        """Añade varias velas cerradas (más antigua primero)"""
+        for bar in bars:
+            self.push(bar)
+
+    def get_last_bar(self):
+        """Última vela cerrada (None si la caché está vacía)"""
+        return self.bars[-1] if self.bars else None
+
+    def get_last_bars(self, n):
+        n = min(n, len(self.bars))
+        return list(islice(self.bars, len(self.bars) - n, None))
+
+    def __iter__(self):
+        return BarCacheReader(self)
+
+
+class BarCacheReader:
+    """
+    Lector de la caché: la primera lectura devuelve la última vela cerrada
+    y las siguientes cada vela nueva en orden (como MT5BarSource).
+    Si no hay velas nuevas termina sin bloquear; se puede volver a leer
+    cuando el generador añada la siguiente.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.seen = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        cache = self.cache
+        if self.seen is None:
+            if not cache.bars:
+                raise StopIteration
+            self.seen = cache.total
+            return cache.bars[-1]
+
+        pending = min(cache.total - self.seen, len(cache.bars))
+        if pending <= 0:
+            raise StopIteration
+        self.seen = cache.total - pending + 1
+        return cache.bars[-pending]
@@ -0,0 +1,70 @@
+"""
+Rasgos de una vela cerrada.
+Cuerpo, mechas, rango, dirección y punto medio se calculan una sola vez
+cuando la vela cierra y los reutilizan todos los detectores de patrones
+y la estrategia, en lugar de recalcularlos en cada consulta.
+"""
+
+DIRECTION_LONG = 1
+DIRECTION_SHORT = -1
+DIRECTION_NONE = 0
+
+
+class BarFeatures:
+    """
+    Vela con sus rasgos precalculados. Admite bar['close'] y bar.close
+    como Bar, así sirve directamente a CandlePatterns1M.
+    """
+    __slots__ = ("time", "open", "high", "low", "close", "volume",
+                 "body", "upper_wick", "lower_wick", "range", "direction", "midpoint")
+
+    def __init__(self, time, open_, high, low, close, volume=0):
+        self.time = time
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+        top = max(open_, close)
+        bottom = min(open_, close)
+        self.body = abs(close - open_)
+        self.upper_wick = high - top
+        self.lower_wick = bottom - low
+        self.range = high - low
+        self.midpoint = (open_ + close) / 2
+        if close > open_:
+            self.direction = DIRECTION_LONG
+        elif close < open_:
+            self.direction = DIRECTION_SHORT
+        else:
+            self.direction = DIRECTION_NONE
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __repr__(self):
+        return (f"BarFeatures(time={self.time}, open={self.open}, high={self.high}, "
+                f"low={self.low}, close={self.close}, volume={self.volume})")
+
+    @classmethod
+    def from_bar(cls, bar):
+        """Rasgos de una vela (Bar, BarFeatures o dict con open/high/low/close)"""
+        if isinstance(bar, cls):
+            return bar
+        return cls(_get_field(bar, 'time'), bar['open'], bar['high'], bar['low'], bar['close'],
+                   _get_field(bar, 'volume', 0))
+
+
+def _get_field(bar, name, default=None):
+    try:
+        return bar[name]
+    except (KeyError, IndexError, ValueError, AttributeError):
+        return default
+
+
+def get_bar_features(bar):
+    """Rasgos de la vela, reutilizando los ya calculados si bar es un BarFeatures"""
+    if bar is None:
+        return None
+    return BarFeatures.from_bar(bar)
@@ -0,0 +1,250 @@
+"""
+Fuentes de velas (bar sources).
+Interfaz común de streaming para que la misma estrategia funcione
+en vivo (MT5) y offline (CSV, Parquet o memoria) sin construir
+una pandas Series por vela.
+"""
+
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from bot_console.terminal import terminal_lock
+
+try:
+    import MetaTrader5 as mt5
+except ImportError:  # Solo disponible en Windows; las fuentes offline no lo necesitan
+    mt5 = None
+
+BAR_FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+
+class Bar(namedtuple("Bar", BAR_FIELDS)):
+    """
+    Vela compacta: time (epoch en segundos), open, high, low, close, volume.
+    Admite acceso por atributo (bar.close) y por clave (bar['close'])
+    para ser compatible con CandlePatterns1M.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+
+class BarSource:
+    """
+    Interfaz común de las fuentes de velas.
+    Iterar una fuente devuelve las velas CERRADAS en orden cronológico.
+    """
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def get_last_bars(self, n):
+        """Devuelve las últimas n velas cerradas (más antigua primero)"""
+        raise NotImplementedError
+
+
+class MemoryBarSource(BarSource):
+    """Velas en memoria a partir de columnas NumPy"""
+    csv_format = "memory"
+
+    def __init__(self, time, open, high, low, close, volume=None):
+        self.time = read_only(time, np.int64)
+        self.open = read_only(open, np.float64)
+        self.high = read_only(high, np.float64)
+        self.low = read_only(low, np.float64)
+        self.close = read_only(close, np.float64)
+        self.volume = read_only(np.zeros(len(self.time)) if volume is None else volume, np.int64)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Crea la fuente desde un DataFrame (columnas Open/open, High/high...)"""
+        columns = {c.lower(): c for c in df.columns}
+        time_column = next((columns[c] for c in ("time", "datetime", "date") if c in columns), None)
+        times = parse_times(df[time_column]) if time_column is not None else np.arange(len(df), dtype=np.int64)
+        volume = df[columns["volume"]].to_numpy() if "volume" in columns else None
+        return cls(
+            times,
+            df[columns["open"]].to_numpy(),
+            df[columns["high"]].to_numpy(),
+            df[columns["low"]].to_numpy(),
+            df[columns["close"]].to_numpy(),
+            volume,
+        )
+
+    def __len__(self):
+        return len(self.time)
+
+    def __iter__(self):
+        # tolist() convierte a tipos Python de una vez: mucho más rápido que iloc por vela
+        return map(Bar._make, zip(
+            self.time.tolist(), self.open.tolist(), self.high.tolist(),
+            self.low.tolist(), self.close.tolist(), self.volume.tolist(),
+        ))
+
+    def get_bar(self, i):
+        """Devuelve la vela en la posición i"""
+        return Bar(int(self.time[i]), float(self.open[i]), float(self.high[i]),
+                   float(self.low[i]), float(self.close[i]), int(self.volume[i]))
+
+    def get_last_bars(self, n):
+        return [self.get_bar(i) for i in range(max(len(self) - n, 0), len(self))]
+
+
+class CSVBarSource(MemoryBarSource):
+    """Velas desde CSV - compatible con chart.csv y DATA_M1_2024.csv"""
+
+    def __init__(self, path):
+        df, self.csv_format = read_candles_csv(path)
+        source = MemoryBarSource.from_dataframe(df)
+        super().__init__(source.time, source.open, source.high, source.low, source.close, source.volume)
+
+
+class ParquetBarSource(MemoryBarSource):
+    """Velas desde Parquet (requiere pyarrow o fastparquet)"""
+    csv_format = "parquet"
+
+    def __init__(self, path):
+        source = MemoryBarSource.from_dataframe(pd.read_parquet(path))
+        super().__init__(source.time, source.open, source.high, source.low, source.close, source.volume)
+
+
+class CandleCursor:
+    """
+    Cursor único sobre una fuente de velas.
+    Permite que varios consumidores (p. ej. el generador que evalúa la vela
+    real y la estrategia que predice) compartan los mismos datos y la misma
+    posición, sin cargar el fichero dos veces ni sincronizar contadores.
+    """
+
+    def __init__(self, bar_source):
+        self.bar_source = bar_source
+        self.pos = 0
+        self._bars = iter(bar_source)
+        self._next_bar = next(self._bars, None)
+
+    def __len__(self):
+        return len(self.bar_source)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        bar = self._next_bar
+        if bar is None:
+            raise StopIteration
+        self._next_bar = next(self._bars, None)
+        self.pos += 1
+        return bar
+
+    def peek(self):
+        """Siguiente vela sin avanzar el cursor (None si no hay más)"""
+        return self._next_bar
+
+    def get_last_bars(self, n):
+        return self.bar_source.get_last_bars(n)
+
+
+class MT5BarSource(BarSource):
+    """Velas en vivo desde MetaTrader 5"""
+
+    def __init__(self, symbol, timeframe=None, poll_interval=1.0):
+        if mt5 is None:
+            raise RuntimeError("MetaTrader5 no está disponible en este sistema")
+        self.symbol = symbol
+        self.timeframe = mt5.TIMEFRAME_M1 if timeframe is None else timeframe
+        self.poll_interval = poll_interval
+
+    def get_rates(self, start_pos, count):
+        """Array estructurado de MT5 (start_pos=0 incluye la vela en curso)"""
+        with terminal_lock:
+            rates = mt5.copy_rates_from_pos(self.symbol, self.timeframe, start_pos, count)
+            if rates is None or len(rates) == 0:
+                raise RuntimeError(f"No se pudieron obtener velas para {self.symbol}: {mt5.last_error()}")
+        return rates
+
+    def get_server_time(self):
+        """Hora del servidor (epoch con milisegundos) según el último tick, o None"""
+        with terminal_lock:
+            tick = mt5.symbol_info_tick(self.symbol)
+        if tick is None:
+            return None
+        return tick.time_msc / 1000.0
+
+    def get_current_bar_time(self):
+        """Hora de apertura (epoch) de la vela en curso"""
+        return int(self.get_rates(0, 1)[-1]['time'])
+
+    def get_last_bars(self, n):
+        # start_pos=1 para saltar la vela actual (incompleta)
+        return [rate_to_bar(rate) for rate in self.get_rates(1, n)]
+
+    def __iter__(self):
+        """Espera y devuelve cada nueva vela cerrada, empezando por la última"""
+        last_time = None
+        while True:
+            bars = self.get_last_bars(1 if last_time is None else 10)
+            new_bars = [bar for bar in bars if last_time is None or bar.time > last_time]
+            if not new_bars:
+                time.sleep(self.poll_interval)
+                continue
+            for bar in new_bars:
+                last_time = bar.time
+                yield bar
+
+
+def read_only(values, dtype):
+    """Vista de solo lectura de una columna (sin copia si ya tiene el dtype)"""
+    column = np.asarray(values, dtype=dtype).view()
+    column.flags.writeable = False
+    return column
+
+
+def rate_to_bar(rate):
+    """Convierte una fila de copy_rates_* en Bar"""
+    return Bar(int(rate['time']), float(rate['open']), float(rate['high']),
+               float(rate['low']), float(rate['close']), int(rate['tick_volume']))
+
+
+def bar_time_to_datetime(epoch):
+    """Epoch de MT5 (hora del servidor) a datetime sin zona horaria"""
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+
+def read_candles_csv(path):
+    """Carga las velas desde CSV - compatible con chart.csv y DATA_M1_2024.csv"""
+    # Se mira la primera línea para parsear el fichero una sola vez
+    with open(path, encoding='utf-8') as f:
+        first_line = f.readline()
+
+    if ';' in first_line:
+        # DATA_M1_2024.csv (sin headers y con punto y coma)
+        candles = pd.read_csv(path, sep=';', header=None,
+                              names=['DateTime', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        return candles, 'data_m1'
+
+    # chart.csv (con headers y comas)
+    candles = pd.read_csv(path)
+    if 'Open' not in candles.columns or 'Close' not in candles.columns:
+        raise ValueError(f"Formato de CSV no reconocido: {path}")
+    return candles, 'chart'
+
+
+def parse_times(column):
+    """Convierte una columna de fechas a epoch en segundos (int64)"""
+    if pd.api.types.is_integer_dtype(column):
+        return column.to_numpy(dtype=np.int64)
+    # DATA_M1_*.csv usa "20240101 170000"; chart.csv usa "2025-11-14 18:59:00"
+    times = pd.to_datetime(column, format="%Y%m%d %H%M%S", errors="coerce")
+    if times.isna().any():
+        times = pd.to_datetime(column, errors="coerce")
+    if times.isna().any():
+        print("⚠️ Fechas no reconocidas en el CSV, se usa la posición de la vela")
+        return np.arange(len(column), dtype=np.int64)
+    return times.astype("datetime64[s]").to_numpy().astype(np.int64)
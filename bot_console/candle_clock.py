@@ -0,0 +1,94 @@
+"""
+Reloj de velas.
+En lugar de preguntar al terminal cada segundo si hay vela nueva, duerme
+hasta el siguiente cierre previsto (según la hora del servidor), confirma
+con una consulta ligera y emite el evento de vela nueva.
+"""
+
+import time
+from datetime import timezone
+
+
+class CandleClock:
+    def __init__(self, candle_generator, timeframe_seconds=60, wake_margin=0.005,
+                 poll_interval=0.005, max_poll_interval=1.0, resync_every=10):
+        """
+        :param candle_generator: CandleGenerator que confirma la vela nueva
+        :param timeframe_seconds: duración de la vela (60 en M1)
+        :param wake_margin: segundos que se despierta después del cierre previsto
+        :param poll_interval: espera inicial entre confirmaciones (se duplica hasta max_poll_interval)
+        :param resync_every: cada cuántas velas se vuelve a leer la hora del servidor
+        """
+        self.candle_generator = candle_generator
+        self.bar_source = candle_generator.bar_source
+        self.timeframe_seconds = timeframe_seconds
+        self.wake_margin = wake_margin
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.resync_every = resync_every
+        self.server_offset = None  # hora del servidor - hora local (segundos)
+        self.num_candles = 0
+        self.listeners = []
+
+    def on_new_candle(self, callback):
+        """Registra una función callback(candle_time) que se llama en cada vela nueva"""
+        self.listeners.append(callback)
+
+    def update_server_offset(self, server_time):
+        """
+        Ajusta la diferencia con el servidor. Una hora del servidor observada
+        nunca es posterior a la real, así que se queda con la cota más alta.
+        """
+        offset = server_time - time.time()
+        if self.server_offset is None or offset > self.server_offset:
+            self.server_offset = offset
+
+    def sync_server_time(self):
+        """Estima la diferencia con el servidor a partir del último tick"""
+        server_time = self.bar_source.get_server_time()
+        if server_time is not None:
+            self.update_server_offset(server_time)
+
+    def get_next_candle_time(self):
+        """Hora local (epoch) a la que se espera la apertura de la siguiente vela"""
+        offset = self.server_offset or 0.0
+        server_now = time.time() + offset
+        next_open = (server_now // self.timeframe_seconds + 1) * self.timeframe_seconds
+        return next_open - offset
+
+    def wait_for_new_candle(self):
+        """
+        Bloquea hasta que se abre una vela nueva.
+        :return: (True, candle_time) como CandleGenerator.check_new_candle
+        """
+        new_candle = False
+        if self.server_offset is None:
+            self.sync_server_time()
+            # Primera consulta: fija la vela actual y llena la caché del generador.
+            # Si el generador ya estaba en marcha puede traer una vela nueva: se emite sin esperar
+            new_candle, candle_time = self.candle_generator.check_new_candle()
+        elif self.num_candles % self.resync_every == 0:
+            # Se llama poco después del cambio de vela: el último tick es reciente
+            self.sync_server_time()
+
+        if not new_candle:
+            delay = self.get_next_candle_time() + self.wake_margin - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            poll_interval = self.poll_interval
+            while True:
+                new_candle, candle_time = self.candle_generator.check_new_candle()
+                if new_candle:
+                    break
+                # Sin ticks todavía en la vela nueva: se reintenta cada vez más espaciado
+                time.sleep(poll_interval)
+                poll_interval = min(poll_interval * 2, self.max_poll_interval)
+
+        # La apertura de la vela ya ha ocurrido en el servidor: sirve para afinar la diferencia
+        self.update_server_offset(candle_time.replace(tzinfo=timezone.utc).timestamp())
+        self.num_candles += 1
+
+        for callback in self.listeners:
+            callback(candle_time)
+        return True, candle_time
@@ -1,12 +1,51 @@
+import numpy as np
+
+from bot_console.bar_features import BarFeatures, DIRECTION_LONG, DIRECTION_SHORT
+
+# Patrones del escáner vectorizado (columnas de la matriz de scan_patterns)
+PATTERN_NAMES = (
+    "hanging_man",
+    "shooting_star",
+    "bearish_engulfing",
+    "evening_star",
+    "three_black_crows",
+    "dark_cloud_cover",
+    "three_white_soldiers",
+    "morning_star",
+    "piercing_pattern",
+    "bullish_engulfing",
+    "doji",
+    "spinning_top",
+    "swing_triple_top",     # 3 últimos máximos locales al mismo nivel
+    "swing_triple_bottom",  # 3 últimos mínimos locales al mismo nivel
+    "marubozu",
+    "tweezer_bottoms",
+    "tweezer_tops",
+    "hammer",
+    "inverted_hammer",
+)
+PATTERN_INDEX = {name: i for i, name in enumerate(PATTERN_NAMES)}
+
+
 
 
 
 class CandlePatterns1M:
+    """
+    Detectores de patrones. Aceptan velas tipo dict (c['close']), Bar o
+    BarFeatures; con BarFeatures reutilizan cuerpo, mechas y rango ya
+    calculados al cierre de la vela.
+    """
 
     # ===============================
     # HELPERS
     # ===============================
 
+    @staticmethod
+    def features(c):
+        """Rasgos precalculados de la vela (los calcula si c no es BarFeatures)"""
+        return c if isinstance(c, BarFeatures) else BarFeatures.from_bar(c)
+
     @staticmethod
     def body_size(c):
         return abs(c['close'] - c['open'])
@@ -35,34 +74,37 @@ class CandlePatterns1M:
     def ratio(x, y):
         return x / y if y != 0 else float('inf')
 
+    @staticmethod
+    def scan(open_, high, low, close):
+        """Todos los patrones sobre columnas completas (ver scan_patterns)"""
+        return scan_patterns(open_, high, low, close)
+
     # ===============================
     # 1) Hombre colgado (Hanging Man)
     # ===============================
     def is_hanging_man(self, c):
-        b = self.body_size(c)
-        lw = self.lower_wick(c)
-        uw = self.upper_wick(c)
-        rng = self.candle_range(c)
+        f = self.features(c)
+        b = f.body
 
-        if b == 0 or rng == 0:
+        if b == 0 or f.range == 0:
             return False
 
         return (
-            lw >= 2.5 * b and          # adaptado a 1M
-            uw <= 0.2 * b and          # mecha superior muy pequeña
-            self.ratio(max(c['open'], c['close']), c['low']) > 0.6
+            f.lower_wick >= 2.5 * b and          # adaptado a 1M
+            f.upper_wick <= 0.2 * b and          # mecha superior muy pequeña
+            self.ratio(max(f.open, f.close), f.low) > 0.6
         )
 
     # ===============================
     # 2) Estrella fugaz (Shooting Star)
     # ===============================
     def is_shooting_star(self, c):
-        b = self.body_size(c)
-        uw = self.upper_wick(c)
-        lw = self.lower_wick(c)
-        rng = self.candle_range(c)
+        f = self.features(c)
+        b = f.body
+        uw = f.upper_wick
+        lw = f.lower_wick
 
-        if b == 0 or rng == 0:
+        if b == 0 or f.range == 0:
             return False
 
         return (
@@ -75,135 +117,138 @@ class CandlePatterns1M:
     # 3) Envolvente bajista
     # ===============================
     def is_bearish_engulfing(self, prev, curr):
-        if not self.is_bullish(prev) or not self.is_bearish(curr):
+        prev, curr = self.features(prev), self.features(curr)
+        if prev.direction != DIRECTION_LONG or curr.direction != DIRECTION_SHORT:
             return False
 
         return (
-            curr['open'] >= prev['close'] and
-            curr['close'] <= prev['open'] and
-            self.body_size(curr) > self.body_size(prev)
+            curr.open >= prev.close and
+            curr.close <= prev.open and
+            curr.body > prev.body
         )
 
     # ===============================
     # 4) Estrella del atardecer (Evening Star)
     # ===============================
     def is_evening_star(self, c1, c2, c3):
-        if not self.is_bullish(c1):
+        c1, c2, c3 = self.features(c1), self.features(c2), self.features(c3)
+        if c1.direction != DIRECTION_LONG:
             return False
 
-        if self.body_size(c2) > 0.6 * self.body_size(c1):
+        if c2.body > 0.6 * c1.body:
             return False
 
-        if not self.is_bearish(c3):
+        if c3.direction != DIRECTION_SHORT:
             return False
 
-        return c3['close'] < (c1['open'] + c1['close']) / 2
+        return c3.close < c1.midpoint
 
     # ===============================
     # 5) Tres cuervos negros
     # ===============================
     def is_three_black_crows(self, c1, c2, c3):
-        if not (self.is_bearish(c1) and self.is_bearish(c2) and self.is_bearish(c3)):
+        c1, c2, c3 = self.features(c1), self.features(c2), self.features(c3)
+        if not (c1.direction == c2.direction == c3.direction == DIRECTION_SHORT):
             return False
 
-        if self.body_size(c1) < 0.4 * self.candle_range(c1):
+        if c1.body < 0.4 * c1.range:
             return False
 
         return (
-            c2['open'] < c1['open'] and
-            c2['close'] < c1['close'] and
-            c3['open'] < c2['open'] and
-            c3['close'] < c2['close']
+            c2.open < c1.open and
+            c2.close < c1.close and
+            c3.open < c2.open and
+            c3.close < c2.close
         )
 
     # ===============================
     # 6) Cubierta de nube oscura
     # ===============================
     def is_dark_cloud_cover(self, prev, curr):
-        if not self.is_bullish(prev) or not self.is_bearish(curr):
+        prev, curr = self.features(prev), self.features(curr)
+        if prev.direction != DIRECTION_LONG or curr.direction != DIRECTION_SHORT:
             return False
 
-        prev_mid = (prev['open'] + prev['close']) / 2
-        return curr['close'] < prev_mid
+        return curr.close < prev.midpoint
 
     # ===============================
     # 7) Tres soldados blancos
     # ===============================
     def is_three_white_soldiers(self, c1, c2, c3):
-        if not (self.is_bullish(c1) and self.is_bullish(c2) and self.is_bullish(c3)):
+        c1, c2, c3 = self.features(c1), self.features(c2), self.features(c3)
+        if not (c1.direction == c2.direction == c3.direction == DIRECTION_LONG):
             return False
 
-        if self.body_size(c1) < 0.4 * self.candle_range(c1):
+        if c1.body < 0.4 * c1.range:
             return False
 
         return (
-            c2['open'] > c1['open'] and c2['open'] < c1['close'] and
-            c3['open'] > c2['open'] and c3['open'] < c2['close']
+            c2.open > c1.open and c2.open < c1.close and
+            c3.open > c2.open and c3.open < c2.close
         )
 
     # ===============================
     # 8) Estrella de la mañana (Morning Star)
     # ===============================
     def is_morning_star(self, c1, c2, c3):
-        if not self.is_bearish(c1):
+        c1, c2, c3 = self.features(c1), self.features(c2), self.features(c3)
+        if c1.direction != DIRECTION_SHORT:
             return False
 
-        if self.body_size(c2) > 0.6 * self.body_size(c1):
+        if c2.body > 0.6 * c1.body:
             return False
 
-        if not self.is_bullish(c3):
+        if c3.direction != DIRECTION_LONG:
             return False
 
-        return c3['close'] > (c1['open'] + c1['close']) / 2
+        return c3.close > c1.midpoint
 
     # ===============================
     # 9) Penetrante
     # ===============================
     def is_piercing_pattern(self, prev, curr):
-        if not self.is_bearish(prev) or not self.is_bullish(curr):
+        prev, curr = self.features(prev), self.features(curr)
+        if prev.direction != DIRECTION_SHORT or curr.direction != DIRECTION_LONG:
             return False
 
-        prev_mid = (prev['open'] + prev['close']) / 2
-        return curr['close'] > prev_mid
+        return curr.close > prev.midpoint
 
     # ===============================
     # 10) Envolvente alcista
     # ===============================
     def is_bullish_engulfing(self, prev, curr):
-        if not self.is_bearish(prev) or not self.is_bullish(curr):
+        prev, curr = self.features(prev), self.features(curr)
+        if prev.direction != DIRECTION_SHORT or curr.direction != DIRECTION_LONG:
             return False
 
         return (
-            curr['open'] <= prev['close'] and
-            curr['close'] >= prev['open'] and
-            self.body_size(curr) > self.body_size(prev)
+            curr.open <= prev.close and
+            curr.close >= prev.open and
+            curr.body > prev.body
         )
 
     # ===============================
     # 11) Doji
     # ===============================
     def is_doji(self, c, tol_ratio=0.12):  # 1M → 12% mejor
-        rng = self.candle_range(c)
-        if rng == 0:
+        f = self.features(c)
+        if f.range == 0:
             return False
-        return self.body_size(c) <= tol_ratio * rng
+        return f.body <= tol_ratio * f.range
 
     # ===============================
     # 12) Trompos (Spinning Tops)
     # ===============================
     def is_spinning_top(self, c, tol_ratio=0.35):
-        rng = self.candle_range(c)
+        f = self.features(c)
+        rng = f.range
         if rng == 0:
             return False
 
-        b = self.body_size(c)
-        uw = self.upper_wick(c)
-        lw = self.lower_wick(c)
-
         return (
-            b <= tol_ratio * rng and
-            uw > 0.2 * rng and
-            lw > 0.2 * rng
+            f.body <= tol_ratio * rng and
+            f.upper_wick > 0.2 * rng and
+            f.lower_wick > 0.2 * rng
         )
 
     # ===============================
@@ -236,76 +281,185 @@ class CandlePatterns1M:
     # 15) Marubozu
     # ===============================
     def is_marubozu(self, c, wick_tol=0.001):
-        b = self.body_size(c)
-        rng = self.candle_range(c)
+        f = self.features(c)
+        rng = f.range
 
         if rng == 0:
             return False
 
         return (
-            self.upper_wick(c) <= wick_tol * rng and
-            self.lower_wick(c) <= wick_tol * rng and
-            b >= 0.98 * rng
+            f.upper_wick <= wick_tol * rng and
+            f.lower_wick <= wick_tol * rng and
+            f.body >= 0.98 * rng
         )
 
     # ===============================
     # 16) Pinzas inferiores (Tweezer Bottoms)
     # ===============================
     def is_tweezer_bottoms(self, prev, curr, tol=1e-5):
+        prev, curr = self.features(prev), self.features(curr)
         return (
-            abs(prev['low'] - curr['low']) <= tol and
-            self.is_bearish(prev) and 
-            self.is_bullish(curr)
+            abs(prev.low - curr.low) <= tol and
+            prev.direction == DIRECTION_SHORT and
+            curr.direction == DIRECTION_LONG
         )
 
     # ===============================
     # 17) Pinzas superiores (Tweezer Tops)
     # ===============================
     def is_tweezer_tops(self, prev, curr, tol=1e-5):
+        prev, curr = self.features(prev), self.features(curr)
         return (
-            abs(prev['high'] - curr['high']) <= tol and
-            self.is_bullish(prev) and
-            self.is_bearish(curr)
+            abs(prev.high - curr.high) <= tol and
+            prev.direction == DIRECTION_LONG and
+            curr.direction == DIRECTION_SHORT
         )
 
     # ===============================
     # 18) Hammer optimizado para 1M
     # ===============================
     def is_hammer(self, c):
-        body = self.body_size(c)
-        uw = self.upper_wick(c)
-        lw = self.lower_wick(c)
-        rng = self.candle_range(c)
+        f = self.features(c)
+        body = f.body
+        rng = f.range
 
         if body == 0 or rng == 0:
             return False
 
-        if lw < 2.5 * body:
+        if f.lower_wick < 2.5 * body:
             return False
 
-        if uw > 0.2 * body:
+        if f.upper_wick > 0.2 * body:
             return False
 
-        body_top_position = c['high'] - max(c['open'], c['close'])
-        return body_top_position <= rng * 0.15
+        # Distancia del máximo a la parte alta del cuerpo (= mecha superior)
+        return f.upper_wick <= rng * 0.15
 
     # ===============================
     # 19) Inverted Hammer
     # ===============================
     def is_inverted_hammer(self, c):
-        body = self.body_size(c)
-        uw = self.upper_wick(c)
-        lw = self.lower_wick(c)
-        rng = self.candle_range(c)
+        f = self.features(c)
+        body = f.body
+        rng = f.range
 
         if body == 0 or rng == 0:
             return False
 
-        if uw < 2.5 * body:
+        if f.upper_wick < 2.5 * body:
             return False
 
-        if lw > 0.2 * body:
+        if f.lower_wick > 0.2 * body:
             return False
 
-        body_bottom_position = min(c['open'], c['close']) - c['low']
-        return body_bottom_position <= rng * 0.15
+        # Distancia del mínimo a la parte baja del cuerpo (= mecha inferior)
+        return f.lower_wick <= rng * 0.15
+
+
+# ===============================
+# ESCÁNER VECTORIZADO
+# ===============================
+
+def shift(values, n, fill):
+    """values desplazado n posiciones: la posición i tiene el valor de i-n"""
+    shifted = np.empty_like(values)
+    shifted[:n] = fill
+    shifted[n:] = values[:len(values) - n]
+    return shifted
+
+
+def scan_patterns(open_, high, low, close):
+    """
+    Evalúa los 19 patrones de CandlePatterns1M sobre todas las velas a la vez.
+    Cuerpo, mechas y rango se calculan una sola vez para todas las columnas.
+    Los patrones de 2 y 3 velas se evalúan con la vela i como la última
+    (curr / c3); las primeras posiciones sin velas previas quedan a False.
+    Las triples formaciones usan los 3 últimos máximos / mínimos locales y se
+    marcan en la vela i que confirma el tercero (como PatternStream).
+
+    :return: matriz booleana (velas x patrones), columnas en el orden de PATTERN_NAMES
+    """
+    o = np.asarray(open_, dtype=np.float64)
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+    n = len(c)
+
+    top = np.maximum(o, c)
+    bottom = np.minimum(o, c)
+    body = np.abs(c - o)
+    uw = h - top
+    lw = bottom - l
+    rng = h - l
+    bull = c > o
+    bear = c < o
+    mid = (o + c) / 2
+    has_body = (body != 0) & (rng != 0)
+    has_range = rng != 0
+
+    # Vela anterior (1) y la de dos posiciones antes (2); sin vela previa
+    # valen NaN / False y los patrones que las usan quedan a False
+    o1, o2 = shift(o, 1, np.nan), shift(o, 2, np.nan)
+    c1, c2 = shift(c, 1, np.nan), shift(c, 2, np.nan)
+    h1, h2 = shift(h, 1, np.nan), shift(h, 2, np.nan)
+    l1, l2 = shift(l, 1, np.nan), shift(l, 2, np.nan)
+    body1, body2 = shift(body, 1, np.nan), shift(body, 2, np.nan)
+    rng2 = shift(rng, 2, np.nan)
+    mid1, mid2 = shift(mid, 1, np.nan), shift(mid, 2, np.nan)
+    bull1, bull2 = shift(bull, 1, False), shift(bull, 2, False)
+    bear1, bear2 = shift(bear, 1, False), shift(bear, 2, False)
+
+    # ratio(max(open, close), low): infinito si low es 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        top_low_ratio = np.where(l != 0, top / np.where(l != 0, l, 1.0), np.inf)
+
+    # Máximo (mínimo) local en la vela anterior: supera a sus dos vecinas y se
+    # confirma al cerrar la vela i
+    peaks = np.flatnonzero((h1 > h2) & (h1 > h))
+    valleys = np.flatnonzero((l1 < l2) & (l1 < l))
+
+    matrix = np.empty((n, len(PATTERN_NAMES)), dtype=bool)
+    matrix[:, 0] = has_body & (lw >= 2.5 * body) & (uw <= 0.2 * body) & (top_low_ratio > 0.6)
+    matrix[:, 1] = has_body & (uw >= 2.5 * body) & (lw <= 0.2 * body) & (uw > lw)
+    matrix[:, 2] = bull1 & bear & (o >= c1) & (c <= o1) & (body > body1)
+    matrix[:, 3] = bull2 & ~(body1 > 0.6 * body2) & bear & (c < mid2)
+    matrix[:, 4] = (bear2 & bear1 & bear & ~(body2 < 0.4 * rng2) &
+                    (o1 < o2) & (c1 < c2) & (o < o1) & (c < c1))
+    matrix[:, 5] = bull1 & bear & (c < mid1)
+    matrix[:, 6] = (bull2 & bull1 & bull & ~(body2 < 0.4 * rng2) &
+                    (o1 > o2) & (o1 < c2) & (o > o1) & (o < c1))
+    matrix[:, 7] = bear2 & ~(body1 > 0.6 * body2) & bull & (c > mid2)
+    matrix[:, 8] = bear1 & bull & (c > mid1)
+    matrix[:, 9] = bear1 & bull & (o <= c1) & (c >= o1) & (body > body1)
+    matrix[:, 10] = has_range & (body <= 0.12 * rng)
+    matrix[:, 11] = has_range & (body <= 0.35 * rng) & (uw > 0.2 * rng) & (lw > 0.2 * rng)
+    matrix[:, 12] = triple_level(h1, peaks, n)
+    matrix[:, 13] = triple_level(l1, valleys, n)
+    matrix[:, 14] = has_range & (uw <= 0.001 * rng) & (lw <= 0.001 * rng) & (body >= 0.98 * rng)
+    matrix[:, 15] = (np.abs(l1 - l) <= 1e-5) & bear1 & bull
+    matrix[:, 16] = (np.abs(h1 - h) <= 1e-5) & bull1 & bear
+    matrix[:, 17] = has_body & (lw >= 2.5 * body) & (uw <= 0.2 * body) & (uw <= rng * 0.15)
+    matrix[:, 18] = has_body & (uw >= 2.5 * body) & (lw <= 0.2 * body) & (lw <= rng * 0.15)
+    return matrix
+
+
+def triple_level(values, confirmed, n):
+    """
+    Triples formaciones: en cada vela que confirma un extremo, si los 3 últimos
+    (values[confirmed]) quedan dentro del 0,2% de su media
+    """
+    result = np.zeros(n, dtype=bool)
+    if len(confirmed) < 3:
+        return result
+    levels = values[confirmed]
+    first, second, third = levels[:-2], levels[1:-1], levels[2:]
+    avg = (first + second + third) / 3
+    dev = np.maximum(np.maximum(np.abs(first - avg), np.abs(second - avg)), np.abs(third - avg))
+    result[confirmed[2:]] = dev <= 0.002 * avg
+    return result
+
+
+def count_patterns(matrix):
+    """Número de velas en que aparece cada patrón: {nombre: total}"""
+    totals = matrix.sum(axis=0)
+    return {name: int(total) for name, total in zip(PATTERN_NAMES, totals)}
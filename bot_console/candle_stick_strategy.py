@@ -6,10 +6,12 @@ Solo devuelve la señal (LONG / SHORT / None),
 no ejecuta operaciones.
 """
 
-import MetaTrader5 as mt5
-import pandas as pd
-from enum import IntEnum
 from bot_console.resumes import ResumeJsonL
+from bot_console.logger import Logger, DEBUG, INFO
+from bot_console.bar_features import get_bar_features, DIRECTION_LONG, DIRECTION_SHORT
+from bot_console.pattern_stats import load_wick_stats
+from bot_console.bar_source import MT5BarSource
+from bot_console.timeframe import get_mt5_timeframe
 from datetime import datetime
 
 SIGNAL_NONE = "NEUTRAL"
@@ -20,57 +22,106 @@ TREND_UP = "UP"
 TREND_DOWN = "DOWN"
 TREND_NEUTRAL = "NEUTRAL"
 
+# ------------------------------------------------------------
+# ESTADÍSTICA REAL (clave: (has_upper_wick, has_lower_wick))
+# Tabla por defecto; con CANDLE_STATS se usa la de un fichero
+# generado con offline/stats_miner.py.
+# ------------------------------------------------------------
+ULTRACONSERV_STATS = {
+    (True, True):   {"LONG": 989, "SHORT": 948, "NEUTRAL": 196, "id": "P11"},
+    (True, False):  {"LONG": 471, "SHORT": 367, "NEUTRAL": 71,  "id": "P10"}, # LONG = 52% (válido)
+    (False, True):  {"LONG": 315, "SHORT": 489, "NEUTRAL": 63,  "id": "P01"}, # SHORT = 56% (válido)
+    (False, False): {"LONG": 181, "SHORT": 225, "NEUTRAL": 75,  "id": "P00"}, # Muy poco fiable
+}
+
+# Umbrales de los ULTRA FILTROS
+MIN_BODY = 0.00004
+MIN_STAT_CONF = 0.55
+
 resume_logger = ResumeJsonL(f"candle_stick_strategy_{datetime.now().strftime('%Y%m%d_%H%M%S')}", blockMessages=True)
 
 class CandleStickStrategy:
-    def __init__(self, symbol: str):
+    def __init__(self, symbol: str, bar_source=None, verbose=None, stats=None, timeframe=None,
+                 context=None):
         """
         :param symbol: símbolo, ej. "EURUSD"
+        :param bar_source: fuente de velas (BarSource); por defecto MT5 en vivo
+        :param timeframe: timeframe de las velas de MT5 cuando no se pasa bar_source ("1", "M5", "H1"...)
+        :param context: TimeframeContext con los timeframes superiores cuya tendencia debe acompañar
+        :param stats: tabla de mechas; por defecto la de CANDLE_STATS o ULTRACONSERV_STATS
+        :param verbose: True muestra los datos de cada vela (DEBUG), False solo INFO;
+                        por defecto el nivel de LOG_LEVEL
         """
         self.symbol = symbol
-        self.candles = None
+        if bar_source is None:
+            bar_source = MT5BarSource(symbol, timeframe=get_mt5_timeframe(timeframe))
+        self.bar_source = bar_source
+        self.bars = iter(self.bar_source)
+        self.verbose = verbose
+        self.stats = stats if stats is not None else load_wick_stats(default=ULTRACONSERV_STATS)
+        self.logger = Logger(level=None if verbose is None else DEBUG if verbose else INFO)
+        self.candles = [None, None]  # [penúltima, última] como BarFeatures
+        self.context = context
+
+    def get_next_bar(self):
+        """
+        Obtiene la siguiente vela cerrada de la fuente (None si no hay más)
+        """
+        return next(self.bars, None)
+
+    def prime_candles(self, bar):
+        """
+        En vivo la primera vela leída es la última del histórico ya cargado:
+        se toma la anterior de la fuente para no perder la primera señal (INIT).
+        En offline la primera vela del fichero no coincide con la última de la
+        fuente y se mantiene el INIT.
+        """
+        history = self.bar_source.get_last_bars(2)
+        if len(history) == 2 and history[-1].time == bar.time:
+            self.candles = [None, get_bar_features(history[0])]
+
+    def update_candles(self, bar):
+        """
+        Desplaza la ventana de las dos últimas velas cerradas. Los rasgos
+        (cuerpo, mechas...) se calculan una vez al cerrar la vela y la
+        penúltima reutiliza los de la vela anterior.
+        """
+        self.candles = [self.candles[1], get_bar_features(bar)]
+        # El contexto superior se construye con las mismas velas (en vivo ya la ha añadido CandleGenerator)
+        if self.context is not None:
+            self.context.push(bar)
 
     def get_last_two_candles(self):
         """
         Obtiene las últimas dos velas cerradas
         """
-        # start_pos=1 para saltar la vela actual (incompleta) y obtener las 2 últimas cerradas
-        self.candles = mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_M1, 1, 2)
-        if self.candles is None:
-            raise RuntimeError(f"No se pudieron descargar velas M1 para {self.symbol}: {mt5.last_error()}")
         return self.candles
     
     def get_last_candle(self):
         """
         Obtiene la última vela cerrada
         """
-        if (self.candles is None):
-            self.candles = self.get_last_two_candles()
         return self.candles[1]
     
     def get_penultimate_candle(self):
         """
         Obtiene la penúltima vela cerrada
         """
-        if (self.candles is None):
-            self.candles = self.get_last_two_candles()
         return self.candles[0]
 
     def get_signal_from_candle(self, candle):
         """
         Obtiene la señal de la vela
         """
-        close_price = candle['close']
-        open_price = candle['open']
+        if candle is None:
+            return SIGNAL_NONE
 
-        if close_price > open_price:
-            signal = SIGNAL_LONG
-        elif close_price < open_price:
-            signal = SIGNAL_SHORT
-        else:
-            signal = SIGNAL_NONE
-
-        return signal
+        direction = get_bar_features(candle).direction
+        if direction == DIRECTION_LONG:
+            return SIGNAL_LONG
+        if direction == DIRECTION_SHORT:
+            return SIGNAL_SHORT
+        return SIGNAL_NONE
 
     def get_trend(self):
         """
@@ -79,29 +130,41 @@ class CandleStickStrategy:
         last_candle = self.get_last_candle()
         penultimate_candle = self.get_penultimate_candle()
 
-        if last_candle['close'] > penultimate_candle['close']:
+        if last_candle.close > penultimate_candle.close:
             trend = TREND_UP
-        elif last_candle['close'] < penultimate_candle['close']:
+        elif last_candle.close < penultimate_candle.close:
             trend = TREND_DOWN
         else:
             trend = TREND_NEUTRAL
 
         return trend
 
+    def get_context_contra(self, stat_signal):
+        """
+        True si la tendencia de algún timeframe superior del contexto no
+        acompaña a la señal (sin contexto nunca bloquea)
+        """
+        if not self.context:
+            return False
+        direction = DIRECTION_LONG if stat_signal == SIGNAL_LONG else DIRECTION_SHORT
+        return any(trend != direction for trend in self.context.get_trends().values())
+
     def get_sticks_from_candle(self, candle, last: bool = False):
         """
         Obtiene las mechas y datos de la última vela cerrada
         """
-        open_price = candle['open']
-        high_price = candle['high']
-        low_price = candle['low']
-        close_price = candle['close']
+        features = get_bar_features(candle)
+        open_price = features.open
+        high_price = features.high
+        low_price = features.low
+        close_price = features.close
 
-        candle_top = max(open_price, close_price)
-        candle_bottom = min(open_price, close_price)
+        if open_price == 0 or high_price == 0 or low_price == 0 or close_price == 0:
+            self.logger.error("Error: Missing price data in candle: %s", candle)
+            return None, None, False, False, 0, 0, 0, 0, 0, SIGNAL_NONE
 
-        upper_wick = high_price - candle_top
-        lower_wick = candle_bottom - low_price
+        upper_wick = features.upper_wick
+        lower_wick = features.lower_wick
 
         # if abs(upper_wick - 0.00001) < 1e-6: upper_wick = 0
         # if abs(lower_wick - 0.00001) < 1e-6: lower_wick = 0
@@ -110,39 +173,53 @@ class CandleStickStrategy:
         has_lower_wick = lower_wick > 0
 
         # --- Señal de la vela
-        signal = self.get_signal_from_candle(candle)
+        signal = self.get_signal_from_candle(features)
 
         # --- Cuerpo de la vela
-        body = abs(close_price - open_price)
-
-        resume_logger.log({"message": f"Última vela:" if last else "Penúltima vela:", "type": "info"})
-        resume_logger.log({"message": f"🕯 Precio de cierre: Close: {close_price:.5f}", "type": "info"})
-        resume_logger.log({"message": f"⬆ Mecha superior: {upper_wick:.5f} ({'Sí' if has_upper_wick else 'No'})", "type": "info"})
-        resume_logger.log({"message": f"⬇ Mecha inferior: {lower_wick:.5f} ({'Sí' if has_lower_wick else 'No'})", "type": "info"})
-        resume_logger.log({"message": f"has_upper_wick: {has_upper_wick}", "type": "info"})
-        resume_logger.log({"message": f"has_lower_wick: {has_lower_wick}", "type": "info"})
-        resume_logger.log({"message": f"low_price: {low_price}", "type": "info"})
-        resume_logger.log({"message": f"high_price: {high_price}", "type": "info"})
-        resume_logger.log({"message": f"close_price: {close_price}", "type": "info"})
-        resume_logger.log({"message": f"open_price: {open_price}", "type": "info"})
-        resume_logger.log({"message": f"body: {body}", "type": "info"})
-        resume_logger.log({"message": f"signal: {signal}", "type": "info"})
-
-        print("Última vela:" if last else "Penúltima vela:")
-        print(f"🕯 Precio de cierre: Close: {close_price:.5f}")
-        print(f"⬆ Mecha superior: {upper_wick:.5f} ({'Sí' if has_upper_wick else 'No'})")
-        print(f"⬇ Mecha inferior: {lower_wick:.5f} ({'Sí' if has_lower_wick else 'No'})")
-        print(f"has_upper_wick: {has_upper_wick}")
-        print(f"has_lower_wick: {has_lower_wick}")
-        print(f"low_price: {low_price}")
-        print(f"high_price: {high_price}")
-        print(f"close_price: {close_price}")
-        print(f"open_price: {open_price}")
-        print(f"body: {body}")
-        print(f"signal: {signal}")
+        body = features.body
+
+        # Diagnóstico por vela: solo se forma si algún destino tiene DEBUG activo
+        if self.logger.is_enabled(DEBUG) or resume_logger.is_enabled(DEBUG):
+            self.log_candle(last, upper_wick, lower_wick, has_upper_wick, has_lower_wick,
+                            low_price, high_price, close_price, open_price, body, signal)
 
         return upper_wick, lower_wick, has_upper_wick, has_lower_wick, low_price, high_price, close_price, open_price, body, signal
 
+    def log_candle(self, last, upper_wick, lower_wick, has_upper_wick, has_lower_wick,
+                   low_price, high_price, close_price, open_price, body, signal):
+        """
+        Muestra los datos de la vela en consola y en el JSONL (nivel DEBUG)
+        """
+        lines = (
+            ("Última vela:" if last else "Penúltima vela:", ()),
+            ("🕯 Precio de cierre: Close: %.5f", (close_price,)),
+            ("⬆ Mecha superior: %.5f (%s)", (upper_wick, 'Sí' if has_upper_wick else 'No')),
+            ("⬇ Mecha inferior: %.5f (%s)", (lower_wick, 'Sí' if has_lower_wick else 'No')),
+            ("has_upper_wick: %s", (has_upper_wick,)),
+            ("has_lower_wick: %s", (has_lower_wick,)),
+            ("low_price: %s", (low_price,)),
+            ("high_price: %s", (high_price,)),
+            ("close_price: %s", (close_price,)),
+            ("open_price: %s", (open_price,)),
+            ("body: %s", (body,)),
+            ("signal: %s", (signal,)),
+        )
+        for message, args in lines:
+            self.logger.debug(message, *args)
+            resume_logger.debug(message, *args)
+
+    def get_signal_for_latest_candle(self):
+        """
+        Procesa todas las velas pendientes de la fuente (si han cerrado varias
+        desde la última consulta) y devuelve la señal de la más reciente.
+        """
+        signal = self.get_signal_for_new_candle()
+        while True:
+            next_signal = self.get_signal_for_new_candle()
+            if next_signal[0] == "END":
+                return signal
+            signal = next_signal
+
     def get_signal_for_new_candle(self):
         """
         MODELO ULTRA CONSERVADOR
@@ -152,15 +229,15 @@ class CandleStickStrategy:
         """
 
         # 1. FIN DATOS
-        if self.pos_current_candle >= self.num_candles:
+        bar = self.get_next_bar()
+        if bar is None:
             return "END", "END"
 
+        if self.candles[1] is None:
+            self.prime_candles(bar)
+        self.update_candles(bar)
         last = self.get_last_candle()
-        if last is None:
-            return "ERROR", "ERROR"
-
         prev = self.get_penultimate_candle()
-        self.pos_current_candle += 1
 
         if prev is None:
             return SIGNAL_NONE, "INIT"
@@ -177,15 +254,8 @@ class CandleStickStrategy:
         # ------------------------------------------------------------
         # ESTADÍSTICA REAL
         # ------------------------------------------------------------
-        stats = {
-            (True, True):   {"LONG": 989, "SHORT": 948, "NEUTRAL": 196, "id": "P11"},
-            (True, False):  {"LONG": 471, "SHORT": 367, "NEUTRAL": 71,  "id": "P10"}, # LONG = 52% (válido)
-            (False, True):  {"LONG": 315, "SHORT": 489, "NEUTRAL": 63,  "id": "P01"}, # SHORT = 56% (válido)
-            (False, False): {"LONG": 181, "SHORT": 225, "NEUTRAL": 75,  "id": "P00"}, # Muy poco fiable
-        }
-
         key = (has_up, has_low)
-        s = stats[key]
+        s = self.stats[key]
         total = s["LONG"] + s["SHORT"] + s["NEUTRAL"]
         pattern_id = s["id"]
 
@@ -203,11 +273,11 @@ class CandleStickStrategy:
             return SIGNAL_NONE, f"{pattern_id}-BLOCK-NOWICKS"
 
         # ❌ Bloquear cuerpos pequeños (indecisión)
-        if body < 0.00004:
+        if body < MIN_BODY:
             return SIGNAL_NONE, f"{pattern_id}-BLOCK-SMALLBODY"
 
         # ❌ Requiere estadística fuerte
-        if stat_conf < 0.55:
+        if stat_conf < MIN_STAT_CONF:
             return SIGNAL_NONE, f"{pattern_id}-BLOCK-LOWSTAT"
 
         # ❌ Señal previa debe acompañar
@@ -222,6 +292,10 @@ class CandleStickStrategy:
         if stat_signal == "SHORT" and trend != TREND_DOWN:
             return SIGNAL_NONE, f"{pattern_id}-BLOCK-TREND"
 
+        # ❌ Tendencia de los timeframes superiores (M5, M15...) debe acompañar
+        if stat_signal in (SIGNAL_LONG, SIGNAL_SHORT) and self.get_context_contra(stat_signal):
+            return SIGNAL_NONE, f"{pattern_id}-BLOCK-HTFTREND"
+
         # ❌ Velas contradictorias
         if stat_signal == "LONG" and close < open_:
             return SIGNAL_NONE, f"{pattern_id}-BLOCK-BEARCANDLE"
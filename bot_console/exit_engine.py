@@ -0,0 +1,220 @@
+"""
+Motor de salidas por tick.
+Evalúa SL / TP / trailing (caída del 10% desde el máximo) / tiempo en cada
+tick que llega, con el tamaño de contrato real del símbolo y guardando el
+beneficio máximo de cada posición en O(1).
+Es independiente de MetaTrader 5: el mismo motor sirve en vivo (ticks de
+copy_ticks_from / symbol_info_tick) y offline (ticks grabados).
+"""
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from bot_console.terminal import terminal_lock
+
+try:
+    import MetaTrader5 as mt5
+except ImportError:  # Solo disponible en Windows; la reproducción offline no lo necesita
+    mt5 = None
+
+EXIT_SL = "SL"
+EXIT_TP = "TP"
+EXIT_TRAILING = "TRAILING"
+EXIT_TIME = "TIME"
+
+EXIT_MESSAGES = {
+    EXIT_SL: "🔻 Posición cerrada por stop loss.",
+    EXIT_TP: "✅ Posición cerrada por take profit.",
+    EXIT_TRAILING: "🔻 Posición cerrada por pérdida del 10% del máximo.",
+    EXIT_TIME: "🔻 Posición cerrada por tiempo.",
+}
+
+
+class PositionState:
+    """Estado de una posición dentro del motor (una por orden)"""
+    __slots__ = ("order", "direction", "price_open", "multiplier", "sl", "tp",
+                 "open_time", "close_time", "profit", "max_profit", "positive_ticks")
+
+    def __init__(self, order, contract_size, open_time=None):
+        self.order = order
+        self.direction = 1 if order.type == "long" else -1
+        self.price_open = order.price_open
+        self.multiplier = contract_size * order.volume
+        self.sl = order.sl
+        self.tp = order.tp
+        self.open_time = open_time  # hora del servidor; si es None se toma del primer tick
+        self.close_time = None
+        self.profit = 0.0
+        self.max_profit = 0.0
+        self.positive_ticks = 0
+
+
+class ExitEngine:
+    def __init__(self, trailing_drop=0.10, min_trailing_ticks=4, max_seconds=49):
+        """
+        :param trailing_drop: fracción del beneficio máximo que se permite perder
+        :param min_trailing_ticks: ticks con beneficio antes de activar el trailing
+        :param max_seconds: cierre por tiempo (segundos desde la apertura)
+        """
+        self.trailing_drop = trailing_drop
+        self.min_trailing_ticks = min_trailing_ticks
+        self.max_seconds = max_seconds
+        self.positions = {}  # symbol -> {id(order): PositionState}
+
+    def add(self, order, contract_size, open_time=None):
+        """Empieza a vigilar una orden abierta"""
+        state = PositionState(order, contract_size, open_time)
+        self.positions.setdefault(order.symbol, {})[id(order)] = state
+        return state
+
+    def remove(self, order):
+        """Deja de vigilar una orden"""
+        states = self.positions.get(order.symbol)
+        if states is not None:
+            states.pop(id(order), None)
+            if not states:
+                del self.positions[order.symbol]
+
+    def has_positions(self, symbol=None):
+        if symbol is None:
+            return bool(self.positions)
+        return bool(self.positions.get(symbol))
+
+    def get_symbols(self):
+        return list(self.positions)
+
+    def on_tick(self, symbol, tick_time, bid, ask):
+        """
+        Procesa un tick y devuelve [(orden, motivo)] de las posiciones que
+        deben cerrarse. Las posiciones devueltas dejan de vigilarse.
+        """
+        states = self.positions.get(symbol)
+        if not states:
+            return []
+
+        exits = []
+        for state in states.values():
+            reason = self.check_state(state, tick_time, bid, ask)
+            if reason is not None:
+                state.close_time = tick_time
+                exits.append((state.order, reason))
+
+        for order, _ in exits:
+            self.remove(order)
+        return exits
+
+    def on_clock(self, symbol, server_time):
+        """Cierre por tiempo cuando no llegan ticks"""
+        states = self.positions.get(symbol)
+        if not states:
+            return []
+        exits = [(state.order, EXIT_TIME) for state in states.values()
+                 if state.open_time is not None and server_time - state.open_time >= self.max_seconds]
+        for order, _ in exits:
+            self.remove(order)
+        return exits
+
+    def check_state(self, state, tick_time, bid, ask):
+        """Regla de salida de una posición con un tick"""
+        if state.open_time is None:
+            state.open_time = tick_time
+
+        # Los largos se cierran al bid y los cortos al ask; el beneficio se
+        # actualiza antes de mirar SL / TP para cerrar con el del tick de salida
+        price = bid if state.direction > 0 else ask
+        profit = (price - state.price_open) * state.direction * state.multiplier
+        state.profit = profit
+        state.order.profit = profit
+
+        if state.direction > 0:
+            if state.sl and price <= state.sl:
+                return EXIT_SL
+            if state.tp and price >= state.tp:
+                return EXIT_TP
+        else:
+            if state.sl and price >= state.sl:
+                return EXIT_SL
+            if state.tp and price <= state.tp:
+                return EXIT_TP
+
+        if profit > 0:
+            state.positive_ticks += 1
+            if profit > state.max_profit:
+                state.max_profit = profit
+        if (state.positive_ticks >= self.min_trailing_ticks and
+                profit < state.max_profit * (1 - self.trailing_drop)):
+            return EXIT_TRAILING
+
+        if tick_time - state.open_time >= self.max_seconds:
+            return EXIT_TIME
+        return None
+
+
+class MT5TickStream:
+    """
+    Ticks en vivo de un símbolo. Cada poll() devuelve todos los ticks
+    llegados desde la última llamada (copy_ticks_from), sin perder ninguno
+    entre dos consultas.
+    """
+
+    def __init__(self, symbol, max_ticks=1000):
+        if mt5 is None:
+            raise RuntimeError("MetaTrader5 no está disponible en este sistema")
+        self.symbol = symbol
+        self.max_ticks = max_ticks
+        self.last_time_msc = None
+        self.server_offset = 0.0  # hora del servidor - hora local
+
+    def poll(self):
+        """:return: (time, bid, ask) como arrays NumPy (time en segundos del servidor)"""
+        if self.last_time_msc is None:
+            with terminal_lock:
+                tick = mt5.symbol_info_tick(self.symbol)
+            if tick is None:
+                return empty_ticks()
+            self.last_time_msc = tick.time_msc
+            self.server_offset = tick.time_msc / 1000.0 - time.time()
+            return np.array([tick.time_msc / 1000.0]), np.array([tick.bid]), np.array([tick.ask])
+
+        date_from = datetime.fromtimestamp(self.last_time_msc // 1000, timezone.utc)
+        with terminal_lock:
+            ticks = mt5.copy_ticks_from(self.symbol, date_from, self.max_ticks, mt5.COPY_TICKS_INFO)
+        if ticks is None or len(ticks) == 0:
+            return empty_ticks()
+
+        ticks = ticks[ticks['time_msc'] > self.last_time_msc]
+        if len(ticks) == 0:
+            return empty_ticks()
+
+        self.last_time_msc = int(ticks['time_msc'][-1])
+        self.server_offset = max(self.server_offset, self.last_time_msc / 1000.0 - time.time())
+        return ticks['time_msc'] / 1000.0, ticks['bid'], ticks['ask']
+
+    def get_server_time(self):
+        """Hora estimada del servidor (para el cierre por tiempo sin ticks)"""
+        return time.time() + self.server_offset
+
+
+class ReplayTickStream:
+    """Ticks grabados (arrays time/bid/ask) que se entregan por bloques"""
+
+    def __init__(self, times, bids, asks, chunk_size=10000):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.bids = np.asarray(bids, dtype=np.float64)
+        self.asks = np.asarray(asks, dtype=np.float64)
+        self.chunk_size = chunk_size
+        self.pos = 0
+
+    def poll(self):
+        start, end = self.pos, min(self.pos + self.chunk_size, len(self.times))
+        self.pos = end
+        return self.times[start:end], self.bids[start:end], self.asks[start:end]
+
+    def get_server_time(self):
+        return self.times[self.pos - 1] if self.pos > 0 else 0.0
+
+
+def empty_ticks():
+    return np.empty(0), np.empty(0), np.empty(0)
@@ -0,0 +1,485 @@
+"""
+Terminal MetaTrader 5 falso para Linux.
+Sustituye al paquete MetaTrader5 (solo existe en Windows) por un terminal
+que sirve el histórico local (CSV / .candles) como si fuera el servidor:
+la hora del servidor avanza con el reloj local a partir de una vela del
+histórico, los ticks se generan dentro de cada vela recorriendo
+apertura → máximo/mínimo → cierre y las órdenes se ejecutan al bid / ask
+del momento. Así el bucle en vivo (main.py) corre sin cambios para
+pruebas de carga y profiling.
+
+Implementa las funciones que usa el bot: initialize, login, shutdown,
+version, last_error, account_info, symbol_info, symbol_select,
+symbol_info_tick, copy_rates_from_pos, copy_ticks_from, order_send y
+positions_get. Cada llamada puede tardar una latencia configurable y se
+cuentan las llamadas y su tiempo. El SL / TP no se ejecuta en el
+servidor: las salidas las hace ExitEngine como en la cuenta real.
+
+Uso: FAKE_MT5=histórico.csv (o EURUSD=a.csv,GBPUSD=b.csv) antes de
+arrancar main.py / mainoff.py; install() debe ejecutarse antes de
+importar cualquier módulo que haga `import MetaTrader5`.
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+import types
+from collections import Counter, namedtuple
+from datetime import datetime
+
+import numpy as np
+
+# Constantes con los mismos valores que el paquete MetaTrader5
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900, TIMEFRAME_M30: 1800,
+    TIMEFRAME_H1: 3600, TIMEFRAME_H4: 14400, TIMEFRAME_D1: 86400,
+}
+
+CONSTANTS = {
+    "TIMEFRAME_M1": TIMEFRAME_M1, "TIMEFRAME_M5": TIMEFRAME_M5, "TIMEFRAME_M15": TIMEFRAME_M15,
+    "TIMEFRAME_M30": TIMEFRAME_M30, "TIMEFRAME_H1": TIMEFRAME_H1, "TIMEFRAME_H4": TIMEFRAME_H4,
+    "TIMEFRAME_D1": TIMEFRAME_D1,
+    "TRADE_ACTION_DEAL": 1,
+    "ORDER_TYPE_BUY": 0, "ORDER_TYPE_SELL": 1,
+    "POSITION_TYPE_BUY": 0, "POSITION_TYPE_SELL": 1,
+    "ORDER_TIME_GTC": 0,
+    "ORDER_FILLING_FOK": 0, "ORDER_FILLING_IOC": 1, "ORDER_FILLING_RETURN": 2,
+    "COPY_TICKS_ALL": -1, "COPY_TICKS_INFO": 1, "COPY_TICKS_TRADE": 2,
+    "TRADE_RETCODE_DONE": 10009,
+    "TRADE_RETCODE_INVALID": 10013,
+    "TRADE_RETCODE_INVALID_VOLUME": 10014,
+    "TRADE_RETCODE_MARKET_CLOSED": 10018,
+    "TRADE_RETCODE_POSITION_CLOSED": 10036,
+}
+
+RES_S_OK = (1, "Success")
+RES_E_NOT_FOUND = (-5, "Not found")
+RES_E_INVALID_PARAMS = (-2, "Invalid params")
+
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+TICKS_DTYPE = np.dtype([
+    ("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"), ("volume", "<u8"),
+    ("time_msc", "<i8"), ("flags", "<u4"), ("volume_real", "<f8"),
+])
+
+Tick = namedtuple("Tick", "time bid ask last volume time_msc flags volume_real")
+SymbolInfo = namedtuple("SymbolInfo", "name point digits trade_contract_size filling_mode visible spread")
+AccountInfo = namedtuple("AccountInfo", "login company server balance equity margin profit leverage currency")
+OrderSendResult = namedtuple("OrderSendResult", "retcode deal order volume price bid ask comment request_id")
+TradePosition = namedtuple("TradePosition", "ticket time time_msc type magic volume price_open sl tp "
+                                            "price_current profit symbol comment")
+
+# Bits de filling_mode de symbol_info (FOK | IOC)
+FILLING_MODE = 3
+
+# Segundos de la vela en que se alcanzan apertura, primer extremo, segundo extremo y cierre
+PATH_FRACTIONS = np.array([0.0, 1 / 3, 2 / 3, 59 / 60])
+
+
+class FakeSymbol:
+    """Histórico M1 de un símbolo y su generador de ticks"""
+
+    def __init__(self, name, candles, spread_points=10):
+        self.name = name
+        self.time = np.asarray(candles.time, dtype=np.int64)
+        self.open = np.asarray(candles.open, dtype=np.float64)
+        self.high = np.asarray(candles.high, dtype=np.float64)
+        self.low = np.asarray(candles.low, dtype=np.float64)
+        self.close = np.asarray(candles.close, dtype=np.float64)
+        self.volume = np.asarray(candles.volume, dtype=np.int64)
+        self.bar_seconds = int(np.median(np.diff(self.time[:1000]))) if len(self.time) > 1 else 60
+        self.digits = 3 if "JPY" in name else 5
+        self.point = 10.0 ** -self.digits
+        self.spread = spread_points * self.point
+        self.info = SymbolInfo(name, self.point, self.digits, 100000.0, FILLING_MODE, True, spread_points)
+
+        # Recorrido de cada vela: alcista O → L → H → C, bajista O → H → L → C
+        bullish = self.close >= self.open
+        self.path = np.column_stack([
+            self.open,
+            np.where(bullish, self.low, self.high),
+            np.where(bullish, self.high, self.low),
+            self.close,
+        ])
+        self.knots = PATH_FRACTIONS * self.bar_seconds
+
+    def get_bar_index(self, server_time):
+        """Vela en curso a esa hora (-1 antes del histórico)"""
+        return int(np.searchsorted(self.time, server_time, side="right")) - 1
+
+    def get_bids(self, times):
+        """Bid a cada hora (vectorizado); en los huecos del histórico se mantiene el último cierre"""
+        times = np.asarray(times, dtype=np.float64)
+        index = np.maximum(np.searchsorted(self.time, times, side="right") - 1, 0)
+        elapsed = np.clip(times - self.time[index], 0.0, self.knots[-1])
+        segment = np.clip(np.searchsorted(self.knots, elapsed, side="right") - 1, 0, len(self.knots) - 2)
+        start, end = self.path[index, segment], self.path[index, segment + 1]
+        fraction = (elapsed - self.knots[segment]) / (self.knots[segment + 1] - self.knots[segment])
+        return np.round(start + fraction * (end - start), self.digits)
+
+    def get_rates(self, server_time, tick_interval, first=0):
+        """
+        Velas M1 desde `first` hasta la hora dada: cerradas completas y la
+        vela en curso parcial (máximo / mínimo / cierre de los ticks ya generados).
+        :return: columnas (time, open, high, low, close, volume)
+        """
+        current = self.get_bar_index(server_time)
+        selected = slice(first, current + 1)
+        columns = [self.time[selected], self.open[selected], self.high[selected],
+                   self.low[selected], self.close[selected], self.volume[selected]]
+        if current < first:
+            return columns
+
+        bar_time = self.time[current]
+        if server_time < bar_time + self.bar_seconds:
+            ticks = self.get_bids(np.arange(bar_time, server_time + 1e-9, tick_interval))
+            columns = [column.copy() for column in columns]
+            columns[2][-1] = ticks.max()
+            columns[3][-1] = ticks.min()
+            columns[4][-1] = ticks[-1]
+            columns[5][-1] = len(ticks)
+        return columns
+
+
+class FakeTerminal:
+    def __init__(self, sources, start_bar=1000, speed=1.0, latency=0.0, order_latency=0.0,
+                 tick_interval=0.25, spread_points=10, balance=10000.0):
+        """
+        :param sources: {símbolo: fichero de velas M1}; la clave "*" sirve para cualquier símbolo
+        :param start_bar: vela del histórico con la que arranca la hora del servidor
+                          (las anteriores quedan como historia para la estrategia)
+        :param speed: segundos del servidor por segundo real (1 = tiempo real)
+        :param latency: segundos que tarda cada llamada al terminal
+        :param order_latency: segundos extra de order_send (ida y vuelta al servidor)
+        :param tick_interval: segundos entre ticks generados
+        :param spread_points: spread en puntos (ask = bid + spread)
+        """
+        self.sources = dict(sources)
+        self.start_bar = start_bar
+        self.speed = speed
+        self.latency = latency
+        self.order_latency = order_latency
+        self.tick_interval = tick_interval
+        self.spread_points = spread_points
+        self.symbols = {}
+        self.positions = {}  # ticket -> TradePosition
+        self.next_ticket = 1
+        self.balance = balance
+        self.last_error = RES_S_OK
+        self.calls = Counter()
+        self.call_seconds = Counter()
+        self.lock = threading.RLock()
+        self.account = (0, "fake")
+        self.start_time = None  # hora del servidor de start_bar
+        self.clock_origin = None  # hora local a la que corresponde start_time
+        self.finished = set()  # símbolos cuyo histórico ya se ha agotado (aviso dado)
+
+    # ------------------- Reloj e histórico -------------------
+
+    def get_symbol(self, name):
+        """Histórico del símbolo (se abre la primera vez que se pide)"""
+        symbol = self.symbols.get(name)
+        if symbol is None:
+            path = self.sources.get(name, self.sources.get("*"))
+            if path is None:
+                return None
+            # Import diferido: open_bar_source importa bar_source, que debe ver ya este módulo como MetaTrader5
+            from offline.candle_store import open_bar_source
+            symbol = self.symbols[name] = FakeSymbol(name, open_bar_source(path), self.spread_points)
+            if self.start_time is None:
+                self.start_clock(symbol)
+        return symbol
+
+    def start_clock(self, symbol):
+        """
+        Fija la hora del servidor en la vela start_bar. El inicio se alinea
+        con el minuto local para que los cierres de vela caigan en el mismo
+        segundo que en el reloj local (con speed=1).
+        Si start_bar no deja velas por delante el reloj nunca vería una vela
+        nueva: se arranca en la mitad del histórico.
+        """
+        last = len(symbol.time) - 1
+        index = self.start_bar
+        if index >= last:
+            index = max(last // 2, 0)
+            print(f"⚠️ Terminal falso: start_bar={self.start_bar} no deja velas por reproducir en {symbol.name} "
+                  f"({len(symbol.time)} velas); se arranca en la vela {index}")
+        self.start_time = float(symbol.time[index])
+        self.clock_origin = time.time() // symbol.bar_seconds * symbol.bar_seconds
+
+    def check_history_end(self, symbol, server_time):
+        """Avisa una vez cuando el reloj pasa del final del histórico (ya no habrá velas nuevas)"""
+        if symbol.name in self.finished or len(symbol.time) == 0:
+            return
+        if server_time >= symbol.time[-1] + symbol.bar_seconds:
+            self.finished.add(symbol.name)
+            print(f"⚠️ Terminal falso: fin del histórico de {symbol.name}; no llegarán más velas")
+
+    def get_server_time(self):
+        if self.start_time is None:
+            return time.time()
+        return self.start_time + (time.time() - self.clock_origin) * self.speed
+
+    def get_tick_time(self):
+        """Hora del último tick generado (múltiplo de tick_interval)"""
+        return self.get_server_time() // self.tick_interval * self.tick_interval
+
+    def get_tick(self, symbol):
+        tick_time = self.get_tick_time()
+        bid = float(symbol.get_bids([tick_time])[0])
+        return Tick(int(tick_time), bid, round(bid + symbol.spread, symbol.digits), 0.0, 0,
+                    int(round(tick_time * 1000)), 6, 0.0)
+
+    def call(self, name, extra_latency=0.0):
+        """Cuenta la llamada y simula su latencia"""
+        delay = self.latency + extra_latency
+        if delay > 0:
+            time.sleep(delay)
+        self.calls[name] += 1
+        self.call_seconds[name] += delay
+
+    # ------------------- API de MetaTrader5 -------------------
+
+    def initialize(self, *args, **kwargs):
+        self.call("initialize")
+        self.last_error = RES_S_OK
+        return True
+
+    def login(self, login=None, password=None, server=None, **kwargs):
+        self.call("login")
+        self.account = (login, server)
+        return True
+
+    def shutdown(self):
+        self.call("shutdown")
+        return True
+
+    def version(self):
+        return 500, 5260, "fake"
+
+    def get_last_error(self):
+        return self.last_error
+
+    def account_info(self):
+        self.call("account_info")
+        with self.lock:
+            profit = sum((position.profit for position in self.get_positions()), 0.0)
+        login, server = self.account
+        return AccountInfo(login or 0, "FakeTerminal", server or "fake", self.balance, self.balance + profit,
+                           0.0, profit, 100, "USD")
+
+    def symbol_info(self, name):
+        self.call("symbol_info")
+        symbol = self.get_symbol(name)
+        if symbol is None:
+            self.last_error = RES_E_NOT_FOUND
+            return None
+        return symbol.info
+
+    def symbol_select(self, name, enable=True):
+        self.call("symbol_select")
+        return self.get_symbol(name) is not None
+
+    def symbol_info_tick(self, name):
+        self.call("symbol_info_tick")
+        symbol = self.get_symbol(name)
+        if symbol is None:
+            self.last_error = RES_E_NOT_FOUND
+            return None
+        return self.get_tick(symbol)
+
+    def copy_rates_from_pos(self, name, timeframe, start_pos, count):
+        self.call("copy_rates_from_pos")
+        symbol = self.get_symbol(name)
+        seconds = TIMEFRAME_SECONDS.get(timeframe)
+        if symbol is None or seconds is None or count <= 0:
+            self.last_error = RES_E_NOT_FOUND if symbol is None else RES_E_INVALID_PARAMS
+            return None
+
+        server_time = self.get_server_time()
+        current = symbol.get_bar_index(server_time)
+        self.check_history_end(symbol, server_time)
+        factor = max(seconds // symbol.bar_seconds, 1)
+        first = max(current + 1 - (start_pos + count + 1) * factor, 0)
+        columns = symbol.get_rates(server_time, self.tick_interval, first)
+        if seconds != symbol.bar_seconds:
+            from bot_console.timeframe import resample_columns
+            columns = resample_columns(*columns, seconds=seconds)
+
+        end = len(columns[0]) - start_pos
+        if end <= 0:
+            self.last_error = RES_E_NOT_FOUND
+            return None
+        rates = np.zeros(min(count, end), dtype=RATES_DTYPE)
+        for field, column in zip(("time", "open", "high", "low", "close", "tick_volume"), columns):
+            rates[field] = column[end - len(rates):end]
+        rates["spread"] = self.spread_points
+        return rates
+
+    def copy_ticks_from(self, name, date_from, count, flags=None):
+        self.call("copy_ticks_from")
+        symbol = self.get_symbol(name)
+        if symbol is None:
+            self.last_error = RES_E_NOT_FOUND
+            return None
+        if isinstance(date_from, datetime):
+            date_from = date_from.timestamp()
+        first = np.ceil(float(date_from) / self.tick_interval) * self.tick_interval
+        times = np.arange(first, self.get_tick_time() + 1e-9, self.tick_interval)[:count]
+        ticks = np.zeros(len(times), dtype=TICKS_DTYPE)
+        ticks["time"] = times.astype(np.int64)
+        ticks["time_msc"] = np.round(times * 1000).astype(np.int64)
+        ticks["bid"] = symbol.get_bids(times)
+        ticks["ask"] = np.round(ticks["bid"] + symbol.spread, symbol.digits)
+        ticks["flags"] = 6
+        return ticks
+
+    def order_send(self, request):
+        self.call("order_send", self.order_latency)
+        symbol = self.get_symbol(request.get("symbol"))
+        if symbol is None:
+            self.last_error = RES_E_NOT_FOUND
+            return None
+
+        tick = self.get_tick(symbol)
+        is_buy = request.get("type") == CONSTANTS["ORDER_TYPE_BUY"]
+        price = tick.ask if is_buy else tick.bid
+        volume = request.get("volume", 0.0)
+
+        def result(retcode, comment, ticket=0):
+            return OrderSendResult(retcode, ticket, ticket, volume, price, tick.bid, tick.ask, comment, 0)
+
+        if request.get("action") != CONSTANTS["TRADE_ACTION_DEAL"]:
+            return result(CONSTANTS["TRADE_RETCODE_INVALID"], "Invalid request")
+        if not volume or volume <= 0:
+            return result(CONSTANTS["TRADE_RETCODE_INVALID_VOLUME"], "Invalid volume")
+        if symbol.get_bar_index(tick.time) < 0:
+            return result(CONSTANTS["TRADE_RETCODE_MARKET_CLOSED"], "Market closed")
+
+        with self.lock:
+            ticket = request.get("position")
+            if ticket:
+                # Cierre de una posición abierta
+                position = self.positions.pop(ticket, None)
+                if position is None:
+                    return result(CONSTANTS["TRADE_RETCODE_POSITION_CLOSED"], "Position doesn't exist")
+                self.balance += self.get_profit(position, price)
+                return result(CONSTANTS["TRADE_RETCODE_DONE"], "Request executed", ticket)
+
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            self.positions[ticket] = TradePosition(
+                ticket, tick.time, tick.time_msc,
+                CONSTANTS["POSITION_TYPE_BUY"] if is_buy else CONSTANTS["POSITION_TYPE_SELL"],
+                request.get("magic", 0), volume, price, request.get("sl", 0.0), request.get("tp", 0.0),
+                price, 0.0, symbol.name, request.get("comment", ""))
+        return result(CONSTANTS["TRADE_RETCODE_DONE"], "Request executed", ticket)
+
+    def get_profit(self, position, price):
+        sign = 1 if position.type == CONSTANTS["POSITION_TYPE_BUY"] else -1
+        return (price - position.price_open) * sign * self.symbols[position.symbol].info.trade_contract_size * position.volume
+
+    def get_positions(self, symbol=None, ticket=None):
+        """Posiciones abiertas con precio y beneficio actuales"""
+        positions = []
+        for position in self.positions.values():
+            if (symbol is not None and position.symbol != symbol) or (ticket is not None and position.ticket != ticket):
+                continue
+            tick = self.get_tick(self.symbols[position.symbol])
+            price = tick.bid if position.type == CONSTANTS["POSITION_TYPE_BUY"] else tick.ask
+            positions.append(position._replace(price_current=price, profit=self.get_profit(position, price)))
+        return positions
+
+    def positions_get(self, symbol=None, group=None, ticket=None):
+        self.call("positions_get")
+        with self.lock:
+            return tuple(self.get_positions(symbol, ticket))
+
+    def positions_total(self):
+        self.call("positions_total")
+        return len(self.positions)
+
+    # ------------------- Estadísticas -------------------
+
+    def get_stats(self):
+        """{función: (llamadas, segundos de latencia simulada)}"""
+        return {name: (count, self.call_seconds[name]) for name, count in self.calls.most_common()}
+
+    def print_stats(self):
+        print("================== TERMINAL FALSO ======================")
+        for name, (count, seconds) in self.get_stats().items():
+            print(f"{name:<22} {count:>8} llamadas {seconds * 1000:>10.1f} ms")
+        print("=======================================================")
+
+
+def create_module(terminal):
+    """Módulo con la misma interfaz que el paquete MetaTrader5 sobre un FakeTerminal"""
+    module = types.ModuleType("MetaTrader5")
+    module.__doc__ = "MetaTrader5 falso (bot_console.fake_mt5)"
+    module.__dict__.update(CONSTANTS)
+    for name in ("initialize", "login", "shutdown", "version", "account_info", "symbol_info", "symbol_select",
+                 "symbol_info_tick", "copy_rates_from_pos", "copy_ticks_from", "order_send", "positions_get",
+                 "positions_total"):
+        setattr(module, name, getattr(terminal, name))
+    module.last_error = terminal.get_last_error
+    module.terminal = terminal
+    return module
+
+
+def parse_sources(value):
+    """ "a.csv" → {"*": "a.csv"}; "EURUSD=a.csv,GBPUSD=b.csv" → {"EURUSD": ..., "GBPUSD": ...}"""
+    sources = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, path = item.rpartition("=")
+        sources[name.strip() or "*"] = path.strip()
+    return sources
+
+
+def install(sources, **options):
+    """
+    Registra el terminal falso como MetaTrader5 para los imports posteriores.
+    :param sources: fichero de velas M1, "EURUSD=a.csv,GBPUSD=b.csv" o {símbolo: fichero}
+    :param options: parámetros de FakeTerminal (start_bar, speed, latency...)
+    :return: el FakeTerminal
+    """
+    if isinstance(sources, str):
+        sources = parse_sources(sources)
+    terminal = FakeTerminal(sources, **options)
+    sys.modules["MetaTrader5"] = create_module(terminal)
+    return terminal
+
+
+def install_from_env():
+    """
+    install() con la configuración de las variables de entorno:
+    FAKE_MT5 (ficheros), FAKE_MT5_START_BAR, FAKE_MT5_SPEED, FAKE_MT5_LATENCY,
+    FAKE_MT5_ORDER_LATENCY, FAKE_MT5_TICK_INTERVAL y FAKE_MT5_SPREAD (puntos).
+    Las estadísticas de llamadas se muestran al salir.
+    """
+    terminal = install(
+        os.environ["FAKE_MT5"],
+        start_bar=int(os.getenv("FAKE_MT5_START_BAR", "1000")),
+        speed=float(os.getenv("FAKE_MT5_SPEED", "1.0")),
+        latency=float(os.getenv("FAKE_MT5_LATENCY", "0.0")),
+        order_latency=float(os.getenv("FAKE_MT5_ORDER_LATENCY", "0.0")),
+        tick_interval=float(os.getenv("FAKE_MT5_TICK_INTERVAL", "0.25")),
+        spread_points=int(os.getenv("FAKE_MT5_SPREAD", "10")),
+    )
+    print(f"🧪 MetaTrader5 falso con {terminal.sources} (latencia {terminal.latency * 1000:.1f} ms)")
+    atexit.register(terminal.print_stats)
+    return terminal
@@ -1,6 +1,58 @@
+import os
+
+# Niveles (mismos valores que el módulo logging)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+DISABLED = 100
+
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR, "DISABLED": DISABLED}
+
+
+def get_level(name, default=INFO):
+    """Nivel a partir de su nombre (p. ej. la variable LOG_LEVEL)"""
+    if name is None:
+        return default
+    return LEVELS.get(str(name).upper(), default)
+
+
 class Logger:
-    def __init__(self):
+    def __init__(self, level=None):
+        """
+        :param level: nivel mínimo que se muestra (por defecto LOG_LEVEL o INFO)
+        """
         self.name = "Logger"
+        self.level = level if level is not None else get_level(os.getenv("LOG_LEVEL"))
+
+    def is_enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, message, *args, color=None):
+        """
+        Muestra el mensaje solo si el nivel está activo. El texto se forma
+        con message % args después de comprobar el nivel, así los mensajes
+        desactivados no cuestan nada.
+        """
+        if level < self.level:
+            return None
+        text = message % args if args else message
+        if color is None:
+            print(text)
+            return text
+        return self.color_text(text, color)
+
+    def debug(self, message, *args, color=None):
+        return self.log(DEBUG, message, *args, color=color)
+
+    def info(self, message, *args, color=None):
+        return self.log(INFO, message, *args, color=color)
+
+    def warning(self, message, *args, color="yellow"):
+        return self.log(WARNING, message, *args, color=color)
+
+    def error(self, message, *args, color="red"):
+        return self.log(ERROR, message, *args, color=color)
 
     @staticmethod
     def color_text(text, color="red"):
@@ -1,14 +1,21 @@
 import time
+import threading
 import pandas as pd
 import MetaTrader5 as mt5
 from bot_console.resumes import ResumeJsonL
 from bot_console.logger import Logger
+from bot_console.exit_engine import ExitEngine, MT5TickStream, EXIT_MESSAGES
+from bot_console.symbol_cache import SymbolCache
+from bot_console.order_templates import OrderTemplates
+from bot_console.terminal import terminal_lock
 from datetime import datetime
 
 LONG = "LONG"
 SHORT = "SHORT"
 NEUTRAL = "NEUTRAL"
 
+MAX_POSITION_SECONDS = 49  # cierre por tiempo
+
 logger = Logger()
 resume_logger = ResumeJsonL(f"strategy_single_position_{datetime.now().strftime('%Y%m%d_%H%M%S')}", blockMessages=False)
 
@@ -23,6 +30,7 @@ class MarketOrder:
         self.sl = sl_price      # Precio de stop loss
         self.tp = tp_price      # Precio de take profit
         self.open_time = time.time()
+        self.open_tick_time = None  # hora del servidor del tick de apertura
         self.closed = False
         self.price_close = None
         self.profit = 0.0
@@ -49,212 +57,200 @@ class MarketSimulator:
     Estrategia de posición simulada
     """
     open_positions = []
+    positions_lock = threading.RLock()  # protege open_positions (hilo principal + monitor)
+    position_monitor = None
+    symbol_cache = SymbolCache()  # point, digits, contrato, llenado... sin consultar en cada orden
+    order_templates = OrderTemplates()  # peticiones LONG/SHORT preparadas antes del cierre de vela
 
     @staticmethod
-    def strategy_success_order(symbol: str="EURUSD", volume: float=0.01, signal: str="NEUTRAL"):
+    def strategy_success_order(symbol: str="EURUSD", volume: float=0.01, signal: str="NEUTRAL", blocking: bool=False):
         """
         Ejecuta la estrategia de posición simulada.
+        Por defecto la posición queda a cargo del PositionMonitor en segundo plano
+        y la función vuelve enseguida; con blocking=True se monitoriza aquí mismo.
         """
-        logger.color_text(f"🚀 Ejecutando operación {signal.upper()}...", "green")
-        resume_logger.log({"message": f"🚀 Ejecutando operación {signal.upper()}...", "type": "info"})
-        
         if signal == LONG:
-            MarketSimulator.open_long(symbol, volume)
+            opened = MarketSimulator.open_long(symbol, volume)
         elif signal == SHORT:
-            MarketSimulator.open_short(symbol, volume)
+            opened = MarketSimulator.open_short(symbol, volume)
         else:
             logger.color_text(f"Señal: {signal} | No se abre operación", "yellow")
             resume_logger.log({"message": f"Señal: {signal} | No se abre operación", "type": "info"})
             return
-        
-        MarketSimulator.monitor_positions(symbol)
 
-    # ------------------- Funciones short, long and close -------------------
+        # open_position ya ha registrado el motivo del fallo: no hay nada que vigilar
+        if not opened:
+            return
+
+        # El aviso se escribe después del envío para no retrasar la orden
+        logger.color_text(f"🚀 Operación {signal.upper()} ejecutada", "green")
+        resume_logger.log({"message": f"🚀 Operación {signal.upper()} ejecutada", "type": "info"})
+
+        if blocking:
+            MarketSimulator.monitor_positions(symbol)
+        else:
+            MarketSimulator.get_position_monitor().notify()
 
     @staticmethod
-    def open_long(symbol, volume, sl_pips=200, tp_pips=300):
-        """Abre una operación real de compra (LONG) en MT5."""
-        try:
-            # Obtener información actual del símbolo
-            symbol_info = mt5.symbol_info(symbol)
-            if symbol_info is None:
-                logger.color_text(f"❌ No se pudo obtener información para {symbol}", "red")
-                resume_logger.log({"message": f"❌ No se pudo obtener información para {symbol}", "type": "error"})
-                return False
-            
-            # Verificar si el símbolo está disponible para trading
-            if not symbol_info.visible:
-                if not mt5.symbol_select(symbol, True):
-                    logger.color_text(f"❌ No se puede seleccionar {symbol}", "red")
-                    resume_logger.log({"message": f"❌ No se puede seleccionar {symbol}", "type": "error"})
-                    return False
-            
-            # Obtener el precio actual
-            tick = mt5.symbol_info_tick(symbol)
-            if tick is None:
-                logger.color_text(f"❌ No se pudo obtener el tick para {symbol}", "red")
-                resume_logger.log({"message": f"❌ No se pudo obtener el tick para {symbol}", "type": "error"})
-                return False
-            
-            # Calcular SL y TP
-            point = symbol_info.point
-            price_open = tick.ask  # Para compras usamos el precio ASK
-            
-            sl_price = price_open - sl_pips * point
-            tp_price = price_open + tp_pips * point
-            
-            # Preparar la orden
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": volume,
-                "type": mt5.ORDER_TYPE_BUY,
-                "price": price_open,
-                "sl": sl_price,
-                "tp": tp_price,
-                "deviation": 20,
-                "magic": 12345,
-                "comment": "Bot LONG",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_FOK,
-            }
-            # Enviar la orden
-            result = mt5.order_send(request)
+    def get_open_positions(symbol=None):
+        """Posiciones abiertas (todas o solo las de un símbolo)"""
+        with MarketSimulator.positions_lock:
+            return [order for order in MarketSimulator.open_positions
+                    if not order.closed and (symbol is None or order.symbol == symbol)]
 
-            if result is None:
-                last_error = mt5.last_error()
-                logger.color_text(f"❌ Error: No se pudo enviar la orden. MT5 Error: {last_error}", "red")
-                resume_logger.log({"message": f"❌ Error: No se pudo enviar la orden. MT5 Error: {last_error}", "type": "error"})
-                return False
+    @staticmethod
+    def get_position_monitor():
+        """Devuelve el monitor de posiciones en segundo plano (lo arranca la primera vez)"""
+        with MarketSimulator.positions_lock:
+            if MarketSimulator.position_monitor is None:
+                MarketSimulator.position_monitor = PositionMonitor()
+                MarketSimulator.position_monitor.start()
+            return MarketSimulator.position_monitor
 
-            order = MarketOrder(symbol, "long", price_open, volume, sl_price, tp_price, position_id=result.order)
-            MarketSimulator.open_positions.append(order)
+    # ------------------- Funciones short, long and close -------------------
 
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
-                logger.color_text(f"❌ Error al abrir LONG: {result.retcode} | msj: {result.comment}", "red")
-                resume_logger.log({"message": f"❌ Error al abrir LONG: {result.retcode} | msj: {result.comment}", "type": "error"})
-                return False
-            else:
-                logger.color_text(f"✅ LONG abierto | Ticket: {result.order} | {symbol} @ {price_open:.5f}", "green")
-                resume_logger.log({"message": f"✅ LONG abierto | Ticket: {result.order} | {symbol} @ {price_open:.5f}", "type": "success"})
-                logger.color_text(f"✅ SL: {sl_price:.5f} | TP: {tp_price:.5f} | Volumen: {volume}", "green")
-                resume_logger.log({"message": f"✅ SL: {sl_price:.5f} | TP: {tp_price:.5f} | Volumen: {volume}", "type": "success"})
-                return True
-                
-        except Exception as e:
-            logger.color_text(f"❌ Error en open_long: {e}", "red")
-            resume_logger.log({"message": f"❌ Error en open_long: {e}", "type": "error"})
+    @staticmethod
+    def prepare_orders(symbol, volume, sl_pips=200, tp_pips=300):
+        """
+        Deja preparadas las peticiones LONG y SHORT del símbolo antes del cierre
+        de vela: en el cambio solo queda sellar el precio y enviar.
+        """
+        symbol_info = MarketSimulator.symbol_cache.get(symbol)
+        if symbol_info is None:
             return False
+        MarketSimulator.order_templates.prepare(symbol_info, volume, sl_pips, tp_pips)
+        return True
+
+    @staticmethod
+    def open_long(symbol, volume, sl_pips=200, tp_pips=300):
+        """Abre una operación real de compra (LONG) en MT5."""
+        return MarketSimulator.open_position(symbol, "long", volume, sl_pips, tp_pips)
 
     @staticmethod
     def open_short(symbol, volume, sl_pips=200, tp_pips=300):
         """Abre una operación real de venta (SHORT) en MT5."""
+        return MarketSimulator.open_position(symbol, "short", volume, sl_pips, tp_pips)
+
+    @staticmethod
+    def open_position(symbol, direction, volume, sl_pips=200, tp_pips=300):
+        """
+        Abre una operación real en MT5 a partir de la plantilla preparada.
+        Entre el tick y el envío no se hace nada más: los mensajes se
+        escriben cuando MT5 ya ha respondido.
+        """
         try:
-            # Obtener información actual del símbolo
-            symbol_info = mt5.symbol_info(symbol)
-            if symbol_info is None:
-                logger.color_text(f"❌ No se pudo obtener información para {symbol}", "red")
-                resume_logger.log({"message": f"❌ No se pudo obtener información para {symbol}", "type": "error"})
-                return False
-            
-            # Verificar si el símbolo está disponible para trading
-            if not symbol_info.visible:
-                if not mt5.symbol_select(symbol, True):
-                    logger.color_text(f"❌ No se puede seleccionar {symbol}", "red")
-                    resume_logger.log({"message": f"❌ No se puede seleccionar {symbol}", "type": "error"})
+            template = MarketSimulator.order_templates.get(symbol, direction, volume, sl_pips, tp_pips)
+            if template is None:
+                # Sin plantilla preparada (primera orden o parámetros distintos)
+                if not MarketSimulator.prepare_orders(symbol, volume, sl_pips, tp_pips):
+                    logger.color_text(f"❌ No se pudo obtener información para {symbol}", "red")
+                    resume_logger.log({"message": f"❌ No se pudo obtener información para {symbol}", "type": "error"})
                     return False
-            
-            # Obtener el precio actual usando el módulo mt5 directamente
-            tick = mt5.symbol_info_tick(symbol)
+                template = MarketSimulator.order_templates.get(symbol, direction, volume, sl_pips, tp_pips)
+
+            # Obtener el precio actual y enviar la orden (sin otro símbolo en medio)
+            with terminal_lock:
+                tick = mt5.symbol_info_tick(symbol)
+                if tick is not None:
+                    request = template.stamp(tick)
+                    result = mt5.order_send(request)
+                    last_error = mt5.last_error() if result is None else None
             if tick is None:
                 logger.color_text(f"❌ No se pudo obtener el tick para {symbol}", "red")
                 resume_logger.log({"message": f"❌ No se pudo obtener el tick para {symbol}", "type": "error"})
                 return False
-            
-            # Calcular SL y TP
-            point = symbol_info.point
-            price_open = tick.bid  # Para ventas usamos el precio BID
-            
-            sl_price = price_open + sl_pips * point
-            tp_price = price_open - tp_pips * point
-            
-            # Preparar la orden
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": volume,
-                "type": mt5.ORDER_TYPE_SELL,
-                "price": price_open,
-                "sl": sl_price,
-                "tp": tp_price,
-                "deviation": 20,
-                "magic": 12345,
-                "comment": "Bot SHORT",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_FOK,
-            }
-            # Enviar la orden
-            result = mt5.order_send(request)
-            
+
+            label = direction.upper()
             if result is None:
-                last_error = mt5.last_error()
+                MarketSimulator.invalidate_symbol(symbol)
                 logger.color_text(f"❌ Error: No se pudo enviar la orden. MT5 Error: {last_error}", "red")
                 resume_logger.log({"message": f"❌ Error: No se pudo enviar la orden. MT5 Error: {last_error}", "type": "error"})
                 return False
-                
-            order = MarketOrder(symbol, "short", price_open, volume, sl_price, tp_price, position_id=result.order)
-            MarketSimulator.open_positions.append(order)
 
             if result.retcode != mt5.TRADE_RETCODE_DONE:
-                logger.color_text(f"❌ Error al abrir SHORT: {result.retcode} | msj: {result.comment}", "red")
-                resume_logger.log({"message": f"❌ Error al abrir SHORT: {result.retcode} | msj: {result.comment}", "type": "error"})
+                MarketSimulator.invalidate_symbol(symbol)
+                logger.color_text(f"❌ Error al abrir {label}: {result.retcode} | msj: {result.comment}", "red")
+                resume_logger.log({"message": f"❌ Error al abrir {label}: {result.retcode} | msj: {result.comment}", "type": "error"})
                 return False
-            else:
-                logger.color_text(f"✅ SHORT abierto | Ticket: {result.order} | {symbol} @ {price_open:.5f}", "green")
-                resume_logger.log({"message": f"✅ SHORT abierto | Ticket: {result.order} | {symbol} @ {price_open:.5f}", "type": "success"})
-                logger.color_text(f"✅ SL: {sl_price:.5f} | TP: {tp_price:.5f} | Volumen: {volume}", "green")
-                resume_logger.log({"message": f"✅ SL: {sl_price:.5f} | TP: {tp_price:.5f} | Volumen: {volume}", "type": "success"})
-                return True
-                
+
+            price_open, sl_price, tp_price = request["price"], request["sl"], request["tp"]
+            order = MarketOrder(symbol, direction, price_open, volume, sl_price, tp_price, position_id=result.order)
+            order.open_tick_time = tick.time_msc / 1000.0
+            with MarketSimulator.positions_lock:
+                MarketSimulator.open_positions.append(order)
+
+            logger.color_text(f"✅ {label} abierto | Ticket: {result.order} | {symbol} @ {price_open:.5f}", "green")
+            resume_logger.log({"message": f"✅ {label} abierto | Ticket: {result.order} | {symbol} @ {price_open:.5f}", "type": "success"})
+            logger.color_text(f"✅ SL: {sl_price:.5f} | TP: {tp_price:.5f} | Volumen: {volume}", "green")
+            resume_logger.log({"message": f"✅ SL: {sl_price:.5f} | TP: {tp_price:.5f} | Volumen: {volume}", "type": "success"})
+            return True
+
         except Exception as e:
-            logger.color_text(f"❌ Error en open_short: {e}", "red")
-            resume_logger.log({"message": f"❌ Error en open_short: {e}", "type": "error"})
+            logger.color_text(f"❌ Error en open_{direction}: {e}", "red")
+            resume_logger.log({"message": f"❌ Error en open_{direction}: {e}", "type": "error"})
             return False
 
+    @staticmethod
+    def invalidate_symbol(symbol):
+        """Tras un envío rechazado se vuelven a pedir los metadatos y se rehacen las plantillas."""
+        MarketSimulator.symbol_cache.invalidate(symbol)
+        MarketSimulator.order_templates.invalidate(symbol)
+
     @staticmethod
     def close_position(order):
         """Cierra una operación en MetaTrader 5."""
         # Primero, cierra la posición en MT5
         symbol = order.symbol
-        close_price = mt5.symbol_info_tick(symbol).ask if order.type.upper() == "LONG" else mt5.symbol_info_tick(symbol).bid
+        symbol_info = MarketSimulator.symbol_cache.get(symbol)
+        filling_type = symbol_info.get_filling_type() if symbol_info else mt5.ORDER_FILLING_FOK
         type = mt5.ORDER_TYPE_SELL if order.type.upper() == "LONG" else mt5.ORDER_TYPE_BUY
 
-        # Crear la solicitud de cierre
+        # Crear la solicitud de cierre (el precio se añade con el tick)
         close_request = {
             "action": mt5.TRADE_ACTION_DEAL,
             "position": order.position_id,
             "symbol": symbol,
             "volume": order.volume,
             "type": type,
-            "price": close_price,
+            "price": 0.0,
             "deviation": 20,
             "magic": order.magic if hasattr(order, 'magic') else 100,
             "comment": "Cierre posición",
             "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_FOK,
+            "type_filling": filling_type,
         }
 
-        # Enviar la solicitud de cierre
-        result = mt5.order_send(close_request)
+        # Un único tick: los largos se cierran vendiendo al bid y los cortos comprando al ask
+        with terminal_lock:
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is not None:
+                close_price = tick.bid if order.type.upper() == "LONG" else tick.ask
+                close_request["price"] = close_price
+                result = mt5.order_send(close_request)
+                last_error = mt5.last_error() if result is None else None
+        if tick is None:
+            logger.color_text(f"❌ No se pudo obtener el tick para {symbol}", "red")
+            resume_logger.log({"message": f"❌ No se pudo obtener el tick para {symbol}", "type": "error"})
+            return False
+
+        if result is None:
+            MarketSimulator.invalidate_symbol(symbol)
+            logger.color_text(f"❌ Error al cerrar posición. MT5 Error: {last_error}", "red")
+            resume_logger.log({"message": f"❌ Error al cerrar posición. MT5 Error: {last_error}", "type": "error"})
+            return False
 
         if result.retcode != mt5.TRADE_RETCODE_DONE:
+            MarketSimulator.invalidate_symbol(symbol)
             logger.color_text(f"❌ Error al cerrar posición: {result.retcode} | {result.comment}", "red")
             resume_logger.log({"message": f"❌ Error al cerrar posición: {result.retcode} | {result.comment}", "type": "error"})
             return False
 
         order.closed = True
         order.price_close = close_price
-        order.close_time = mt5.symbol_info_tick(symbol).time if mt5.symbol_info_tick(symbol) else None
+        order.close_time = tick.time
+        # Beneficio con el precio real de cierre (no el del último tick que vio el motor)
+        direction = 1 if order.type.upper() == "LONG" else -1
+        order.profit = (close_price - order.price_open) * direction * MarketSimulator.get_contract_size(symbol) * order.volume
 
         logger.color_text(f"✅ Cierre REAL {order.type.upper()} @ {close_price:.5f} | Profit: {order.profit:.2f} USD", "green")
         resume_logger.log({"message": f"✅ Cierre REAL {order.type.upper()} @ {close_price:.5f} | Profit: {order.profit:.2f} USD", "type": "success"})
@@ -264,7 +260,8 @@ class MarketSimulator:
     def clear_positions():
         """Limpia las posiciones abiertas."""
         # Limpiar posiciones cerradas y retornar para nueva simulación
-        MarketSimulator.open_positions = [pos for pos in MarketSimulator.open_positions if not pos.closed]
+        with MarketSimulator.positions_lock:
+            MarketSimulator.open_positions = [pos for pos in MarketSimulator.open_positions if not pos.closed]
         
         logger.color_text("🔄 Preparando nueva simulación...\n", "blue")
         resume_logger.log({"message": "🔄 Preparando nueva simulación...\n", "type": "info"})
@@ -272,62 +269,150 @@ class MarketSimulator:
     # ------------------- Monitoring -------------------
 
     @staticmethod
-    def monitor_positions(symbol):
-        """Monitorea las posiciones abiertas en tiempo real."""
+    def get_contract_size(symbol):
+        """Tamaño de contrato real del símbolo (100000 si no se puede consultar)."""
+        symbol_info = MarketSimulator.symbol_cache.get(symbol)
+        if symbol_info is None:
+            return 100000
+        return symbol_info.contract_size
+
+    @staticmethod
+    def watch_position(exit_engine, order):
+        """Añade una orden al motor de salidas."""
+        contract_size = MarketSimulator.get_contract_size(order.symbol)
+        exit_engine.add(order, contract_size, open_time=order.open_tick_time)
+
+    @staticmethod
+    def close_position_with_message(order, message):
+        """
+        Cierra la posición, limpia la tabla de posiciones y registra el motivo.
+        Devuelve False si no se ha podido cerrar (la posición sigue abierta).
+        """
+        if not MarketSimulator.close_position(order):
+            return False
+        MarketSimulator.clear_positions()
+        logger.color_text(message, "yellow")
+        resume_logger.log({"message": message, "type": "info"})
+        return True
+
+    @staticmethod
+    def process_exits(exit_engine, exits):
+        """
+        Cierra las posiciones que ha marcado el motor de salidas. Si el cierre
+        falla la orden vuelve al motor para reintentarlo con los ticks siguientes.
+        """
+        for order, reason in exits:
+            logger.color_text(f"💰 {order.symbol} | {order.type.upper()} | Entrada: {order.price_open:.5f} | Profit: {order.profit:.4f} USD", "blue")
+            resume_logger.log({"message": f"💰 {order.symbol} | {order.type.upper()} | Entrada: {order.price_open:.5f} | Profit: {order.profit:.4f} USD", "type": "info"})
+            if not MarketSimulator.close_position_with_message(order, EXIT_MESSAGES[reason]):
+                MarketSimulator.watch_position(exit_engine, order)
+
+    @staticmethod
+    def monitor_positions(symbol, poll_interval=0.05):
+        """Monitorea las posiciones abiertas tick a tick (bloqueante)."""
         print("📈 Monitoreando operaciones... (presiona Ctrl+C para detener)")
-        
-        seconds = 1
-        profits = []
 
+        exit_engine = ExitEngine(max_seconds=MAX_POSITION_SECONDS)
+        with MarketSimulator.positions_lock:
+            orders = [order for order in MarketSimulator.open_positions if not order.closed and order.symbol == symbol]
+        for order in orders:
+            MarketSimulator.watch_position(exit_engine, order)
+
+        tick_stream = MT5TickStream(symbol)
         try:
-            while True:
-                # Obtener el precio actual del mercado
-                tick = mt5.symbol_info_tick(symbol)  # O usar el símbolo de la orden
-                if tick is None:
-                    logger.color_text("❌ No se pudo obtener el precio actual", "red")
-                    resume_logger.log({"message": "❌ No se pudo obtener el precio actual", "type": "error"})
-                    time.sleep(1)
-                    continue
-                    
-                # Para posiciones largas usamos el bid, para cortas el ask
-                current_bid = tick.bid
-                current_ask = tick.ask
-
-                for order in MarketSimulator.open_positions:
-                    if order.closed:
-                        continue
-                        
-                    # Usar el precio apropiado según el tipo de orden
-                    current_price = current_bid if order.type == "long" else current_ask
-                    
-                    # Calcular ganancias/pérdidas
-                    if order.type == "long":
-                        order.profit = (current_price - order.price_open) * 100000 * order.volume
-                    elif order.type == "short":
-                        order.profit = (order.price_open - current_price) * 100000 * order.volume
-    
-                    logger.color_text(f"💰 {order.symbol} | {order.type.upper()} | Entrada: {order.price_open:.5f} | Actual: {current_price:.5f} | Profit: {order.profit:.4f} USD", "blue")
-                    resume_logger.log({"message": f"💰 {order.symbol} | {order.type.upper()} | Entrada: {order.price_open:.5f} | Actual: {current_price:.5f} | Profit: {order.profit:.4f} USD", "type": "info"})
-
-                    # Si el profit cae más del 10% del máximo reciente → cerrar
-                    if order.profit > 0:
-                        profits.append(order.profit)
-                        if (len(profits) >= 4 and order.profit > max(profits) * 0.90):
-                            MarketSimulator.close_position(order)
-                            MarketSimulator.clear_positions()
-                            logger.color_text("🔻 Posición cerrada por pérdida del 10% del máximo.", "yellow")
-                            resume_logger.log({"message": "🔻 Posición cerrada por pérdida del 10% del máximo.", "type": "info"})
-                            return
-                    if (seconds == 49):
-                        MarketSimulator.close_position(order)
-                        MarketSimulator.clear_positions()
-                        logger.color_text("🔻 Posición cerrada por tiempo.", "yellow")
-                        resume_logger.log({"message": "🔻 Posición cerrada por tiempo.", "type": "info"})
-                        return
-                seconds += 1
-                time.sleep(1)
+            while exit_engine.has_positions(symbol):
+                times, bids, asks = tick_stream.poll()
+                for tick_time, bid, ask in zip(times.tolist(), bids.tolist(), asks.tolist()):
+                    MarketSimulator.process_exits(exit_engine, exit_engine.on_tick(symbol, tick_time, bid, ask))
+                MarketSimulator.process_exits(exit_engine, exit_engine.on_clock(symbol, tick_stream.get_server_time()))
+                time.sleep(poll_interval)
 
         except KeyboardInterrupt:
             logger.color_text("\n🛑 Simulación detenida por el usuario.", "red")
             resume_logger.log({"message": "\n🛑 Simulación detenida por el usuario.", "type": "info"})
             return
+
+
+class PositionMonitor:
+    """
+    Monitor de posiciones en un hilo propio.
+    Vigila todas las posiciones de MarketSimulator.open_positions (la tabla
+    compartida) sin bloquear el bucle de velas: lee el flujo de ticks de cada
+    símbolo y aplica el ExitEngine en cada tick.
+    """
+
+    def __init__(self, poll_interval=0.05, max_seconds=MAX_POSITION_SECONDS):
+        self.poll_interval = poll_interval
+        self.exit_engine = ExitEngine(max_seconds=max_seconds)
+        self.tick_streams = {}
+        self.watched = set()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Arranca el hilo del monitor."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="PositionMonitor", daemon=True)
+        self.thread.start()
+        logger.color_text("📈 Monitor de posiciones iniciado en segundo plano", "blue")
+
+    def stop(self, timeout=None):
+        """Detiene el hilo del monitor."""
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def notify(self):
+        """Avisa al monitor de que hay una posición nueva."""
+        self.wakeup.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.watch_new_positions()
+                if not self.exit_engine.has_positions():
+                    # Sin posiciones: se duerme hasta que se abra una
+                    self.wakeup.wait()
+                    self.wakeup.clear()
+                    continue
+                self.check_positions()
+            except Exception as e:
+                logger.color_text(f"❌ Error en el monitor de posiciones: {e}", "red")
+                resume_logger.log({"message": f"❌ Error en el monitor de posiciones: {e}", "type": "error"})
+
+            self.stopped.wait(self.poll_interval)
+
+    def watch_new_positions(self):
+        """Pasa al motor de salidas las órdenes nuevas de la tabla compartida."""
+        with MarketSimulator.positions_lock:
+            orders = [order for order in MarketSimulator.open_positions if not order.closed]
+        for order in orders:
+            if id(order) not in self.watched:
+                self.watched.add(id(order))
+                MarketSimulator.watch_position(self.exit_engine, order)
+
+    def check_positions(self):
+        """Procesa los ticks nuevos de cada símbolo con posiciones abiertas."""
+        for symbol in self.exit_engine.get_symbols():
+            tick_stream = self.tick_streams.get(symbol)
+            if tick_stream is None:
+                tick_stream = self.tick_streams[symbol] = MT5TickStream(symbol)
+
+            times, bids, asks = tick_stream.poll()
+            for tick_time, bid, ask in zip(times.tolist(), bids.tolist(), asks.tolist()):
+                exits = self.exit_engine.on_tick(symbol, tick_time, bid, ask)
+                self.close(exits)
+                if not self.exit_engine.has_positions(symbol):
+                    break
+            self.close(self.exit_engine.on_clock(symbol, tick_stream.get_server_time()))
+
+    def close(self, exits):
+        MarketSimulator.process_exits(self.exit_engine, exits)
+        # Las que no se han podido cerrar siguen en el motor
+        for order, _ in exits:
+            if order.closed:
+                self.watched.discard(id(order))
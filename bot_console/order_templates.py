@@ -0,0 +1,83 @@
+"""
+Plantillas de órdenes.
+Deja preparada por símbolo y dirección la petición de order_send (todo
+menos el precio) y las distancias de SL/TP ya convertidas a precio, de
+modo que en el cambio de vela solo se sella el precio del tick y se envía.
+"""
+
+import MetaTrader5 as mt5
+
+LONG = "long"
+SHORT = "short"
+
+
+class OrderTemplate:
+    """Petición de order_send preparada para un símbolo y una dirección"""
+    __slots__ = ("symbol", "direction", "volume", "sl_pips", "tp_pips", "sl_offset", "tp_offset", "request")
+
+    def __init__(self, symbol_spec, direction, volume, sl_pips=200, tp_pips=300, magic=12345, deviation=20):
+        self.symbol = symbol_spec.symbol
+        self.direction = direction
+        self.volume = volume
+        self.sl_pips = sl_pips
+        self.tp_pips = tp_pips
+        # Los largos ponen el SL por debajo y el TP por encima; los cortos al revés
+        sign = 1 if direction == LONG else -1
+        self.sl_offset = -sign * sl_pips * symbol_spec.point
+        self.tp_offset = sign * tp_pips * symbol_spec.point
+        self.request = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": self.symbol,
+            "volume": volume,
+            "type": mt5.ORDER_TYPE_BUY if direction == LONG else mt5.ORDER_TYPE_SELL,
+            "price": 0.0,
+            "sl": 0.0,
+            "tp": 0.0,
+            "deviation": deviation,
+            "magic": magic,
+            "comment": f"Bot {direction.upper()}",
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": symbol_spec.get_filling_type(),
+        }
+
+    def matches(self, volume, sl_pips, tp_pips):
+        return self.volume == volume and self.sl_pips == sl_pips and self.tp_pips == tp_pips
+
+    def stamp(self, tick):
+        """
+        Sella el precio del tick (ask en compras, bid en ventas).
+        :return: petición lista para order_send
+        """
+        price = tick.ask if self.direction == LONG else tick.bid
+        request = self.request.copy()
+        request["price"] = price
+        request["sl"] = price + self.sl_offset
+        request["tp"] = price + self.tp_offset
+        return request
+
+
+class OrderTemplates:
+    """Plantillas preparadas por (símbolo, dirección)"""
+
+    def __init__(self):
+        self.templates = {}
+
+    def prepare(self, symbol_spec, volume, sl_pips=200, tp_pips=300):
+        """Prepara las plantillas LONG y SHORT del símbolo (si no lo estaban ya)"""
+        for direction in (LONG, SHORT):
+            template = self.templates.get((symbol_spec.symbol, direction))
+            if template is None or not template.matches(volume, sl_pips, tp_pips):
+                self.templates[(symbol_spec.symbol, direction)] = OrderTemplate(
+                    symbol_spec, direction, volume, sl_pips, tp_pips)
+
+    def get(self, symbol, direction, volume, sl_pips=200, tp_pips=300):
+        """Plantilla preparada o None si no existe o sus parámetros no coinciden"""
+        template = self.templates.get((symbol, direction))
+        if template is None or not template.matches(volume, sl_pips, tp_pips):
+            return None
+        return template
+
+    def invalidate(self, symbol):
+        """Descarta las plantillas del símbolo (p. ej. tras refrescar sus metadatos)"""
+        for direction in (LONG, SHORT):
+            self.templates.pop((symbol, direction), None)
@@ -0,0 +1,89 @@
+"""
+Fichero de estadística de patrones.
+Guarda, para cada configuración de mechas (has_upper_wick, has_lower_wick)
+y para cada patrón de CandlePatterns1M, cuántas veces la vela siguiente
+fue LONG / SHORT / NEUTRAL. Lo genera offline/stats_miner.py y las
+estrategias lo usan en lugar de la tabla escrita a mano solo si se pide
+(CANDLE_STATS=ruta o la ruta explícita).
+"""
+
+import json
+import os
+from datetime import datetime
+
+STATS_VERSION = 1
+# Salida por defecto de stats_miner (no se carga si no se indica con CANDLE_STATS)
+STATS_PATH = os.path.join(os.path.dirname(__file__), "stats", "candle_stats.json")
+
+OUTCOMES = ("LONG", "SHORT", "NEUTRAL")
+
+# Identificador de cada configuración de mechas (como en ULTRACONSERV_STATS)
+WICK_IDS = {
+    (True, True): "P11",
+    (True, False): "P10",
+    (False, True): "P01",
+    (False, False): "P00",
+}
+
+
+def save_stats(path, wick_stats, pattern_stats=None, sources=(), num_candles=0):
+    """
+    Escribe el fichero de estadística (JSON versionado).
+    :param wick_stats: {(has_up, has_low): {"LONG": n, "SHORT": n, "NEUTRAL": n, "id": "P11"}}
+    :param pattern_stats: {nombre_patrón: {"LONG": n, "SHORT": n, "NEUTRAL": n}}
+    """
+    data = {
+        "version": STATS_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "sources": [os.path.basename(source) for source in sources],
+        "num_candles": int(num_candles),
+        "wick_stats": [
+            {"has_upper_wick": key[0], "has_lower_wick": key[1], **counts}
+            for key, counts in wick_stats.items()
+        ],
+        "pattern_stats": pattern_stats or {},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_stats(path=STATS_PATH):
+    """
+    Lee el fichero de estadística.
+    :return: (wick_stats, pattern_stats, metadatos)
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    version = data.get("version")
+    if version != STATS_VERSION:
+        raise ValueError(f"Versión de estadística no soportada en {path}: {version} (se espera {STATS_VERSION})")
+
+    wick_stats = {}
+    for row in data["wick_stats"]:
+        key = (bool(row["has_upper_wick"]), bool(row["has_lower_wick"]))
+        wick_stats[key] = {outcome: int(row[outcome]) for outcome in OUTCOMES}
+        wick_stats[key]["id"] = row.get("id", WICK_IDS[key])
+
+    meta = {name: data.get(name) for name in ("version", "created", "sources", "num_candles")}
+    return wick_stats, data.get("pattern_stats", {}), meta
+
+
+def load_wick_stats(path=None, default=None):
+    """
+    Tabla de mechas para la estrategia: la del fichero indicado (path o
+    CANDLE_STATS) o, si no se indica ninguno, default (la tabla incluida en
+    el código). Un fichero indicado que no existe es un error.
+    """
+    path = path or os.getenv("CANDLE_STATS")
+    if not path:
+        return default
+    wick_stats, _, meta = load_stats(path)
+    if set(wick_stats) != set(WICK_IDS):
+        raise ValueError(f"Faltan configuraciones de mechas en {path}")
+    print(f"📊 Estadística cargada de {path} ({meta['num_candles']} velas, {meta['created']})")
+    return wick_stats
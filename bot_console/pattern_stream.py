@@ -0,0 +1,118 @@
+"""
+Detector de patrones en streaming.
+Se le entrega una vela cerrada cada vez (push) y devuelve los patrones que
+se completan en esa vela. Guarda internamente la ventana de las 3 últimas
+velas y las listas de máximos / mínimos locales, así quien lo usa no tiene
+que montar la ventana correcta para cada patrón.
+"""
+
+from collections import deque
+from itertools import product
+
+from bot_console.bar_features import BarFeatures, DIRECTION_LONG, DIRECTION_SHORT, DIRECTION_NONE
+from bot_console.candle_patterns import CandlePatterns1M, PATTERN_NAMES
+
+L, S = DIRECTION_LONG, DIRECTION_SHORT
+ANY = None
+
+# Patrones de 1 a 3 velas: (nombre, direcciones exigidas de la más antigua a la actual, detector)
+# La dirección exigida permite descartar el patrón sin evaluarlo.
+WINDOW_PATTERNS = (
+    ("hanging_man", (ANY,), lambda p, w: p.is_hanging_man(w[-1])),
+    ("shooting_star", (ANY,), lambda p, w: p.is_shooting_star(w[-1])),
+    ("bearish_engulfing", (L, S), lambda p, w: p.is_bearish_engulfing(w[-2], w[-1])),
+    ("evening_star", (L, ANY, S), lambda p, w: p.is_evening_star(w[-3], w[-2], w[-1])),
+    ("three_black_crows", (S, S, S), lambda p, w: p.is_three_black_crows(w[-3], w[-2], w[-1])),
+    ("dark_cloud_cover", (L, S), lambda p, w: p.is_dark_cloud_cover(w[-2], w[-1])),
+    ("three_white_soldiers", (L, L, L), lambda p, w: p.is_three_white_soldiers(w[-3], w[-2], w[-1])),
+    ("morning_star", (S, ANY, L), lambda p, w: p.is_morning_star(w[-3], w[-2], w[-1])),
+    ("piercing_pattern", (S, L), lambda p, w: p.is_piercing_pattern(w[-2], w[-1])),
+    ("bullish_engulfing", (S, L), lambda p, w: p.is_bullish_engulfing(w[-2], w[-1])),
+    ("doji", (ANY,), lambda p, w: p.is_doji(w[-1])),
+    ("spinning_top", (ANY,), lambda p, w: p.is_spinning_top(w[-1])),
+    ("marubozu", (ANY,), lambda p, w: p.is_marubozu(w[-1])),
+    ("tweezer_bottoms", (S, L), lambda p, w: p.is_tweezer_bottoms(w[-2], w[-1])),
+    ("tweezer_tops", (L, S), lambda p, w: p.is_tweezer_tops(w[-2], w[-1])),
+    ("hammer", (ANY,), lambda p, w: p.is_hammer(w[-1])),
+    ("inverted_hammer", (ANY,), lambda p, w: p.is_inverted_hammer(w[-1])),
+)
+
+# Patrones sobre los 3 últimos máximos / mínimos locales
+SWING_TRIPLE_TOP = "swing_triple_top"
+SWING_TRIPLE_BOTTOM = "swing_triple_bottom"
+
+WINDOW_SIZE = 3
+DIRECTIONS = (L, S, DIRECTION_NONE)
+
+
+class PatternStream:
+    def __init__(self, patterns=PATTERN_NAMES, detector=None):
+        """
+        :param patterns: nombres de los patrones a detectar (por defecto los 19)
+        :param detector: instancia de CandlePatterns1M
+        """
+        unknown = set(patterns) - set(PATTERN_NAMES)
+        if unknown:
+            raise ValueError(f"Patrones desconocidos: {sorted(unknown)}")
+
+        self.detector = detector if detector is not None else CandlePatterns1M()
+        self.patterns = tuple(patterns)
+        self.window = deque(maxlen=WINDOW_SIZE)
+        self.peaks = deque(maxlen=3)    # últimos máximos locales (vela del máximo)
+        self.valleys = deque(maxlen=3)  # últimos mínimos locales
+        self.detect_tops = SWING_TRIPLE_TOP in self.patterns
+        self.detect_bottoms = SWING_TRIPLE_BOTTOM in self.patterns
+        self.num_bars = 0
+
+        # Tabla (nº de velas en la ventana, direcciones de las 3 últimas) -> patrones candidatos.
+        # En cada vela solo se evalúan los patrones cuya secuencia de direcciones encaja.
+        rules = [rule for rule in WINDOW_PATTERNS if rule[0] in self.patterns]
+        self.candidates = {}
+        for size in range(1, WINDOW_SIZE + 1):
+            for key in product(DIRECTIONS, repeat=size):
+                self.candidates[key] = tuple(
+                    (name, detect) for name, required, detect in rules
+                    if len(required) <= size and all(
+                        want is ANY or want == got
+                        for want, got in zip(required, key[size - len(required):])))
+
+    def reset(self):
+        """Vacía la ventana y los máximos / mínimos (p. ej. al cambiar de sesión)"""
+        self.window.clear()
+        self.peaks.clear()
+        self.valleys.clear()
+        self.num_bars = 0
+
+    def push(self, bar):
+        """
+        Añade una vela cerrada.
+        :return: lista con los nombres de los patrones que se completan en esta vela
+        """
+        features = BarFeatures.from_bar(bar)
+        window = self.window
+        window.append(features)
+        self.num_bars += 1
+
+        key = tuple(f.direction for f in window)
+        detector = self.detector
+        found = [name for name, detect in self.candidates[key] if detect(detector, window)]
+
+        if len(window) == WINDOW_SIZE and (self.detect_tops or self.detect_bottoms):
+            self.update_extremes(window, found)
+        return found
+
+    def update_extremes(self, window, found):
+        """
+        La vela central es un máximo (mínimo) local si supera a sus dos vecinas;
+        se confirma al cerrar la vela actual. Con tres máximos (mínimos)
+        se evalúa la triple formación.
+        """
+        left, middle, right = window
+        if self.detect_tops and middle.high > left.high and middle.high > right.high:
+            self.peaks.append(middle)
+            if len(self.peaks) == 3 and self.detector.is_triple_bearish_top(list(self.peaks)):
+                found.append(SWING_TRIPLE_TOP)
+        if self.detect_bottoms and middle.low < left.low and middle.low < right.low:
+            self.valleys.append(middle)
+            if len(self.valleys) == 3 and self.detector.is_triple_bullish_bottom(list(self.valleys)):
+                found.append(SWING_TRIPLE_BOTTOM)
@@ -1,42 +1,70 @@
-import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
 import time
 from scipy.stats import linregress
+from bot_console.bar_source import MT5BarSource, bar_time_to_datetime, rate_to_bar
+from bot_console.bar_cache import BarCache
+from bot_console.timeframe import get_mt5_timeframe, get_timeframe_seconds, TimeframeContext
 
 class CandleGenerator:
-    def __init__(self, symbol="EURUSD"):
+    def __init__(self, symbol="EURUSD", bar_source=None, history_n=2, cache_depth=50, timeframe=None,
+                 context_timeframes=()):
         """
         Inicializa el predictor con el símbolo y el tiempo de la última vela.
+        :param cache_depth: velas cerradas que se guardan en bar_cache para la estrategia
+        :param timeframe: timeframe de las velas de MT5 cuando no se pasa bar_source ("1", "M5", "H1"...)
+        :param context_timeframes: timeframes superiores ("5", "M15"...) que se construyen con las velas
+                                   ya descargadas, sin más llamadas al terminal (ver self.context)
         """
         self.symbol = symbol
+        if bar_source is None:
+            bar_source = MT5BarSource(symbol, timeframe=get_mt5_timeframe(timeframe))
+        self.bar_source = bar_source
+        self.history_n = history_n
         self.last_candle_time = None
+        self.bar_seconds = get_timeframe_seconds(timeframe)
+        self.bar_cache = BarCache(depth=cache_depth)
+        self.context = TimeframeContext(context_timeframes, base_seconds=get_timeframe_seconds(timeframe))
 
     def get_candles(self, n=None):
         """
-        Obtiene las últimas n velas cerradas
+        Obtiene las últimas n velas (incluida la vela en curso)
         """
         n = n or self.history_n
-        rates = mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_M1, 0, n)
-        if rates is None or len(rates) == 0:
-            raise RuntimeError(f"No se pudieron obtener velas para {self.symbol}")
-        df = pd.DataFrame(rates)
+        df = pd.DataFrame(self.bar_source.get_rates(0, n))
         df["time"] = pd.to_datetime(df["time"], unit="s")
         return df
 
     def check_new_candle(self):
         """
-        Verifica si hay una nueva vela cerrada
+        Verifica si hay una nueva vela cerrada.
+        Con la misma llamada al terminal alimenta bar_cache con la vela que acaba de cerrar;
+        si han cerrado varias desde la última consulta se piden todas.
         """
-        df = self.get_candles(2)
-        last_time = df["time"].iloc[-1]
+        rates = self.bar_source.get_rates(0, 2)  # [última cerrada, vela en curso]
+        last_time = bar_time_to_datetime(int(rates[-1]['time']))
 
         if self.last_candle_time is None:
             self.last_candle_time = last_time
+            # Primera llamada: se llena la caché con el histórico reciente
+            history = self.bar_source.get_last_bars(max(self.bar_cache.depth, self.context.warmup_bars))
+            self.bar_cache.extend(history)
+            self.context.extend(history)
             return False, last_time
 
         if last_time > self.last_candle_time:
+            # Normalmente 1; más si la consulta anterior se retrasó (reconexión,
+            # otros símbolos esperando a terminal_lock...)
+            closed = int((last_time - self.last_candle_time).total_seconds() // self.bar_seconds)
             self.last_candle_time = last_time
+            if closed > 1:
+                depth = max(self.bar_cache.depth, self.context.warmup_bars)
+                rates = self.bar_source.get_rates(0, min(closed, depth) + 1)
+            # Las velas ya guardadas (huecos sin cotización) las ignoran la caché y el contexto
+            for rate in rates[:-1]:
+                bar = rate_to_bar(rate)
+                self.bar_cache.push(bar)
+                self.context.push(bar)
             return True, last_time
 
         return False, last_time
@@ -46,11 +74,12 @@ class CandleGenerator:
         Retorna 'buy' si la última vela CERRADA es alcista,
         'sell' si es bajista, o 'neutral' si open == close.
         """
-        df = self.get_candles(3)  # pedimos 3 por seguridad
-        last_closed = df.iloc[-2]  # la penúltima vela está cerrada
+        last_closed = self.bar_cache.get_last_bar()
+        if last_closed is None:
+            last_closed = self.bar_source.get_last_bars(1)[-1]
 
-        open_price = last_closed['open']
-        close_price = last_closed['close']
+        open_price = last_closed.open
+        close_price = last_closed.close
 
         if close_price > open_price:
             return "LONG"
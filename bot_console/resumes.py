@@ -1,35 +1,181 @@
+import atexit
 import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 
+from bot_console.logger import INFO, DEBUG, WARNING, ERROR, DISABLED
+
+_STOP = object()  # marca de cierre para el hilo escritor
+
+
 class ResumeJsonL:
-    def __init__(self, strategy_name, blockMessages=False, buffer_size=50):
+    def __init__(self, strategy_name, blockMessages=False, buffer_size=50, flush_interval=1.0, max_queue=10000,
+                 level=INFO):
+        """
+        :param blockMessages: descarta todos los registros (equivale a level=DISABLED)
+        :param level: nivel mínimo que se guarda; log() registra con nivel INFO
+        :param buffer_size: líneas acumuladas que fuerzan una escritura
+        :param flush_interval: segundos máximos que una línea espera en memoria
+        :param max_queue: registros pendientes como máximo; si se llena se descartan (y se cuentan)
+        """
         self.strategy_name = strategy_name
         self.log_dir = os.path.join(os.path.dirname(__file__), 'resumes')
         os.makedirs(self.log_dir, exist_ok=True)
         self.log_path = os.path.join(self.log_dir, f"{strategy_name}.jsonl")
         self.blockMessages = blockMessages
-        self.buffer = []
+        self.level = DISABLED if blockMessages else level
         self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.dropped_lock = threading.Lock()  # el contador se suma aquí y se lee y pone a 0 en el escritor
+        self.closed = False
+        self.thread = None
+        self.lock = threading.Lock()
 
-    def _flush(self):
-        if not self.buffer:
-            return
-        with open(self.log_path, 'a', encoding='utf-8') as f:
-            f.write("\n".join(self.buffer) + "\n")
-        self.buffer = []
+    def start(self):
+        """Arranca el hilo escritor (se llama solo con el primer registro)"""
+        with self.lock:
+            if self.thread is not None or self.closed:
+                return
+            self.thread = threading.Thread(target=self._run, name=f"ResumeJsonL-{self.strategy_name}", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+
+    def is_enabled(self, level):
+        return level >= self.level
 
-    def log(self, data):
-        if self.blockMessages:
+    def log(self, data, level=INFO):
+        """Encola el registro; la serialización y la escritura ocurren en el hilo escritor"""
+        if level < self.level:
             return
         if not isinstance(data, dict):
             raise ValueError("Solo puedes guardar diccionarios en JSONL.")
-        
-        data["_time"] = datetime.now().isoformat()
-        self.buffer.append(json.dumps(data, ensure_ascii=False))
+        # Copia: el hilo escritor añade _time / message y el que llama puede reutilizar el dict
+        self._enqueue(dict(data), ())
+
+    def log_message(self, level, message, *args, type="info"):
+        """
+        Registra {"message": message % args, "type": type} si el nivel está
+        activo. El texto se forma en el hilo escritor, no en el que llama.
+        """
+        if level < self.level:
+            return
+        self._enqueue({"message": message, "type": type}, args)
+
+    def debug(self, message, *args, type="info"):
+        self.log_message(DEBUG, message, *args, type=type)
+
+    def info(self, message, *args, type="info"):
+        self.log_message(INFO, message, *args, type=type)
+
+    def warning(self, message, *args, type="warning"):
+        self.log_message(WARNING, message, *args, type=type)
+
+    def error(self, message, *args, type="error"):
+        self.log_message(ERROR, message, *args, type=type)
+
+    def _enqueue(self, data, args):
+        if self.closed:
+            return
+        if self.thread is None:
+            self.start()
+
+        try:
+            self.queue.put_nowait((time.time(), data, args))
+        except queue.Full:
+            # Nunca se bloquea el bucle de trading: se cuenta y se avisa en el fichero
+            with self.dropped_lock:
+                self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """Escribe lo pendiente y cierra el fichero (también se llama al salir del proceso)"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            thread = self.thread
+        atexit.unregister(self.close)
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            # Con la cola llena y el escritor parado no se bloquea la salida del proceso
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def _run(self):
+        try:
+            f = open(self.log_path, 'a', encoding='utf-8')
+        except OSError as e:
+            # Sin fichero no hay escritor: se dejan de encolar registros
+            self.closed = True
+            print(f"⚠️ No se pudo abrir {self.log_path}: {e}")
+            return
+        with f:
+            lines = []
+            last_flush = time.monotonic()
+            stop = False
+            while not stop:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+                try:
+                    record = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    record = None
+
+                if record is _STOP:
+                    stop = True
+                    # Lo que quede en la cola tras la marca de cierre también se escribe
+                    while True:
+                        try:
+                            record = self.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if record is not _STOP:
+                            lines.append(self._format_safe(record))
+                elif record is not None:
+                    lines.append(self._format_safe(record))
+
+                if self.dropped:
+                    with self.dropped_lock:
+                        dropped, self.dropped = self.dropped, 0
+                    lines.append(self._format_safe((time.time(), {
+                        "message": f"⚠️ {dropped} registros descartados (cola llena)", "type": "error"}, ())))
+
+                if lines and (stop or len(lines) >= self.buffer_size or
+                              time.monotonic() - last_flush >= self.flush_interval):
+                    try:
+                        f.write("\n".join(lines) + "\n")
+                        f.flush()
+                    except OSError as e:
+                        print(f"⚠️ No se pudieron escribir {len(lines)} registros en {self.log_path}: {e}")
+                    lines = []
+                if stop or not lines:
+                    last_flush = time.monotonic()
 
-        if len(self.buffer) >= self.buffer_size:
-            self._flush()
+    @staticmethod
+    def _format_safe(record):
+        """_format sin excepciones: si falla se guarda el mensaje sin formatear"""
+        try:
+            return ResumeJsonL._format(record)
+        except Exception as e:
+            timestamp, data, args = record
+            return json.dumps({
+                "message": str(data.get("message")) if isinstance(data, dict) else str(data),
+                "args": repr(args),
+                "type": "error",
+                "format_error": str(e),
+                "_time": datetime.fromtimestamp(timestamp).isoformat(),
+            }, ensure_ascii=False)
 
-    def __del__(self):
-        self._flush()
+    @staticmethod
+    def _format(record):
+        timestamp, data, args = record
+        if args:
+            data["message"] = data["message"] % args
+        data["_time"] = datetime.fromtimestamp(timestamp).isoformat()
+        return json.dumps(data, ensure_ascii=False, default=str)
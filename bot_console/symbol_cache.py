@@ -0,0 +1,84 @@
+"""
+Caché de metadatos de símbolos.
+Guarda point, digits, tamaño de contrato, modos de llenado y visibilidad
+de cada símbolo para no consultar symbol_info / symbol_select antes de
+cada orden. Se carga al arrancar y se refresca por tiempo o tras un error.
+"""
+
+import threading
+import time
+
+import MetaTrader5 as mt5
+
+from bot_console.terminal import terminal_lock
+
+# Bits de symbol_info().filling_mode
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+
+class SymbolSpec:
+    """Metadatos de un símbolo"""
+    __slots__ = ("symbol", "point", "digits", "contract_size", "filling_mode", "visible", "loaded_at")
+
+    def __init__(self, symbol, symbol_info):
+        self.symbol = symbol
+        self.point = symbol_info.point
+        self.digits = symbol_info.digits
+        self.contract_size = symbol_info.trade_contract_size or 100000
+        self.filling_mode = symbol_info.filling_mode
+        self.visible = symbol_info.visible
+        self.loaded_at = time.time()
+
+    def get_filling_type(self):
+        """Tipo de llenado para order_send: FOK si el símbolo lo admite, si no IOC o RETURN"""
+        if self.filling_mode & SYMBOL_FILLING_FOK:
+            return mt5.ORDER_FILLING_FOK
+        if self.filling_mode & SYMBOL_FILLING_IOC:
+            return mt5.ORDER_FILLING_IOC
+        return mt5.ORDER_FILLING_RETURN
+
+
+class SymbolCache:
+    def __init__(self, max_age=300):
+        """
+        :param max_age: segundos tras los que se vuelven a pedir los metadatos
+        """
+        self.max_age = max_age
+        self.specs = {}
+        self.lock = threading.Lock()
+
+    def load(self, symbols):
+        """Carga los metadatos de varios símbolos (al arrancar)"""
+        for symbol in symbols:
+            self.refresh(symbol)
+
+    def refresh(self, symbol):
+        """Pide de nuevo los metadatos al terminal; selecciona el símbolo si no está visible"""
+        with terminal_lock:
+            symbol_info = mt5.symbol_info(symbol)
+            if symbol_info is None:
+                return None
+
+            if not symbol_info.visible:
+                if not mt5.symbol_select(symbol, True):
+                    return None
+                symbol_info = mt5.symbol_info(symbol) or symbol_info
+
+        spec = SymbolSpec(symbol, symbol_info)
+        spec.visible = True
+        with self.lock:
+            self.specs[symbol] = spec
+        return spec
+
+    def get(self, symbol):
+        """Metadatos del símbolo (de la caché si no han caducado), o None si no existe"""
+        spec = self.specs.get(symbol)
+        if spec is None or time.time() - spec.loaded_at > self.max_age:
+            spec = self.refresh(symbol)
+        return spec
+
+    def invalidate(self, symbol):
+        """Descarta los metadatos del símbolo (p. ej. tras un error al operar)"""
+        with self.lock:
+            self.specs.pop(symbol, None)
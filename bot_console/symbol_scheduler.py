@@ -0,0 +1,142 @@
+"""
+Planificador de varios símbolos en un solo proceso.
+Cada símbolo tiene su propio SymbolTrader (generador con caché de velas,
+estrategia, reloj de velas y última predicción) y su propio hilo, que
+duerme hasta el cierre de su vela. Todos comparten la conexión a MT5
+(terminal_lock serializa las llamadas), la tabla de posiciones de
+MarketSimulator y el monitor de posiciones.
+"""
+
+import threading
+from datetime import datetime
+
+from bot_console.predict_candle import CandleGenerator
+from bot_console.candle_clock import CandleClock
+from bot_console.candle_stick_strategy import CandleStickStrategy
+from bot_console.logger import Logger
+from bot_console.resumes import ResumeJsonL
+from bot_console.market_order import MarketSimulator
+from bot_console.timeframe import get_timeframe_seconds
+
+logger = Logger()
+resume_logger = ResumeJsonL(f"symbol_scheduler_{datetime.now().strftime('%Y%m%d_%H%M%S')}", blockMessages=True)
+
+
+class SymbolTrader:
+    def __init__(self, symbol, volume, timeframe=None, cache_depth=50, bar_source=None, context_timeframes=()):
+        """
+        :param symbol: símbolo, ej. "EURUSD"
+        :param volume: volumen de cada operación
+        :param timeframe: timeframe de las velas ("1", "5", "M15", "H1"...; M1 por defecto)
+        :param cache_depth: velas cerradas en memoria para la estrategia
+        :param context_timeframes: timeframes superiores cuya tendencia debe acompañar ("5", "M15"...)
+        """
+        self.symbol = symbol
+        self.volume = volume
+        self.candle_generator = CandleGenerator(symbol=symbol, bar_source=bar_source, cache_depth=cache_depth,
+                                                timeframe=timeframe, context_timeframes=context_timeframes)
+        # La estrategia lee las velas de la caché que alimenta el generador (sin llamadas extra a MT5)
+        self.strategy = CandleStickStrategy(symbol=symbol, bar_source=self.candle_generator.bar_cache,
+                                            context=self.candle_generator.context)
+        self.candle_clock = CandleClock(self.candle_generator, timeframe_seconds=get_timeframe_seconds(timeframe))
+        self.last_prediction = None  # guarda la última predicción y su hora
+        self.last_processed_candle = None
+
+    def get_open_positions(self):
+        """Posiciones abiertas de este símbolo"""
+        return MarketSimulator.get_open_positions(self.symbol)
+
+    def run_once(self):
+        """Espera a la siguiente vela y la procesa"""
+        # Dejar preparadas las órdenes antes del cierre: en el cambio solo se sella el precio
+        MarketSimulator.prepare_orders(self.symbol, self.volume)
+
+        # Esperar al cierre de la vela (el reloj despierta justo en el cambio de vela)
+        new_candle, candle_time = self.candle_clock.wait_for_new_candle()
+        if new_candle:
+            self.on_new_candle(candle_time)
+
+    def on_new_candle(self, candle_time):
+        """Comprueba la predicción anterior, calcula la nueva y opera"""
+        symbol = self.symbol
+        logger.color_text(f"\n{'='*50}", "blue")
+        logger.color_text(f"🕯️ {symbol} | NUEVA VELA INICIADA: {candle_time.strftime('%H:%M:%S')}", "cyan")
+
+        # Si teníamos una predicción anterior, verificar si fue correcta
+        if self.last_prediction is not None:
+            prev_signal, prev_time = self.last_prediction
+
+            # Obtener la dirección real de la vela cerrada (la previa)
+            real_signal = self.candle_generator.get_signal_for_last_candle()
+
+            # Comparar
+            if real_signal == prev_signal:
+                logger.color_text(f"✅ {symbol} | La señal anterior fue correcta para vela {prev_time.strftime('%H:%M:%S')} → {real_signal}", "green")
+                resume_logger.log({"message": f"✅ {symbol} | La señal anterior fue correcta para vela {prev_time.strftime('%H:%M:%S')} → {real_signal}", "type": "info"})
+            else:
+                if (real_signal == "NEUTRAL" or prev_signal == "NEUTRAL"):
+                    logger.color_text(f"⚠️ {symbol} | Operación no realizada para vela {prev_time.strftime('%H:%M:%S')} → real={real_signal}, pred={prev_signal}", "yellow")
+                    resume_logger.log({"message": f"⚠️ {symbol} | Operación no realizada para vela {prev_time.strftime('%H:%M:%S')} → real={real_signal}, pred={prev_signal}", "type": "info"})
+                else:
+                    logger.color_text(f"❌ {symbol} | Señal incorrecta para vela {prev_time.strftime('%H:%M:%S')} → real={real_signal}, pred={prev_signal}", "red")
+                    resume_logger.log({"message": f"❌ {symbol} | Señal incorrecta para vela {prev_time.strftime('%H:%M:%S')} → real={real_signal}, pred={prev_signal}", "type": "error"})
+
+        # Obtener la señal para la nueva vela (con todas las velas cerradas desde la anterior)
+        predicted_signal, num_operation = self.strategy.get_signal_for_latest_candle()
+        logger.color_text(f"🔮 {symbol} | Operacion: {num_operation} | Señal predicha para vela {candle_time.strftime('%H:%M:%S')}: {predicted_signal}", "yellow")
+        resume_logger.log({"message": f"🔮 {symbol} | Operacion: {num_operation} | Señal predicha para vela {candle_time.strftime('%H:%M:%S')}: {predicted_signal}", "type": "info"})
+
+        # Guardar la predicción actual para comparar en la próxima iteración
+        self.last_prediction = (predicted_signal, candle_time)
+
+        # Evitar procesar la misma vela múltiples veces
+        if self.last_processed_candle != candle_time:
+            self.last_processed_candle = candle_time
+            MarketSimulator.strategy_success_order(symbol=symbol, volume=self.volume, signal=predicted_signal.upper())
+        else:
+            logger.color_text(f"⚠️ {symbol} | Vela ya procesada, evitando duplicado", "yellow")
+            resume_logger.log({"message": f"⚠️ {symbol} | Vela ya procesada, evitando duplicado", "type": "info"})
+
+
+class SymbolScheduler:
+    def __init__(self, symbols, volume, timeframe=None, cache_depth=50, retry_interval=1.0, context_timeframes=()):
+        """
+        :param symbols: lista de símbolos que se operan a la vez
+        :param retry_interval: espera tras un error antes de volver a intentarlo
+        """
+        self.traders = [SymbolTrader(symbol, volume, timeframe, cache_depth, context_timeframes=context_timeframes) for symbol in symbols]
+        self.retry_interval = retry_interval
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def start(self):
+        """Arranca un hilo por símbolo"""
+        self.stopped.clear()
+        for trader in self.traders:
+            thread = threading.Thread(target=self.run_trader, args=(trader,), name=f"SymbolTrader-{trader.symbol}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.color_text(f"📡 Operando {len(self.traders)} símbolos: {', '.join(t.symbol for t in self.traders)}", "blue")
+
+    def run_trader(self, trader):
+        while not self.stopped.is_set():
+            try:
+                trader.run_once()
+            except Exception as e:
+                logger.color_text(f"❌ {trader.symbol} | Error: {e}", "red")
+                resume_logger.log({"message": f"❌ {trader.symbol} | Error: {e}", "type": "error"})
+                self.stopped.wait(self.retry_interval)
+
+    def stop(self):
+        """Detiene los hilos al terminar la vela en curso (son daemon: no bloquean la salida)"""
+        self.stopped.set()
+
+    def run(self):
+        """Arranca los símbolos y bloquea hasta Ctrl+C"""
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self.threads):
+                self.stopped.wait(1.0)
+        except KeyboardInterrupt:
+            logger.color_text("\n🛑 Bot detenido por el usuario.", "red")
+            self.stop()
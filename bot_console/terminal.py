@@ -0,0 +1,12 @@
+"""
+Acceso serializado al terminal MetaTrader 5.
+La librería MetaTrader5 mantiene una única conexión por proceso y no es
+segura entre hilos: con varios símbolos (y el monitor de posiciones) en
+el mismo proceso, toda llamada al terminal se hace con terminal_lock.
+"""
+
+import threading
+
+# Reentrante: open_position / close_position agrupan tick + envío y llaman a
+# la caché de símbolos, que también lo toma
+terminal_lock = threading.RLock()
@@ -0,0 +1,270 @@
+"""
+Timeframes y remuestreo de velas.
+Convierte el valor de TIMEFRAME ("1", "5", "M15", "H1"...) a segundos y a
+la constante de MT5, y construye velas de timeframe superior a partir de
+velas M1: de una vez con NumPy (reduceat) para el histórico y vela a vela
+(BarResampler) para el modo en vivo. TimeframeContext da a la estrategia
+la tendencia de M5 / M15... sin pedir más velas al terminal.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from bot_console.bar_source import Bar, BarSource, MemoryBarSource
+from bot_console.bar_features import DIRECTION_LONG, DIRECTION_SHORT, DIRECTION_NONE
+
+try:
+    import MetaTrader5 as mt5
+except ImportError:  # Solo disponible en Windows; el remuestreo no lo necesita
+    mt5 = None
+
+BASE_SECONDS = 60  # los históricos y la fuente en vivo por defecto son M1
+
+# Minutos de cada timeframe (claves de TIMEFRAME en main.py / mainoff.py)
+TIMEFRAME_MINUTES = {
+    "M1": 1, "M5": 5, "M15": 15, "M30": 30,
+    "H1": 60, "H4": 240, "D1": 1440,
+}
+
+# Nombre de la constante de MetaTrader5 para cada timeframe
+MT5_TIMEFRAME_NAMES = {minutes: f"TIMEFRAME_{name}" for name, minutes in TIMEFRAME_MINUTES.items()}
+
+
+def get_timeframe_minutes(value):
+    """
+    Minutos de un timeframe: 5, "5", "M5" o "H1".
+    Con None devuelve 1 (M1).
+    """
+    if value is None:
+        return 1
+    if isinstance(value, str) and value.strip().upper() in TIMEFRAME_MINUTES:
+        return TIMEFRAME_MINUTES[value.strip().upper()]
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        minutes = None
+    if minutes not in MT5_TIMEFRAME_NAMES:
+        raise ValueError(f"Timeframe no soportado: {value} (minutos válidos: {sorted(MT5_TIMEFRAME_NAMES)})")
+    return minutes
+
+
+def get_timeframe_seconds(value):
+    return get_timeframe_minutes(value) * 60
+
+
+def get_timeframe_name(value):
+    minutes = get_timeframe_minutes(value)
+    return MT5_TIMEFRAME_NAMES[minutes][len("TIMEFRAME_"):]
+
+
+def get_mt5_timeframe(value):
+    """Constante de MetaTrader5 (mt5.TIMEFRAME_M5...) de un timeframe"""
+    if mt5 is None:
+        raise RuntimeError("MetaTrader5 no está disponible en este sistema")
+    return getattr(mt5, MT5_TIMEFRAME_NAMES[get_timeframe_minutes(value)])
+
+
+def resample_columns(time, open_, high, low, close, volume, seconds):
+    """
+    Agrupa velas en velas de `seconds` segundos (vectorizado).
+    Cada vela nueva empieza en un múltiplo de `seconds` (como MT5) y solo
+    contiene las velas que existen en el histórico: los huecos no generan
+    velas vacías. Las velas con algún precio a 0 se descartan.
+
+    :return: (time, open, high, low, close, volume) como arrays NumPy
+    """
+    time = np.asarray(time, dtype=np.int64)
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.int64)
+
+    valid = (open_ != 0) & (high != 0) & (low != 0) & (close != 0)
+    if not valid.all():
+        time, open_, high, low, close, volume = (
+            column[valid] for column in (time, open_, high, low, close, volume))
+    if len(time) == 0:
+        return time, open_, high, low, close, volume
+
+    buckets = time - time % seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(time)] - 1
+    return (
+        buckets[starts],
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends],
+        np.add.reduceat(volume, starts),
+    )
+
+
+def resample_source(source, timeframe):
+    """
+    Fuente de velas de `timeframe` construida a partir de una fuente M1.
+    Con M1 devuelve la misma fuente.
+    """
+    seconds = get_timeframe_seconds(timeframe)
+    if seconds == BASE_SECONDS:
+        return source
+    resampled = MemoryBarSource(*resample_columns(
+        source.time, source.open, source.high, source.low, source.close, source.volume, seconds))
+    resampled.csv_format = f"{getattr(source, 'csv_format', 'memory')}>{get_timeframe_name(timeframe)}"
+    return resampled
+
+
+class BarResampler:
+    """
+    Remuestreo incremental: recibe velas M1 cerradas y devuelve la vela del
+    timeframe superior en cuanto se cierra su última vela M1 (sin esperar a
+    la siguiente), o al llegar una vela de otro periodo si faltaba alguna.
+    """
+
+    def __init__(self, timeframe, base_seconds=BASE_SECONDS):
+        self.seconds = get_timeframe_seconds(timeframe)
+        self.base_seconds = base_seconds
+        self.current = None  # [time, open, high, low, close, volume] del periodo en curso
+
+    def push(self, bar):
+        """
+        Añade una vela cerrada.
+        :return: lista (0, 1 o 2 velas) de velas del timeframe superior cerradas
+        """
+        if bar.open == 0 or bar.high == 0 or bar.low == 0 or bar.close == 0:
+            return []
+        closed = []
+        bucket = bar.time - bar.time % self.seconds
+        current = self.current
+        if current is not None and bucket != current[0]:
+            closed.append(Bar(*current))
+            current = None
+        if current is None:
+            current = [bucket, bar.open, bar.high, bar.low, bar.close, bar.volume]
+        else:
+            current[2] = max(current[2], bar.high)
+            current[3] = min(current[3], bar.low)
+            current[4] = bar.close
+            current[5] += bar.volume
+        self.current = current
+
+        # Última vela M1 del periodo: la vela superior ya está cerrada
+        if bar.time + self.base_seconds >= bucket + self.seconds:
+            closed.append(Bar(*current))
+            self.current = None
+        return closed
+
+    def reset(self):
+        self.current = None
+
+
+class ResampledBarSource(BarSource):
+    """
+    Fuente de velas de timeframe superior sobre una fuente M1 en streaming
+    (MT5BarSource, BarCache...). get_last_bars remuestrea el histórico
+    reciente de una vez; iterar devuelve cada vela superior al cerrarse.
+    """
+
+    def __init__(self, bar_source, timeframe, base_seconds=BASE_SECONDS):
+        self.bar_source = bar_source
+        self.seconds = get_timeframe_seconds(timeframe)
+        self.base_seconds = base_seconds
+        self.timeframe = timeframe
+
+    def get_last_bars(self, n):
+        factor = self.seconds // self.base_seconds
+        bars = self.bar_source.get_last_bars((n + 1) * factor)
+        if not bars:
+            return []
+        columns = resample_columns(*zip(*bars), seconds=self.seconds)
+        resampled = [Bar(int(t), float(o), float(h), float(l), float(c), int(v)) for t, o, h, l, c, v in zip(*columns)]
+        # La última vela superior solo está cerrada si contiene su última vela M1
+        if resampled and bars[-1].time + self.base_seconds < resampled[-1].time + self.seconds:
+            resampled.pop()
+        return resampled[-n:]
+
+    def __iter__(self):
+        resampler = BarResampler(self.timeframe, self.base_seconds)
+        for bar in self.bar_source:
+            yield from resampler.push(bar)
+
+
+class TimeframeContext:
+    """
+    Velas de timeframes superiores (M5, M15...) construidas vela a vela con
+    las velas M1 que ya se han descargado: no hace llamadas al terminal.
+    La estrategia la consulta como contexto (tendencia superior).
+    """
+
+    def __init__(self, timeframes=(), depth=2, base_seconds=BASE_SECONDS):
+        """
+        :param timeframes: timeframes de contexto ("5", "M15", "H1"...)
+        :param depth: velas superiores cerradas que se guardan por timeframe
+        """
+        self.timeframes = tuple(get_timeframe_name(timeframe) for timeframe in timeframes)
+        self.base_seconds = base_seconds
+        self.depth = depth
+        self.resamplers = {name: BarResampler(name, base_seconds) for name in self.timeframes}
+        self.bars = {name: deque(maxlen=depth) for name in self.timeframes}
+        self.last_time = None
+
+    def __len__(self):
+        return len(self.timeframes)
+
+    @property
+    def warmup_bars(self):
+        """Velas base necesarias para tener `depth` velas cerradas del timeframe mayor"""
+        if not self.timeframes:
+            return 0
+        longest = max(get_timeframe_seconds(name) for name in self.timeframes)
+        return (self.depth + 1) * longest // self.base_seconds
+
+    def push(self, bar):
+        """Añade una vela M1 cerrada; ignora duplicados o velas más antiguas"""
+        if self.last_time is not None and bar.time <= self.last_time:
+            return False
+        self.last_time = bar.time
+        for name, resampler in self.resamplers.items():
+            self.bars[name].extend(resampler.push(bar))
+        return True
+
+    def extend(self, bars):
+        for bar in bars:
+            self.push(bar)
+
+    def get_bars(self, timeframe):
+        """Velas cerradas del timeframe (más antigua primero)"""
+        return list(self.bars[get_timeframe_name(timeframe)])
+
+    def get_trend(self, timeframe):
+        """Tendencia de las dos últimas velas cerradas del timeframe (como get_trend en M1)"""
+        bars = self.bars[get_timeframe_name(timeframe)]
+        if len(bars) < 2:
+            return DIRECTION_NONE
+        if bars[-1].close > bars[-2].close:
+            return DIRECTION_LONG
+        if bars[-1].close < bars[-2].close:
+            return DIRECTION_SHORT
+        return DIRECTION_NONE
+
+    def get_trends(self):
+        """{timeframe: tendencia} de todos los timeframes de contexto"""
+        return {name: self.get_trend(name) for name in self.timeframes}
+
+
+def get_context_trend(time, open_, high, low, close, timeframe, base_seconds=BASE_SECONDS):
+    """
+    Versión vectorizada de TimeframeContext.get_trend: para cada vela M1,
+    la tendencia de las dos últimas velas del timeframe cerradas al cerrar
+    esa vela (1 alcista, -1 bajista, 0 neutral o sin historia suficiente).
+    """
+    seconds = get_timeframe_seconds(timeframe)
+    time = np.asarray(time, dtype=np.int64)
+    htf_time, _, _, _, htf_close, _ = resample_columns(
+        time, open_, high, low, close, np.zeros(len(time), dtype=np.int64), seconds)
+    trend = np.zeros(len(htf_time), dtype=np.int8)
+    trend[1:] = np.sign(np.diff(htf_close))
+    # Última vela superior cerrada al cerrar cada vela M1
+    index = np.searchsorted(htf_time + seconds, time + base_seconds, side="right") - 1
+    return np.where(index >= 0, trend[np.maximum(index, 0)], 0).astype(np.int8)
@@ -1,14 +1,19 @@
+import os
+if os.getenv("FAKE_MT5"):
+    # Terminal falso con el histórico local (Linux, pruebas de carga y profiling):
+    # tiene que registrarse antes de cualquier import de MetaTrader5
+    from bot_console.fake_mt5 import install_from_env
+    install_from_env()
 import MetaTrader5 as mt5
 import sys
-import os
 import time
 import threading
 from datetime import datetime
-from bot_console.predict_candle import CandleGenerator
-from bot_console.candle_stick_strategy import CandleStickStrategy
 from bot_console.logger import Logger
 from bot_console.resumes import ResumeJsonL
 from bot_console.market_order import MarketSimulator
+from bot_console.symbol_scheduler import SymbolScheduler
+from bot_console.timeframe import get_timeframe_name
 
 # Añadir el directorio actual al path de Python
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -17,80 +22,31 @@ from bot_console.login import LoginMT5
 from bot_console.metatrader5 import MetaTrader5
 
 # Configuración desde variables de entorno
-timeframe_map = {
-    "1": mt5.TIMEFRAME_M1,
-    "5": mt5.TIMEFRAME_M5,
-    "15": mt5.TIMEFRAME_M15,
-    "30": mt5.TIMEFRAME_M30,
-    "60": mt5.TIMEFRAME_H1,
-    "240": mt5.TIMEFRAME_H4,
-    "1440": mt5.TIMEFRAME_D1
-}
+# TIMEFRAME en minutos (1, 5, 15, 30, 60, 240, 1440) o por nombre (M5, H1...)
 default_timeframe = os.getenv("TIMEFRAME", "1")
 symbol = os.getenv("SYMBOL", "EURUSD")
-timeframe = timeframe_map.get(default_timeframe, mt5.TIMEFRAME_M1)
+# Varios símbolos en el mismo proceso: SYMBOLS=EURUSD,GBPUSD,USDJPY
+symbols = [s.strip() for s in os.getenv("SYMBOLS", symbol).split(",") if s.strip()]
+# Timeframes superiores cuya tendencia debe acompañar a la señal: CONTEXT_TIMEFRAMES=5,15
+context_timeframes = [tf.strip() for tf in os.getenv("CONTEXT_TIMEFRAMES", "").split(",") if tf.strip()]
+cache_depth = int(os.getenv("CANDLE_CACHE_DEPTH", "50"))  # velas cerradas en memoria para la estrategia
 
 resume_logger = ResumeJsonL(f"main_{datetime.now().strftime('%Y%m%d_%H%M%S')}", blockMessages=True)
 logger = Logger()
-
-def strategy_sticks(candle_generator, candle_stick_strategy, last_processed_candle):
-    """
-    Estrategia sticks.
-    """
-    last_prediction = None  # guarda la última predicción y su hora
-
-    while True:
-        # Verificar si hay nueva vela
-        new_candle, candle_time = candle_generator.check_new_candle()
-
-        if new_candle:
-            logger.color_text(f"\n{'='*50}", "blue")
-            logger.color_text(f"🕯️ NUEVA VELA INICIADA: {candle_time.strftime('%H:%M:%S')}", "cyan")
-            
-
-            # Si teníamos una predicción anterior, verificar si fue correcta
-            if last_prediction is not None:
-                prev_signal, prev_time = last_prediction
-
-                # Obtener la dirección real de la vela cerrada (la previa)
-                real_signal = candle_generator.get_signal_for_last_candle()
-
-                # Comparar
-                if real_signal == prev_signal:
-                    logger.color_text(f"✅ La señal anterior fue correcta para vela {prev_time.strftime('%H:%M:%S')} → {real_signal}", "green")
-                    resume_logger.log({"message": f"✅ La señal anterior fue correcta para vela {prev_time.strftime('%H:%M:%S')} → {real_signal}", "type": "info"})
-                else:
-                    if (real_signal == "NEUTRAL" or prev_signal == "NEUTRAL"):
-                        logger.color_text(f"⚠️ Operación no realizada para vela {prev_time.strftime('%H:%M:%S')} → real={real_signal}, pred={prev_signal}", "yellow")
-                        resume_logger.log({"message": f"⚠️ Operación no realizada para vela {prev_time.strftime('%H:%M:%S')} → real={real_signal}, pred={prev_signal}", "type": "info"})
-                    else:
-                        logger.color_text(f"❌ Señal incorrecta para vela {prev_time.strftime('%H:%M:%S')} → real={real_signal}, pred={prev_signal}", "red")
-                        resume_logger.log({"message": f"❌ Señal incorrecta para vela {prev_time.strftime('%H:%M:%S')} → real={real_signal}, pred={prev_signal}", "type": "error"})
-
-            # Obtener la señal para la nueva vela
-            predicted_signal, num_operation = candle_stick_strategy.get_signal_for_new_candle()
-            logger.color_text(f"🔮Operacion: {num_operation} | Señal predicha para vela {candle_time.strftime('%H:%M:%S')}: {predicted_signal}", "yellow")
-            resume_logger.log({"message": f"🔮Operacion: {num_operation} | Señal predicha para vela {candle_time.strftime('%H:%M:%S')}: {predicted_signal}", "type": "info"})
-
-            # Guardar la predicción actual para comparar en la próxima iteración
-            last_prediction = (predicted_signal, candle_time)
-
-            # Evitar procesar la misma vela múltiples veces
-            if last_processed_candle != candle_time:
-                last_processed_candle = candle_time
-                MarketSimulator.strategy_success_order(symbol=symbol, volume=VOLUME, signal=predicted_signal.upper())    
-            else:
-                logger.color_text("⚠️ Vela ya procesada, evitando duplicado", "yellow")
-                resume_logger.log({"message": "⚠️ Vela ya procesada, evitando duplicado", "type": "info"})
-
-        time.sleep(1)
+try:
+    timeframe_name = get_timeframe_name(default_timeframe)
+except ValueError as e:
+    # Como el mapa original: un TIMEFRAME no soportado vuelve a M1 en lugar de abortar
+    logger.color_text(f"⚠️ {e}. Se usa M1", "yellow")
+    default_timeframe = "1"
+    timeframe_name = get_timeframe_name(default_timeframe)
 
 # Tu código principal modificado
 VOLUME = 5.0
 def main():
     """Función principal optimizada"""
     try:
-        logger.color_text("🚀 Iniciando Bot de Trading EURUSD 1M", "blue")
+        logger.color_text(f"🚀 Iniciando Bot de Trading {', '.join(symbols)} {timeframe_name}", "blue")
         logger.color_text("🎯 Estrategia: Operar al inicio de nueva vela basado en patrón de vela cerrada", "blue")
         
         login = LoginMT5()
@@ -105,14 +61,14 @@ def main():
         mt5_client = MetaTrader5()
         # mt5_client.getGlobalInfo()
 
-        # Inicializar modelo
+        # Metadatos de los símbolos (point, contrato, llenado) cargados una vez para las órdenes
+        MarketSimulator.symbol_cache.load(symbols)
+
+        # Inicializar modelo: un generador, estrategia y reloj por símbolo, una sola conexión
         logger.color_text("🔄 Inicializando modelo...", "blue")
-        candle_generator = CandleGenerator(symbol=symbol)
-        candle_stick_strategy = CandleStickStrategy(symbol=symbol)
-        
-        # Variable para controlar la última vela procesada
-        last_processed_candle = None
-        strategy_sticks(candle_generator, candle_stick_strategy, last_processed_candle)
+        scheduler = SymbolScheduler(symbols, volume=VOLUME, timeframe=default_timeframe, cache_depth=cache_depth,
+                                    context_timeframes=context_timeframes)
+        scheduler.run()
 
     except Exception as e:
         logger.color_text(f"❌ Error: {e}", "red")
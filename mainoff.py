@@ -1,6 +1,11 @@
+import os
+if os.getenv("FAKE_MT5"):
+    # Terminal falso con el histórico local (Linux, pruebas de carga y profiling):
+    # tiene que registrarse antes de cualquier import de MetaTrader5
+    from bot_console.fake_mt5 import install_from_env
+    install_from_env()
 import MetaTrader5 as mt5
 import sys
-import os
 import io
 import time
 import threading
@@ -10,6 +15,11 @@ from bot_console.logger import Logger
 from bot_console.market_order import MarketSimulator
 from offline.candle import CandleGeneratorOffline
 from offline.candle_stick import CandleStickOffline
+from offline.backtest import CandleStickBacktest
+from offline.trade_sim import simulate_trades, summarize_trades, print_trade_summary
+from offline.candle_store import open_bar_source
+from bot_console.timeframe import get_timeframe_name, get_timeframe_seconds, TimeframeContext
+from bot_console.bar_source import CandleCursor
 from bot_console.login import LoginMT5
 
 # Configurar stdout para UTF-8
@@ -20,24 +30,26 @@ sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Configuración desde variables de entorno
-timeframe_map = {
-    "1": mt5.TIMEFRAME_M1,
-    "5": mt5.TIMEFRAME_M5,
-    "15": mt5.TIMEFRAME_M15,
-    "30": mt5.TIMEFRAME_M30,
-    "60": mt5.TIMEFRAME_H1,
-    "240": mt5.TIMEFRAME_H4,
-    "1440": mt5.TIMEFRAME_D1
-}
+# TIMEFRAME en minutos (1, 5, 15, 30, 60, 240, 1440) o por nombre (M5, H1...):
+# los CSV son M1 y se remuestrean al timeframe pedido
 default_timeframe = os.getenv("TIMEFRAME", "1")
 symbol = os.getenv("SYMBOL", "EURUSD")
 volumen = os.getenv("VOLUME", "5.0")
-timeframe = timeframe_map.get(default_timeframe, mt5.TIMEFRAME_M1)
+# Timeframes superiores cuya tendencia debe acompañar a la señal: CONTEXT_TIMEFRAMES=5,15
+context_timeframes = [tf.strip() for tf in os.getenv("CONTEXT_TIMEFRAMES", "").split(",") if tf.strip()]
+offline_engine = os.getenv("OFFLINE_ENGINE", "vector")  # "vector" (todas las velas a la vez) o "loop" (vela a vela)
 file_path_chart = "offline/csv/chart.csv"
 file_path_chart_year = "offline/csv_years/DATA_M1_2024.csv"
 
 
 logger = Logger()
+try:
+    timeframe_name = get_timeframe_name(default_timeframe)
+except ValueError as e:
+    # Como el mapa original: un TIMEFRAME no soportado vuelve a M1 en lugar de abortar
+    logger.color_text(f"⚠️ {e}. Se usa M1", "yellow")
+    default_timeframe = "1"
+    timeframe_name = get_timeframe_name(default_timeframe)
 
 def strategy_sticks(candle_generator, candle_stick_strategy, last_processed_candle):
     """
@@ -119,22 +131,56 @@ def strategy_sticks(candle_generator, candle_stick_strategy, last_processed_cand
         num_candles += 1
         time.sleep(0.001)
 
+def strategy_sticks_vectorized(path, timeframe=None, context_timeframes=()):
+    """
+    Estrategia sticks sobre todo el fichero de una vez (motor vectorizado).
+    """
+    backtest = CandleStickBacktest(path, timeframe=timeframe, context_timeframes=context_timeframes)
+    backtest.run()
+    summary = backtest.get_summary()
+
+    logger.color_text("✅ Se han procesado todas las velas del CSV", "green")
+    logger.color_text(f"================== RESUMEN ============================", "blue")
+    logger.color_text(f"Numero de velas procesadas: {summary['num_candles']}", "blue")
+    logger.color_text(f"✅ Operaciones Correctas: {summary['num_success']} ", "green")
+    logger.color_text(f"❌ Operaciones Incorrectas: {summary['num_fails']} ", "red")
+    logger.color_text(f"⚠️ Operaciones No Realizadas: {summary['num_neutral']} ", "yellow")
+    logger.color_text(f"=======================================================", "blue")
+
+    # Resultado de las operaciones con el SL / TP / cierre por tiempo de MarketSimulator
+    trades = simulate_trades(backtest.signals, backtest.time, backtest.open, backtest.high, backtest.low,
+                             backtest.close, bar_seconds=backtest.bar_seconds)
+    trade_summary = summarize_trades(trades, volume=VOLUME)
+    print_trade_summary(trade_summary, printer=lambda message: logger.color_text(message, "blue"))
+    summary["trades"] = trade_summary
+    return summary
+
 # VOLUMEN
 VOLUME = float(volumen)
 
 def main():
     """Función principal optimizada"""
     try:
-        logger.color_text("🚀 Iniciando Bot de Trading EURUSD 1M", "blue")
+        logger.color_text(f"🚀 Iniciando Bot de Trading {symbol} {timeframe_name}", "blue")
         logger.color_text("🎯 Estrategia: Operar al inicio de nueva vela basado en patrón de vela cerrada", "blue")
         
         logger.color_text("✅ Trabajando offline", "green")
 
         # Inicializar modelo
         logger.color_text("🔄 Inicializando modelo...", "blue")
+
+        if offline_engine == "vector":
+            strategy_sticks_vectorized(file_path_chart_year, timeframe=default_timeframe,
+                                       context_timeframes=context_timeframes)
+            return
         
-        candle_generator = CandleGeneratorOffline(file_path_chart_year)
-        candle_stick_strategy = CandleStickOffline(file_path_chart_year)
+        # Un único conjunto de velas y un único cursor para el generador y la estrategia
+        bar_source = open_bar_source(file_path_chart_year, timeframe=default_timeframe)
+        logger.color_text(f"Loaded {len(bar_source)} candles from {file_path_chart_year} (format: {bar_source.csv_format})", "blue")
+        cursor = CandleCursor(bar_source)
+        candle_generator = CandleGeneratorOffline(cursor=cursor)
+        context = TimeframeContext(context_timeframes, base_seconds=get_timeframe_seconds(default_timeframe))
+        candle_stick_strategy = CandleStickOffline(cursor=cursor, context=context)
         
         # Variable para controlar la última vela procesada
         last_processed_candle = None
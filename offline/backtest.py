@@ -0,0 +1,277 @@
+"""
+Motor de backtest vectorizado para la estrategia ULTRACONSERV.
+Calcula la señal y el código de motivo (P10/P01-BLOCK-*) de todas
+las velas a la vez con columnas NumPy, con el mismo resultado que
+recorrer el CSV vela a vela con CandleStickOffline.
+"""
+
+import numpy as np
+
+from bot_console.pattern_stats import load_wick_stats
+from bot_console.timeframe import get_context_trend, get_timeframe_seconds
+from offline.candle_store import open_bar_source
+from offline.candle_stick import (
+    SIGNAL_NONE, SIGNAL_LONG, SIGNAL_SHORT,
+    ULTRACONSERV_STATS, MIN_BODY, MIN_STAT_CONF,
+)
+
+# Direcciones codificadas como enteros
+DIR_LONG = 1
+DIR_SHORT = -1
+DIR_NONE = 0
+
+DIRECTION_NAMES = {DIR_LONG: SIGNAL_LONG, DIR_SHORT: SIGNAL_SHORT, DIR_NONE: SIGNAL_NONE}
+SIGNAL_DIRECTIONS = {name: code for code, name in DIRECTION_NAMES.items()}
+
+# Clave de patrón (has_up, has_low) → índice 0..3
+PATTERN_KEYS = [(False, False), (False, True), (True, False), (True, True)]
+
+# Códigos de motivo, en el mismo orden en que se evalúan los filtros
+REASON_INIT = 0
+REASON_BOTHWICKS = 1
+REASON_NOWICKS = 2
+REASON_SMALLBODY = 3
+REASON_LOWSTAT = 4
+REASON_PREVCONTRA = 5
+REASON_TREND = 6
+REASON_HTFTREND = 7
+REASON_BEARCANDLE = 8
+REASON_BULLCANDLE = 9
+REASON_NOREJECTLOW = 10
+REASON_NOREJECTHIGH = 11
+REASON_ULTRACONSERV = 12
+
+REASON_SUFFIXES = {
+    REASON_BOTHWICKS: "BLOCK-BOTHWICKS",
+    REASON_NOWICKS: "BLOCK-NOWICKS",
+    REASON_SMALLBODY: "BLOCK-SMALLBODY",
+    REASON_LOWSTAT: "BLOCK-LOWSTAT",
+    REASON_PREVCONTRA: "BLOCK-PREVCONTRA",
+    REASON_TREND: "BLOCK-TREND",
+    REASON_HTFTREND: "BLOCK-HTFTREND",
+    REASON_BEARCANDLE: "BLOCK-BEARCANDLE",
+    REASON_BULLCANDLE: "BLOCK-BULLCANDLE",
+    REASON_NOREJECTLOW: "BLOCK-NOREJECTLOW",
+    REASON_NOREJECTHIGH: "BLOCK-NOREJECTHIGH",
+    REASON_ULTRACONSERV: "ULTRACONSERV",
+}
+
+
+def get_directions(open_, close):
+    """Dirección de cada vela: 1 alcista, -1 bajista, 0 neutral"""
+    return np.sign(close - open_).astype(np.int8)
+
+
+def get_pattern_stats(stats=ULTRACONSERV_STATS):
+    """
+    Resume la tabla de estadística por clave de patrón:
+    (ids, dirección estadística, confianza), indexados como PATTERN_KEYS.
+    """
+    ids, stat_dirs, stat_confs = [], [], []
+    for key in PATTERN_KEYS:
+        s = stats[key]
+        total = s["LONG"] + s["SHORT"] + s["NEUTRAL"]
+        stat_signal = max(["LONG", "SHORT", "NEUTRAL"], key=lambda x: s[x])
+        ids.append(s["id"])
+        stat_dirs.append(SIGNAL_DIRECTIONS[stat_signal])
+        stat_confs.append(s[stat_signal] / total)
+    return ids, np.array(stat_dirs, dtype=np.int8), np.array(stat_confs)
+
+
+def compute_ultraconserv_signals(open_, high, low, close,
+                                 stats=ULTRACONSERV_STATS,
+                                 min_body=MIN_BODY,
+                                 min_stat_conf=MIN_STAT_CONF,
+                                 require_prev=True,
+                                 require_trend=True,
+                                 require_rejection=True,
+                                 context_trends=()):
+    """
+    MODELO ULTRA CONSERVADOR vectorizado.
+    La señal de la posición i se calcula con la vela i como última cerrada
+    y la vela i-1 como penúltima, igual que get_signal_for_new_candle.
+    Con require_prev / require_trend / require_rejection a False se desactivan
+    los filtros PREVCONTRA / TREND / NOREJECT* (para barridos de parámetros).
+    context_trends son las tendencias de los timeframes superiores por vela
+    (timeframe.get_context_trend); sin ellas no se aplica HTFTREND.
+
+    :return: (signals, pattern_keys, reasons) como arrays int8:
+             dirección predicha, índice en PATTERN_KEYS y código de motivo
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    # Velas con algún precio a 0 se tratan como datos inválidos (sin mechas, señal neutral)
+    valid = (open_ != 0) & (high != 0) & (low != 0) & (close != 0)
+
+    # --- Mechas y cuerpo
+    upper_wick = high - np.maximum(open_, close)
+    lower_wick = np.minimum(open_, close) - low
+    has_up = (upper_wick > 0) & valid
+    has_low = (lower_wick > 0) & valid
+    body = np.where(valid, np.abs(close - open_), 0.0)
+
+    direction = get_directions(open_, close)
+    direction[~valid] = DIR_NONE
+
+    # --- Vela previa y tendencia (close actual vs close previo)
+    prev_direction = np.empty(n, dtype=np.int8)
+    prev_direction[0] = DIR_NONE
+    prev_direction[1:] = direction[:-1]
+
+    trend = np.zeros(n, dtype=np.int8)
+    trend[1:] = np.sign(close[1:] - close[:-1])
+
+    # --- Estadística por clave de patrón
+    pattern_keys = (has_up.astype(np.int8) << 1) | has_low.astype(np.int8)
+    _, key_dirs, key_confs = get_pattern_stats(stats)
+    stat_dir = key_dirs[pattern_keys]
+    stat_conf = key_confs[pattern_keys]
+
+    is_long = stat_dir == DIR_LONG
+    is_short = stat_dir == DIR_SHORT
+
+    # --- ULTRA FILTROS, en el mismo orden que el modelo vela a vela
+    prev_contra = (is_long & (prev_direction == DIR_SHORT)) | (is_short & (prev_direction == DIR_LONG))
+    trend_contra = (is_long & (trend != DIR_LONG)) | (is_short & (trend != DIR_SHORT))
+    context_contra = np.zeros(n, dtype=bool)
+    for context_trend in context_trends:
+        context_contra |= (is_long & (context_trend != DIR_LONG)) | (is_short & (context_trend != DIR_SHORT))
+    conditions = [
+        has_up & has_low,
+        ~has_up & ~has_low,
+        body < min_body,
+        stat_conf < min_stat_conf,
+        prev_contra if require_prev else np.zeros(n, dtype=bool),
+        trend_contra if require_trend else np.zeros(n, dtype=bool),
+        context_contra,
+        is_long & (direction == DIR_SHORT),
+        is_short & (direction == DIR_LONG),
+        (is_long & ~(has_low & ~has_up)) if require_rejection else np.zeros(n, dtype=bool),
+        (is_short & ~(has_up & ~has_low)) if require_rejection else np.zeros(n, dtype=bool),
+    ]
+    choices = list(range(REASON_BOTHWICKS, REASON_NOREJECTHIGH + 1))
+    reasons = np.select(conditions, choices, default=REASON_ULTRACONSERV).astype(np.int8)
+
+    signals = np.where(reasons == REASON_ULTRACONSERV, stat_dir, DIR_NONE).astype(np.int8)
+
+    # La primera vela no tiene penúltima
+    if n > 0:
+        reasons[0] = REASON_INIT
+        signals[0] = DIR_NONE
+
+    return signals, pattern_keys, reasons
+
+
+def evaluate_predictions(signals, directions):
+    """
+    Compara la señal predicha con la vela siguiente, como mainoff.py:
+    correcta si coinciden, no realizada si alguna es NEUTRAL, incorrecta si no.
+    """
+    pred = signals[:-1]
+    real = directions[1:]
+    success = pred == real
+    neutral = ~success & ((pred == DIR_NONE) | (real == DIR_NONE))
+    fails = ~success & ~neutral
+    return {
+        "num_candles": int(len(signals)),
+        "num_success": int(success.sum()),
+        "num_fails": int(fails.sum()),
+        "num_neutral": int(neutral.sum()),
+    }
+
+
+def evaluate_trades(signals, directions):
+    """
+    Resultado solo de las velas con operación (señal LONG / SHORT):
+    ganada si la vela siguiente va en la misma dirección, perdida si va
+    en contra y plana si es NEUTRAL.
+    """
+    pred = signals[:-1]
+    real = directions[1:]
+    trades = pred != DIR_NONE
+    wins = trades & (pred == real)
+    flats = trades & (real == DIR_NONE)
+    num_trades = int(trades.sum())
+    num_wins = int(wins.sum())
+    return {
+        "num_trades": num_trades,
+        "num_wins": num_wins,
+        "num_losses": num_trades - num_wins - int(flats.sum()),
+        "num_flat": int(flats.sum()),
+        "win_rate": num_wins / num_trades if num_trades else 0.0,
+    }
+
+
+class CandleStickBacktest:
+    def __init__(self, path=None, candles=None, stats=None,
+                 min_body=MIN_BODY, min_stat_conf=MIN_STAT_CONF, timeframe=None, context_timeframes=()):
+        """
+        :param path: CSV de velas (chart.csv o DATA_M1_*.csv) o fichero .candles
+        :param candles: fuente de velas ya cargada (alternativa a path)
+        :param timeframe: timeframe al que se remuestrean las velas M1 de path ("5", "M15", "H1"...)
+        :param context_timeframes: timeframes superiores cuya tendencia debe acompañar ("5", "M15"...)
+        :param stats: tabla de mechas; por defecto la de CANDLE_STATS o ULTRACONSERV_STATS
+        """
+        self.stats = stats if stats is not None else load_wick_stats(default=ULTRACONSERV_STATS)
+        self.min_body = min_body
+        self.min_stat_conf = min_stat_conf
+
+        self.signals = None
+        self.pattern_keys = None
+        self.reasons = None
+
+        if candles is None:
+            candles = open_bar_source(path, timeframe=timeframe)
+            print(f"CandleStickBacktest: Loaded {len(candles)} candles (format: {candles.csv_format})")
+
+        self.num_candles = len(candles)
+        self.time = candles.time
+        self.bar_seconds = get_timeframe_seconds(timeframe)
+        self.open = candles.open
+        self.high = candles.high
+        self.low = candles.low
+        self.close = candles.close
+        self.context_trends = [
+            get_context_trend(candles.time, self.open, self.high, self.low, self.close, context_timeframe,
+                              base_seconds=get_timeframe_seconds(timeframe))
+            for context_timeframe in context_timeframes
+        ]
+
+    def run(self):
+        """Calcula señal y motivo para todas las velas"""
+        self.signals, self.pattern_keys, self.reasons = compute_ultraconserv_signals(
+            self.open, self.high, self.low, self.close,
+            stats=self.stats, min_body=self.min_body, min_stat_conf=self.min_stat_conf,
+            context_trends=self.context_trends,
+        )
+        return self.signals
+
+    def get_signal_names(self):
+        """Señales como texto (LONG / SHORT / NEUTRAL)"""
+        if self.signals is None:
+            self.run()
+        names = np.array([DIRECTION_NAMES[DIR_SHORT], DIRECTION_NAMES[DIR_NONE], DIRECTION_NAMES[DIR_LONG]], dtype=object)
+        return names[self.signals + 1]
+
+    def get_reason_codes(self):
+        """Códigos de motivo como texto (P10-BLOCK-LOWSTAT, P01-ULTRACONSERV, INIT...)"""
+        if self.reasons is None:
+            self.run()
+        ids, _, _ = get_pattern_stats(self.stats)
+        num_reasons = REASON_ULTRACONSERV + 1
+        labels = np.empty(len(PATTERN_KEYS) * num_reasons, dtype=object)
+        for k, pattern_id in enumerate(ids):
+            labels[k * num_reasons + REASON_INIT] = "INIT"
+            for code, suffix in REASON_SUFFIXES.items():
+                labels[k * num_reasons + code] = f"{pattern_id}-{suffix}"
+        return labels[self.pattern_keys.astype(np.intp) * num_reasons + self.reasons]
+
+    def get_summary(self):
+        """Resumen de operaciones correctas / incorrectas / no realizadas"""
+        if self.signals is None:
+            self.run()
+        return evaluate_predictions(self.signals, get_directions(self.open, self.close))
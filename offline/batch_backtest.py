@@ -0,0 +1,262 @@
+"""
+Backtest por lotes de la estrategia ULTRACONSERV.
+Recibe directorios o patrones glob con ficheros de velas por símbolo y año
+(EURUSD_M1_2024.csv, EURUSD/2019.candles...), reparte los ficheros entre
+procesos con el motor vectorizado y une los resúmenes de cada fichero
+(correctas / incorrectas / no realizadas, operaciones, P&L en pips y
+desglose por patrón de mechas y por patrón de vela) en un solo informe.
+"""
+
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from bot_console.candle_patterns import scan_patterns, PATTERN_NAMES
+from bot_console.pattern_stats import load_wick_stats
+from bot_console.timeframe import get_timeframe_name
+from offline.backtest import (
+    compute_ultraconserv_signals, evaluate_predictions, evaluate_trades, get_directions,
+    get_pattern_stats, DIR_NONE,
+)
+from offline.candle_stick import ULTRACONSERV_STATS, MIN_BODY, MIN_STAT_CONF
+from offline.candle_store import open_bar_source, STORE_EXTENSION
+
+CANDLE_EXTENSIONS = (".csv", STORE_EXTENSION, ".parquet")
+
+# Conteos que se suman al unir resúmenes
+SUM_FIELDS = ("num_candles", "num_success", "num_fails", "num_neutral",
+              "num_trades", "num_wins", "num_losses", "num_flat")
+
+# Datos del proceso (los prepara init_worker una vez por proceso)
+_worker = {}
+
+
+def get_files(inputs):
+    """
+    Ficheros de velas a partir de directorios, patrones glob o rutas.
+    Si existen fichero.csv y fichero.candles solo se usa el CSV
+    (open_bar_source ya abre su .candles).
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = [os.path.join(root, name) for root, _, names in os.walk(item) for name in names]
+        else:
+            matches = glob.glob(item, recursive=True)
+        files.extend(path for path in matches if os.path.splitext(path)[1].lower() in CANDLE_EXTENSIONS)
+
+    files = sorted(set(files))
+    csv_stems = {os.path.splitext(path)[0] for path in files if path.lower().endswith(".csv")}
+    return [path for path in files
+            if not (path.lower().endswith(STORE_EXTENSION) and os.path.splitext(path)[0] in csv_stems)]
+
+
+def get_symbol(path):
+    """Símbolo del nombre del fichero (EURUSD_M1_2024.csv) o de su directorio (EURUSD/2024.csv)"""
+    for part in (os.path.basename(path), os.path.basename(os.path.dirname(path))):
+        match = re.search(r"(?<![A-Z])[A-Z]{6}(?![A-Z])", os.path.splitext(part)[0])
+        if match:
+            return match.group(0)
+    return "?"
+
+
+def get_year(path):
+    match = re.search(r"(?<!\d)(19|20)\d{2}(?!\d)", os.path.basename(path))
+    return int(match.group(0)) if match else None
+
+
+def get_pip_size(symbol):
+    """Tamaño del pip: 0.01 en pares con JPY, 0.0001 en el resto"""
+    return 0.01 if "JPY" in symbol else 0.0001
+
+
+def init_worker(stats, params, timeframe=None):
+    _worker["stats"] = stats
+    _worker["params"] = params
+    _worker["timeframe"] = timeframe
+
+
+def run_file(path):
+    """Backtest de un fichero (se ejecuta en el proceso)"""
+    start = time.perf_counter()
+    symbol = get_symbol(path)
+    candles = open_bar_source(path, build_store=True, timeframe=_worker["timeframe"])
+    open_, high, low, close = candles.open, candles.high, candles.low, candles.close
+    stats = _worker["stats"]
+
+    signals, pattern_keys, _ = compute_ultraconserv_signals(open_, high, low, close, stats=stats, **_worker["params"])
+    directions = get_directions(open_, close)
+
+    result = {"path": path, "symbol": symbol, "year": get_year(path)}
+    result.update(evaluate_predictions(signals, directions))
+    result.update(evaluate_trades(signals, directions))
+
+    # P&L de cada operación: se entra en la apertura de la vela siguiente y se sale en su cierre
+    # (sin contar las operaciones cuya vela siguiente tiene algún precio a 0)
+    valid = (open_ != 0) & (high != 0) & (low != 0) & (close != 0)
+    trades = np.flatnonzero((signals[:-1] != DIR_NONE) & valid[1:])
+    pips = signals[trades] * (close[trades + 1] - open_[trades + 1]) / get_pip_size(symbol)
+    won = pips > 0
+    result["pnl_pips"] = float(pips.sum())
+
+    # Desglose por patrón de mechas (P00..P11) y por patrón de vela en la vela de la señal
+    ids, _, _ = get_pattern_stats(stats)
+    by_wick = {}
+    for index, pattern_id in enumerate(ids):
+        selected = pattern_keys[trades] == index
+        by_wick[pattern_id] = [int(selected.sum()), int((selected & won).sum()), float(pips[selected].sum())]
+    by_pattern = {}
+    if len(trades):
+        matrix = scan_patterns(open_, high, low, close)[trades]
+        for index, name in enumerate(PATTERN_NAMES):
+            selected = matrix[:, index]
+            if selected.any():
+                by_pattern[name] = [int(selected.sum()), int((selected & won).sum()), float(pips[selected].sum())]
+    result["by_wick"] = by_wick
+    result["by_pattern"] = by_pattern
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def merge_summaries(results):
+    """Une resúmenes de fichero: suma conteos, P&L y desgloses"""
+    merged = {field: sum(r[field] for r in results) for field in SUM_FIELDS}
+    merged["pnl_pips"] = sum(r["pnl_pips"] for r in results)
+    merged["win_rate"] = merged["num_wins"] / merged["num_trades"] if merged["num_trades"] else 0.0
+    merged["num_files"] = len(results)
+    for breakdown in ("by_wick", "by_pattern"):
+        total = {}
+        for r in results:
+            for name, (trades, wins, pips) in r[breakdown].items():
+                row = total.setdefault(name, [0, 0, 0.0])
+                row[0] += trades
+                row[1] += wins
+                row[2] += pips
+        merged[breakdown] = total
+    return merged
+
+
+def run_batch(inputs, workers=None, stats=None, min_body=MIN_BODY, min_stat_conf=MIN_STAT_CONF,
+              require_rejection=True, timeframe=None, output=None):
+    """
+    Backtest de todos los ficheros repartidos entre procesos.
+
+    :param inputs: directorios, patrones glob o ficheros de velas
+    :param timeframe: timeframe al que se remuestrean las velas M1 ("5", "M15", "H1"...)
+    :param output: fichero JSON donde se guarda el informe completo
+    :return: informe {"files": [...], "symbols": {símbolo: resumen}, "total": resumen}
+    """
+    files = get_files(inputs)
+    if not files:
+        print("⚠️ No se encontraron ficheros de velas")
+        return None
+
+    stats = stats if stats is not None else load_wick_stats(default=ULTRACONSERV_STATS)
+    params = {"min_body": min_body, "min_stat_conf": min_stat_conf, "require_rejection": require_rejection}
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    print(f"📦 Backtest por lotes: {len(files)} ficheros con {workers} procesos")
+
+    start = time.perf_counter()
+    results = []
+    if workers == 1:
+        init_worker(stats, params, timeframe)
+        finished = (run_file(path) for path in files)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(stats, params, timeframe))
+        futures = [executor.submit(run_file, path) for path in files]
+        finished = (future.result() for future in as_completed(futures))
+    try:
+        for result in finished:
+            results.append(result)
+            print(f"   ✅ {result['path']}: {result['num_candles']} velas, {result['num_trades']} ops, "
+                  f"{result['pnl_pips']:+.1f} pips ({result['seconds']:.2f} s)")
+    finally:
+        if workers > 1:
+            executor.shutdown()
+    print(f"⏱️ {time.perf_counter() - start:.1f} s")
+
+    results.sort(key=lambda r: (r["symbol"], r["year"] or 0, r["path"]))
+    symbols = {}
+    for r in results:
+        symbols.setdefault(r["symbol"], []).append(r)
+    report = {
+        "params": params,
+        "timeframe": get_timeframe_name(timeframe),
+        "files": results,
+        "symbols": {symbol: merge_summaries(rows) for symbol, rows in symbols.items()},
+        "total": merge_summaries(results),
+    }
+    print_report(report)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Informe guardado en {output}")
+    return report
+
+
+def format_row(name, summary):
+    return (f"{name[-28:]:<28} {summary['num_candles']:>9} {summary['num_success']:>9} {summary['num_fails']:>11} "
+            f"{summary['num_neutral']:>13} | {summary['num_trades']:>6} {summary['win_rate'] * 100:>6.2f} "
+            f"{summary['pnl_pips']:>+10.1f}")
+
+
+def print_breakdown(title, breakdown):
+    print(f"{title:<28} {'ops':>6} {'ganadas':>7} {'win%':>6} {'pips':>10}")
+    for name, (trades, wins, pips) in sorted(breakdown.items(), key=lambda item: -item[1][0]):
+        if trades:
+            print(f"{name:<28} {trades:>6} {wins:>7} {wins / trades * 100:>6.2f} {pips:>+10.1f}")
+
+
+def print_report(report):
+    header = (f"{'fichero / símbolo':<28} {'velas':>9} {'correctas':>9} {'incorrectas':>11} "
+              f"{'no realizadas':>13} | {'ops':>6} {'win%':>6} {'pips':>10}")
+    print("================== BACKTEST POR LOTES ==================")
+    print(header)
+    for r in report["files"]:
+        name = os.path.join(os.path.basename(os.path.dirname(r["path"])), os.path.basename(r["path"]))
+        print(format_row(name, r))
+    print("-" * len(header))
+    for symbol, summary in report["symbols"].items():
+        print(format_row(f"{symbol} ({summary['num_files']} ficheros)", summary))
+    print("-" * len(header))
+    print(format_row("TOTAL", report["total"]))
+    print()
+    print_breakdown("patrón de mechas", report["total"]["by_wick"])
+    print()
+    print_breakdown("patrón de vela", report["total"]["by_pattern"])
+    print("=======================================================")
+
+
+if __name__ == "__main__":
+    # Uso: python -m offline.batch_backtest DIR|GLOB|fichero [...] [--workers N] [--min-body X] [--min-conf X] [--no-rejection] [--timeframe M5] [--json informe.json]
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python -m offline.batch_backtest DIR|GLOB|fichero [...] [--workers N] [--min-body X] "
+              "[--min-conf X] [--no-rejection] [--timeframe M5] [--json informe.json]")
+        sys.exit(1)
+
+    options, inputs = {}, []
+    values = iter(args)
+    for arg in values:
+        if arg == "--no-rejection":
+            options[arg] = True
+        elif arg.startswith("--"):
+            options[arg] = next(values)
+        else:
+            inputs.append(arg)
+
+    run_batch(
+        inputs,
+        workers=int(options.get("--workers", 0)) or None,
+        min_body=float(options.get("--min-body", MIN_BODY)),
+        min_stat_conf=float(options.get("--min-conf", MIN_STAT_CONF)),
+        require_rejection="--no-rejection" not in options,
+        timeframe=options.get("--timeframe"),
+        output=options.get("--json"),
+    )
@@ -1,65 +1,49 @@
-import pandas as pd
+from bot_console.bar_source import CandleCursor
+from offline.candle_store import open_bar_source
 
 SIGNAL_LONG = "LONG"
 SIGNAL_SHORT = "SHORT"
 SIGNAL_NONE = "NEUTRAL"
 
 class CandleGeneratorOffline:
-    def __init__(self, path):
-        self.pos_current_candle = 0  # empieza antes de la primera vela
-        self.candles = None
-        self.num_candles = 0
-
-        self.get_candles_from_csv(path)
-
-    def get_candles_from_csv(self, path):
-        """Carga las velas desde CSV - compatible con chart.csv y DATA_M1_2024.csv"""
-        try:
-            # Intentar cargar como chart.csv (con headers y comas)
-            self.candles = pd.read_csv(path)
-            # Verificar si tiene las columnas esperadas
-            if 'Open' in self.candles.columns and 'Close' in self.candles.columns:
-                self.csv_format = 'chart'
-            else:
-                raise ValueError("No standard headers found")
-        except:
-            # Cargar como DATA_M1_2024.csv (sin headers y con punto y coma)
-            self.candles = pd.read_csv(path, sep=';', header=None, 
-                                     names=['DateTime', 'Open', 'High', 'Low', 'Close', 'Volume'])
-            self.csv_format = 'data_m1'
-        
-        self.num_candles = len(self.candles)
-        print(f"Loaded {self.num_candles} candles from {path} (format: {self.csv_format})")
+    def __init__(self, path=None, cursor=None, timeframe=None):
+        """
+        :param path: CSV de velas (chart.csv o DATA_M1_*.csv) o fichero .candles
+        :param cursor: CandleCursor compartido con la estrategia (alternativa a path).
+                       Con cursor compartido la vela real es la siguiente que
+                       consumirá la estrategia, sin un segundo contador.
+        :param timeframe: timeframe al que se remuestrean las velas M1 de path
+        """
+        self.shared_cursor = cursor is not None
+
+        if self.shared_cursor:
+            self.cursor = cursor
+        else:
+            bar_source = open_bar_source(path, timeframe=timeframe)
+            print(f"Loaded {len(bar_source)} candles from {path} (format: {bar_source.csv_format})")
+            self.cursor = CandleCursor(bar_source)
+            # La primera vela solo sirve de referencia: empieza antes de la primera predicción
+            next(self.cursor, None)
+
+        self.num_candles = len(self.cursor)
 
     def get_candles(self):
         """Devuelve la siguiente vela del CSV"""
-        self.pos_current_candle += 1
-
-        if self.pos_current_candle >= self.num_candles:
-            return None  # No más velas disponibles
-
-        return self.candles.iloc[self.pos_current_candle]
+        if self.shared_cursor:
+            return self.cursor.peek()
+        return next(self.cursor, None)  # None: no más velas disponibles
 
     def get_next_candle(self):
         """Procesa la siguiente vela y devuelve la señal"""
         new_candle = self.get_candles()
-        
+
         # Si no hay más velas, retornar None para indicar el final
         if new_candle is None:
             return None
 
-        try:
-            # Acceder a los precios de manera compatible con ambos formatos
-            open_price = new_candle["Open"]
-            close_price = new_candle["Close"]
-
-            if close_price > open_price:
-                return SIGNAL_LONG
-            elif close_price < open_price:
-                return SIGNAL_SHORT
-            else:
-                return SIGNAL_NONE
-        except (KeyError, TypeError) as e:
-            print(f"Error accessing candle data: {e}")
-            print(f"Candle columns: {new_candle.index if hasattr(new_candle, 'index') else 'No index'}")
+        if new_candle.close > new_candle.open:
+            return SIGNAL_LONG
+        elif new_candle.close < new_candle.open:
+            return SIGNAL_SHORT
+        else:
             return SIGNAL_NONE
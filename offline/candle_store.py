@@ -0,0 +1,203 @@
+"""
+Almacén columnar binario de velas.
+Convierte una sola vez los CSV (chart.csv / DATA_M1_*.csv) a un fichero
+.candles con columnas contiguas que después se abre con np.memmap, sin
+parsear nada: el arranque pasa de segundos a milisegundos y varios
+procesos comparten las mismas páginas de memoria.
+
+Formato (little endian):
+    cabecera de 64 bytes (HEADER_DTYPE)
+    time   int64[rows]      epoch en segundos
+    open   float64[rows] | int32[rows] (precio * scale)
+    high   ...
+    low    ...
+    close  ...
+    volume int64[rows]
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from bot_console.bar_source import CSVBarSource, ParquetBarSource, MemoryBarSource
+from bot_console.timeframe import resample_source
+
+STORE_EXTENSION = ".candles"
+STORE_MAGIC = b"CANDLES1"
+STORE_VERSION = 1
+
+PRICE_FLOAT64 = 0
+PRICE_INT32 = 1
+
+PRICE_DTYPES = {
+    PRICE_FLOAT64: np.dtype("<f8"),
+    PRICE_INT32: np.dtype("<i4"),
+}
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("price_kind", "<u4"),
+    ("rows", "<i8"),
+    ("scale", "<i8"),
+    ("reserved", "S32"),
+])
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+
+def get_store_path(csv_path):
+    """Ruta del .candles asociado a un CSV (mismo nombre, otra extensión)"""
+    return os.path.splitext(csv_path)[0] + STORE_EXTENSION
+
+
+def import_csv(csv_path, store_path=None, price_kind=PRICE_FLOAT64, digits=5):
+    """
+    Convierte un CSV de velas en un fichero .candles.
+
+    :param price_kind: PRICE_FLOAT64 (exacto) o PRICE_INT32 (precio escalado, la mitad de tamaño)
+    :param digits: decimales del símbolo para PRICE_INT32 (5 en EURUSD, 3 en USDJPY)
+    :return: ruta del fichero creado
+    """
+    store_path = store_path or get_store_path(csv_path)
+    return write_store(CSVBarSource(csv_path), store_path, price_kind=price_kind, digits=digits)
+
+
+def write_store(source, store_path, price_kind=PRICE_FLOAT64, digits=5):
+    """Escribe las columnas de una MemoryBarSource en formato .candles"""
+    scale = 10 ** digits if price_kind == PRICE_INT32 else 1
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = STORE_MAGIC
+    header["version"] = STORE_VERSION
+    header["price_kind"] = price_kind
+    header["rows"] = len(source)
+    header["scale"] = scale
+
+    # Se escribe en un temporal propio y se renombra: otro proceso nunca ve un fichero
+    # a medias, y dos procesos que crean el mismo .candles a la vez no se pisan
+    directory, file_name = os.path.split(store_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.splitext(file_name)[0] + ".", suffix=STORE_EXTENSION + ".tmp",
+                                    dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            header.tofile(f)
+            np.ascontiguousarray(source.time, dtype="<i8").tofile(f)
+            for name in PRICE_COLUMNS:
+                prices = getattr(source, name)
+                if price_kind == PRICE_INT32:
+                    prices = np.rint(prices * scale)
+                np.ascontiguousarray(prices, dtype=PRICE_DTYPES[price_kind]).tofile(f)
+            np.ascontiguousarray(source.volume, dtype="<i8").tofile(f)
+        os.chmod(tmp_path, 0o644)  # mkstemp lo crea solo para el propietario
+        os.replace(tmp_path, store_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    print(f"CandleStore: {len(source)} velas guardadas en {store_path}")
+    return store_path
+
+
+class CandleStore:
+    """Columnas de un fichero .candles abiertas con np.memmap (solo lectura)"""
+
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header["magic"][0] != STORE_MAGIC:
+            raise ValueError(f"{path} no es un fichero {STORE_EXTENSION}")
+        if header["version"][0] != STORE_VERSION:
+            raise ValueError(f"Versión de {path} no soportada: {header['version'][0]}")
+
+        self.rows = int(header["rows"][0])
+        self.price_kind = int(header["price_kind"][0])
+        self.scale = int(header["scale"][0])
+        price_dtype = PRICE_DTYPES[self.price_kind]
+
+        offset = HEADER_DTYPE.itemsize
+        self.time = self._map(np.dtype("<i8"), offset)
+        offset += self.rows * 8
+
+        self.raw_prices = {}
+        for name in PRICE_COLUMNS:
+            self.raw_prices[name] = self._map(price_dtype, offset)
+            offset += self.rows * price_dtype.itemsize
+
+        self.volume = self._map(np.dtype("<i8"), offset)
+
+    def _map(self, dtype, offset):
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=(self.rows,))
+
+    def __len__(self):
+        return self.rows
+
+    def get_prices(self, name):
+        """Columna de precios en float64 (sin copia si el fichero es PRICE_FLOAT64)"""
+        raw = self.raw_prices[name]
+        if self.price_kind == PRICE_FLOAT64:
+            return raw
+        return raw / self.scale
+
+
+class StoreBarSource(MemoryBarSource):
+    """Velas desde un fichero .candles mapeado en memoria"""
+
+    def __init__(self, path):
+        self.store = CandleStore(path)
+        self.csv_format = "store"
+        super().__init__(
+            self.store.time,
+            self.store.get_prices("open"),
+            self.store.get_prices("high"),
+            self.store.get_prices("low"),
+            self.store.get_prices("close"),
+            self.store.volume,
+        )
+
+
+def open_bar_source(path, build_store=None, timeframe=None):
+    """
+    Abre la fuente de velas adecuada según la extensión del fichero.
+    Para un CSV usa el .candles asociado si está al día. Solo lo crea si se
+    pide (build_store=True o CANDLE_STORE=1), así la primera ejecución parsea
+    el texto y las siguientes no; sin pedirlo no se escribe nada junto al CSV.
+    Con un timeframe superior a M1 devuelve las velas remuestreadas en memoria.
+    """
+    if build_store is None:
+        build_store = os.getenv("CANDLE_STORE") == "1"
+    if timeframe is not None:
+        return resample_source(open_bar_source(path, build_store), timeframe)
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == STORE_EXTENSION:
+        return StoreBarSource(path)
+    if extension == ".parquet":
+        return ParquetBarSource(path)
+
+    store_path = get_store_path(path)
+    store_is_fresh = os.path.exists(store_path) and os.path.getmtime(store_path) >= os.path.getmtime(path)
+    if not store_is_fresh and build_store:
+        try:
+            import_csv(path, store_path)
+            store_is_fresh = True
+        except OSError as e:
+            print(f"⚠️ No se pudo crear {store_path}: {e}")
+    if store_is_fresh:
+        return StoreBarSource(store_path)
+    return CSVBarSource(path)
+
+
+if __name__ == "__main__":
+    # Uso: python -m offline.candle_store fichero.csv [--int32] [--digits N]
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python -m offline.candle_store fichero.csv [--int32] [--digits N]")
+        sys.exit(1)
+    kind = PRICE_INT32 if "--int32" in args else PRICE_FLOAT64
+    num_digits = int(args[args.index("--digits") + 1]) if "--digits" in args else 5
+    import_csv(args[0], price_kind=kind, digits=num_digits)
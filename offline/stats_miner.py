@@ -0,0 +1,136 @@
+"""
+Minería de estadística de patrones.
+Cuenta, sobre uno o varios históricos (CSV, .candles o parquet), cómo fue
+la vela siguiente (LONG / SHORT / NEUTRAL) para cada configuración de
+mechas y para cada patrón de CandlePatterns1M, con conteos agrupados de
+NumPy (bincount / producto de matrices) en lugar de recorrer las velas.
+El resultado se guarda con bot_console.pattern_stats.save_stats.
+"""
+
+import sys
+
+import numpy as np
+
+from bot_console.candle_patterns import scan_patterns, PATTERN_NAMES
+from bot_console.pattern_stats import save_stats, STATS_PATH, OUTCOMES, WICK_IDS
+from offline.candle_store import open_bar_source
+
+# Índice de cada resultado en las tablas de conteo (orden de OUTCOMES)
+OUTCOME_LONG = 0
+OUTCOME_SHORT = 1
+OUTCOME_NEUTRAL = 2
+
+# Clave de mechas (has_up, has_low) -> índice has_up << 1 | has_low
+WICK_KEYS = [(False, False), (False, True), (True, False), (True, True)]
+
+
+def get_outcomes(open_, close):
+    """Resultado de cada vela como índice en OUTCOMES"""
+    outcomes = np.full(len(close), OUTCOME_NEUTRAL, dtype=np.intp)
+    outcomes[close > open_] = OUTCOME_LONG
+    outcomes[close < open_] = OUTCOME_SHORT
+    return outcomes
+
+
+def count_next_outcomes(open_, high, low, close, patterns=True):
+    """
+    Conteos de la vela siguiente para una serie de velas.
+    Se descartan los pares en que alguna de las dos velas tiene un precio a 0.
+
+    :return: (wick_counts [4 x 3], pattern_counts [patrones x 3] o None, velas usadas)
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    valid = (open_ != 0) & (high != 0) & (low != 0) & (close != 0)
+    pairs = valid[:-1] & valid[1:]  # vela i y su siguiente i+1
+
+    has_up = high - np.maximum(open_, close) > 0
+    has_low = np.minimum(open_, close) - low > 0
+    wick_keys = (has_up.astype(np.intp) << 1) | has_low.astype(np.intp)
+
+    next_outcomes = get_outcomes(open_, close)[1:]
+    cells = wick_keys[:-1] * len(OUTCOMES) + next_outcomes
+    wick_counts = np.bincount(cells[pairs], minlength=len(WICK_KEYS) * len(OUTCOMES))
+    wick_counts = wick_counts.reshape(len(WICK_KEYS), len(OUTCOMES))
+
+    pattern_counts = None
+    if patterns:
+        matrix = scan_patterns(open_, high, low, close)[:-1][pairs]
+        one_hot = np.eye(len(OUTCOMES), dtype=np.int64)[next_outcomes[pairs]]
+        pattern_counts = matrix.T.astype(np.int64) @ one_hot
+
+    return wick_counts, pattern_counts, int(pairs.sum())
+
+
+def get_wick_stats(wick_counts):
+    """Conteos [4 x 3] de count_next_outcomes como tabla de la estrategia (ULTRACONSERV_STATS)"""
+    wick_stats = {}
+    for index, key in enumerate(WICK_KEYS):
+        wick_stats[key] = {outcome: int(n) for outcome, n in zip(OUTCOMES, wick_counts[index])}
+        wick_stats[key]["id"] = WICK_IDS[key]
+    return wick_stats
+
+
+def mine_stats(paths, patterns=True, timeframe=None):
+    """
+    Suma los conteos de varios ficheros (cada uno se cuenta por separado:
+    no se empareja la última vela de un fichero con la primera del siguiente).
+
+    :return: (wick_stats, pattern_stats, velas usadas) en el formato de pattern_stats.py
+    """
+    wick_total = np.zeros((len(WICK_KEYS), len(OUTCOMES)), dtype=np.int64)
+    pattern_total = np.zeros((len(PATTERN_NAMES), len(OUTCOMES)), dtype=np.int64) if patterns else None
+    num_candles = 0
+
+    for path in paths:
+        source = open_bar_source(path, timeframe=timeframe)
+        wick_counts, pattern_counts, used = count_next_outcomes(
+            source.open, source.high, source.low, source.close, patterns=patterns)
+        wick_total += wick_counts
+        if patterns:
+            pattern_total += pattern_counts
+        num_candles += used
+        print(f"⛏️ {path}: {used} velas ({source.csv_format})")
+
+    wick_stats = get_wick_stats(wick_total)
+    pattern_stats = None
+    if patterns:
+        pattern_stats = {
+            name: {outcome: int(n) for outcome, n in zip(OUTCOMES, pattern_total[index])}
+            for index, name in enumerate(PATTERN_NAMES)
+        }
+    return wick_stats, pattern_stats, num_candles
+
+
+def build_stats_file(paths, output=STATS_PATH, patterns=True, timeframe=None):
+    """Mina los ficheros y escribe el fichero de estadística que cargan las estrategias"""
+    wick_stats, pattern_stats, num_candles = mine_stats(paths, patterns=patterns, timeframe=timeframe)
+    save_stats(output, wick_stats, pattern_stats, sources=paths, num_candles=num_candles)
+    print(f"📊 Estadística guardada en {output} ({num_candles} velas)")
+    for key, counts in wick_stats.items():
+        print(f"   {counts['id']} {key}: LONG={counts['LONG']} SHORT={counts['SHORT']} NEUTRAL={counts['NEUTRAL']}")
+    return output
+
+
+if __name__ == "__main__":
+    # Uso: python -m offline.stats_miner fichero.csv [fichero2.csv ...] [-o salida.json] [--no-patterns] [--timeframe M5]
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python -m offline.stats_miner fichero.csv [fichero2.csv ...] [-o salida.json] [--no-patterns] [--timeframe M5]")
+        sys.exit(1)
+    output_path = STATS_PATH
+    if "-o" in args:
+        i = args.index("-o")
+        output_path = args[i + 1]
+        del args[i:i + 2]
+    mine_timeframe = None
+    if "--timeframe" in args:
+        i = args.index("--timeframe")
+        mine_timeframe = args[i + 1]
+        del args[i:i + 2]
+    mine_patterns = "--no-patterns" not in args
+    files = [arg for arg in args if arg != "--no-patterns"]
+    build_stats_file(files, output_path, patterns=mine_patterns, timeframe=mine_timeframe)
@@ -0,0 +1,147 @@
+"""
+Barrido de parámetros de los filtros ULTRACONSERV.
+Evalúa una rejilla de umbrales (cuerpo mínimo, confianza estadística,
+filtros de tendencia, de vela previa y de rechazo) con el motor
+vectorizado, repartiendo las combinaciones entre varios procesos.
+Cada proceso abre el mismo fichero
+.candles con np.memmap en solo lectura: las velas no se copian ni se
+envían a los procesos, el sistema comparte las mismas páginas.
+"""
+
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from offline.backtest import (
+    compute_ultraconserv_signals, evaluate_predictions, evaluate_trades, get_directions,
+)
+from offline.candle_stick import ULTRACONSERV_STATS, MIN_BODY, MIN_STAT_CONF
+from offline.candle_store import open_bar_source, StoreBarSource
+from bot_console.pattern_stats import load_wick_stats
+
+# Rejilla por defecto: 8 x 7 x 2 x 2 x 2 = 448 combinaciones
+PARAM_GRID = {
+    "min_body": [0.0, 0.00001, 0.00002, 0.00003, MIN_BODY, 0.00006, 0.00008, 0.0001],
+    "min_stat_conf": [0.40, 0.45, 0.50, 0.52, MIN_STAT_CONF, 0.58, 0.60],
+    "require_trend": [True, False],
+    "require_prev": [True, False],
+    "require_rejection": [True, False],
+}
+
+# Datos del proceso (los prepara init_worker una vez por proceso)
+_worker = {}
+
+
+def get_combinations(grid=PARAM_GRID):
+    """Lista de combinaciones {parámetro: valor} de la rejilla"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def init_worker(source, stats):
+    """
+    Prepara el proceso: abre las velas (memmap si source es un .candles)
+    y calcula una sola vez las direcciones reales.
+    """
+    if isinstance(source, str):
+        candles = StoreBarSource(source)
+        open_, high, low, close = candles.open, candles.high, candles.low, candles.close
+    else:
+        open_, high, low, close = source
+    _worker["prices"] = (open_, high, low, close)
+    _worker["directions"] = get_directions(open_, close)
+    _worker["stats"] = stats
+
+
+def evaluate_combination(params):
+    """Señales y resultados de una combinación (se ejecuta en el proceso)"""
+    open_, high, low, close = _worker["prices"]
+    signals, _, _ = compute_ultraconserv_signals(open_, high, low, close, stats=_worker["stats"], **params)
+    result = dict(params)
+    result.update(evaluate_predictions(signals, _worker["directions"]))
+    result.update(evaluate_trades(signals, _worker["directions"]))
+    return result
+
+
+def run_sweep(path, grid=PARAM_GRID, workers=None, stats=None, chunksize=4, timeframe=None):
+    """
+    Evalúa todas las combinaciones de la rejilla sobre un fichero de velas.
+
+    :param workers: número de procesos (por defecto uno por CPU)
+    :param timeframe: timeframe al que se remuestrean las velas M1 ("5", "M15", "H1"...)
+    :return: lista de resultados (uno por combinación), en el orden de la rejilla
+    """
+    stats = stats if stats is not None else load_wick_stats(default=ULTRACONSERV_STATS)
+    candles = open_bar_source(path, build_store=True, timeframe=timeframe)  # crea el .candles la primera vez
+    if isinstance(candles, StoreBarSource):
+        source = candles.store.path  # los procesos solo reciben la ruta
+    else:  # velas remuestreadas (o de CSV sin .candles): se envían las columnas
+        source = (candles.open, candles.high, candles.low, candles.close)
+
+    combinations = get_combinations(grid)
+    workers = workers or os.cpu_count() or 1
+    print(f"🔁 Barrido: {len(combinations)} combinaciones sobre {len(candles)} velas "
+          f"({candles.csv_format}) con {workers} procesos")
+
+    start = time.perf_counter()
+    if workers == 1:
+        init_worker(source, stats)
+        results = [evaluate_combination(params) for params in combinations]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(source, stats)) as executor:
+            results = list(executor.map(evaluate_combination, combinations, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ {elapsed:.2f} s ({len(combinations) / elapsed * 3600:.0f} combinaciones/hora)")
+    return results
+
+
+def sort_results(results, key="win_rate", min_trades=1):
+    """Resultados con al menos min_trades operaciones, ordenados de mejor a peor"""
+    results = [r for r in results if r["num_trades"] >= min_trades]
+    return sorted(results, key=lambda r: (r[key], r["num_trades"]), reverse=True)
+
+
+def print_results(results, top=20):
+    print(f"{'min_body':>9} {'conf':>5} {'trend':>5} {'prev':>5} {'rech':>5} | "
+          f"{'ops':>6} {'ganadas':>7} {'perdidas':>8} {'planas':>6} {'win%':>6} | "
+          f"{'correctas':>9} {'incorrectas':>11} {'no realizadas':>13}")
+    for r in results[:top]:
+        print(f"{r['min_body']:>9.5f} {r['min_stat_conf']:>5.2f} {str(r['require_trend']):>5} "
+              f"{str(r['require_prev']):>5} {str(r['require_rejection']):>5} | "
+              f"{r['num_trades']:>6} {r['num_wins']:>7} "
+              f"{r['num_losses']:>8} {r['num_flat']:>6} {r['win_rate'] * 100:>6.2f} | "
+              f"{r['num_success']:>9} {r['num_fails']:>11} {r['num_neutral']:>13}")
+
+
+def save_results(results, path):
+    """Guarda todos los resultados en CSV"""
+    if not results:
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+if __name__ == "__main__":
+    # Uso: python -m offline.sweep fichero.csv [--workers N] [--top N] [--min-trades N] [--csv resultados.csv] [--timeframe M5]
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python -m offline.sweep fichero.csv [--workers N] [--top N] [--min-trades N] [--csv resultados.csv] [--timeframe M5]")
+        sys.exit(1)
+
+    def get_option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    sweep_results = run_sweep(args[0], workers=int(get_option("--workers", 0)) or None,
+                              timeframe=get_option("--timeframe"))
+    csv_path = get_option("--csv")
+    if csv_path:
+        save_results(sweep_results, csv_path)
+        print(f"💾 Resultados guardados en {csv_path}")
+    print_results(sort_results(sweep_results, min_trades=int(get_option("--min-trades", 30))),
+                  top=int(get_option("--top", 20)))
@@ -0,0 +1,432 @@
+"""
+Backtest de ejecución por ticks.
+Reproduce ticks bid/ask grabados con el mismo ExitEngine del modo en vivo
+(SL / TP / trailing del 10% desde el máximo / tiempo), así que el trailing
+y la asimetría bid/ask de open_long (ask) y open_short (bid) cuentan
+igual que en la cuenta real. Las señales salen de velas construidas con
+los propios ticks y el motor vectorizado de la estrategia.
+
+La ejecución se modela con:
+    spread:   el ask grabado, o bid + spread fijo en puntos
+    latencia: segundos fijos + reparto uniforme, entre la decisión y la
+              llegada de la orden (se ejecuta con la cotización vigente)
+    slippage: puntos fijos + reparto uniforme, siempre en contra
+
+Los ticks se guardan en columnas NumPy (time, bid, ask); la primera vez
+el CSV se convierte a un .ticks.npy que después se abre con np.memmap.
+El bucle solo recorre los tramos con posiciones abiertas y salta el resto
+con searchsorted, sin crear un objeto por tick.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bot_console.bar_source import MemoryBarSource
+from bot_console.exit_engine import ExitEngine, EXIT_TIME
+from bot_console.pattern_stats import load_wick_stats
+from offline.backtest import compute_ultraconserv_signals, DIR_NONE
+from offline.candle_stick import ULTRACONSERV_STATS
+from offline.trade_sim import (
+    summarize_trades, print_trade_summary, EXIT_CODES, SL_PIPS, TP_PIPS, MAX_SECONDS, POINT, CONTRACT_SIZE,
+)
+
+TICK_STORE_EXTENSION = ".ticks.npy"
+TICK_DTYPE = np.dtype([("time", "<f8"), ("bid", "<f8"), ("ask", "<f8")])
+
+# Valores por defecto de ExitEngine en MarketSimulator
+TRAILING_DROP = 0.10
+MIN_TRAILING_TICKS = 4
+
+
+def get_tick_store_path(csv_path):
+    """Ruta del .ticks.npy asociado a un CSV de ticks"""
+    return os.path.splitext(csv_path)[0] + TICK_STORE_EXTENSION
+
+
+def read_ticks_csv(path):
+    """
+    Carga ticks desde CSV.
+    Admite la exportación de ticks de MT5 (<DATE> <TIME> <BID> <ASK>...
+    separada por tabuladores, con BID / ASK vacíos cuando no cambian) y un
+    CSV genérico con columnas time,bid,ask (epoch en segundos o fecha).
+
+    :return: (time, bid, ask) como arrays float64, time en segundos
+    """
+    with open(path, encoding="utf-8") as f:
+        first_line = f.readline()
+
+    if first_line.startswith("<DATE>"):
+        ticks = pd.read_csv(path, sep="\t", usecols=["<DATE>", "<TIME>", "<BID>", "<ASK>"])
+        times = pd.to_datetime(ticks["<DATE>"] + " " + ticks["<TIME>"], format="%Y.%m.%d %H:%M:%S.%f")
+        bid, ask = ticks["<BID>"].ffill(), ticks["<ASK>"].ffill()
+    else:
+        ticks = pd.read_csv(path)
+        ticks.columns = [column.strip().lower() for column in ticks.columns]
+        if not {"time", "bid", "ask"} <= set(ticks.columns):
+            raise ValueError(f"Formato de CSV de ticks no reconocido: {path}")
+        times = ticks["time"]
+        if not pd.api.types.is_numeric_dtype(times):
+            times = pd.to_datetime(times)
+        bid, ask = ticks["bid"], ticks["ask"]
+
+    if not pd.api.types.is_numeric_dtype(times):
+        times = times.astype("datetime64[ms]").astype(np.int64) / 1000.0
+
+    # Antes de tener bid y ask no hay cotización completa
+    valid = (bid.notna() & ask.notna()).to_numpy()
+    return (np.asarray(times, dtype=np.float64)[valid],
+            bid.to_numpy(dtype=np.float64)[valid],
+            ask.to_numpy(dtype=np.float64)[valid])
+
+
+def import_ticks(csv_path, store_path=None):
+    """Convierte un CSV de ticks en un .ticks.npy (array estructurado TICK_DTYPE)"""
+    store_path = store_path or get_tick_store_path(csv_path)
+    times, bids, asks = read_ticks_csv(csv_path)
+    ticks = np.empty(len(times), dtype=TICK_DTYPE)
+    ticks["time"], ticks["bid"], ticks["ask"] = times, bids, asks
+
+    # Se escribe en un temporal propio y se renombra: otro proceso nunca ve un fichero
+    # a medias, y dos procesos que crean el mismo fichero a la vez no se pisan
+    directory, file_name = os.path.split(store_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=file_name.split(".")[0] + ".",
+                                    suffix=TICK_STORE_EXTENSION + ".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, ticks)
+        os.chmod(tmp_path, 0o644)  # mkstemp lo crea solo para el propietario
+        os.replace(tmp_path, store_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    print(f"TickStore: {len(ticks)} ticks guardados en {store_path}")
+    return store_path
+
+
+def open_ticks(path, build_store=True):
+    """
+    Columnas (time, bid, ask) de un fichero de ticks.
+    Para un CSV usa (y si hace falta crea) el .ticks.npy asociado, abierto
+    con np.memmap: solo la primera ejecución parsea el texto.
+    """
+    if path.lower().endswith(TICK_STORE_EXTENSION):
+        store_path = path
+    else:
+        store_path = get_tick_store_path(path)
+        store_is_fresh = os.path.exists(store_path) and os.path.getmtime(store_path) >= os.path.getmtime(path)
+        if not store_is_fresh:
+            if not build_store:
+                return read_ticks_csv(path)
+            import_ticks(path, store_path)
+    ticks = np.load(store_path, mmap_mode="r")
+    return ticks["time"], ticks["bid"], ticks["ask"]
+
+
+def ticks_to_bars(times, bids, bar_seconds=60):
+    """
+    Velas bid de `bar_seconds` segundos a partir de los ticks (vectorizado).
+    El volumen es el número de ticks de la vela, como tick_volume en MT5.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    bids = np.asarray(bids, dtype=np.float64)
+    if len(times) == 0:
+        return MemoryBarSource(*(np.empty(0),) * 5, np.empty(0, dtype=np.int64))
+
+    buckets = (times // bar_seconds).astype(np.int64) * bar_seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)]
+    return MemoryBarSource(
+        buckets[starts],
+        bids[starts],
+        np.maximum.reduceat(bids, starts),
+        np.minimum.reduceat(bids, starts),
+        bids[ends - 1],
+        (ends - starts).astype(np.int64),
+    )
+
+
+class ExecutionModel:
+    """Spread, latencia y slippage de las órdenes simuladas"""
+
+    def __init__(self, spread_pips=None, latency=0.0, latency_jitter=0.0,
+                 slippage_pips=0.0, slippage_jitter=0.0, point=POINT, seed=None):
+        """
+        :param spread_pips: spread fijo en puntos (None: el ask grabado)
+        :param latency: segundos desde la decisión hasta que la orden llega al servidor
+        :param latency_jitter: segundos extra, repartidos uniformemente entre 0 y este valor
+        :param slippage_pips: puntos en contra en cada ejecución
+        :param slippage_jitter: puntos extra en contra, repartidos uniformemente
+        :param seed: semilla de los repartos (mismo resultado en cada ejecución)
+        """
+        self.spread_pips = spread_pips
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.slippage_pips = slippage_pips
+        self.slippage_jitter = slippage_jitter
+        self.point = point
+        self.rng = np.random.default_rng(seed)
+
+    def get_asks(self, bids, asks):
+        if self.spread_pips is None:
+            return np.asarray(asks, dtype=np.float64)
+        return np.asarray(bids, dtype=np.float64) + self.spread_pips * self.point
+
+    def get_latencies(self, n):
+        latencies = np.full(n, float(self.latency))
+        if self.latency_jitter:
+            latencies += self.rng.uniform(0.0, self.latency_jitter, n)
+        return latencies
+
+    def get_slippages(self, n):
+        """Slippage de n ejecuciones en precio (siempre positivo: se aplica en contra)"""
+        slippages = np.full(n, float(self.slippage_pips))
+        if self.slippage_jitter:
+            slippages += self.rng.uniform(0.0, self.slippage_jitter, n)
+        return slippages * self.point
+
+
+class ReplayOrder:
+    """Orden simulada con los campos que usa ExitEngine (como MarketOrder)"""
+    __slots__ = ("symbol", "type", "price_open", "volume", "sl", "tp", "profit", "trade")
+
+    def __init__(self, symbol, order_type, price_open, volume, sl, tp, trade):
+        self.symbol = symbol
+        self.type = order_type
+        self.price_open = price_open
+        self.volume = volume
+        self.sl = sl
+        self.tp = tp
+        self.profit = 0.0
+        self.trade = trade  # índice de la operación en los arrays de resultado
+
+
+class TickReplay:
+    def __init__(self, times, bids, asks, execution=None, symbol="EURUSD", volume=1.0,
+                 sl_pips=SL_PIPS, tp_pips=TP_PIPS, max_seconds=MAX_SECONDS, point=POINT,
+                 contract_size=CONTRACT_SIZE, trailing_drop=TRAILING_DROP, min_trailing_ticks=MIN_TRAILING_TICKS):
+        """
+        :param times, bids, asks: columnas de ticks (time en segundos, ordenado)
+        :param execution: ExecutionModel (sin spread extra, latencia ni slippage por defecto)
+        """
+        self.execution = execution or ExecutionModel(point=point)
+        self.times = np.asarray(times, dtype=np.float64)
+        self.bids = np.asarray(bids, dtype=np.float64)
+        self.asks = self.execution.get_asks(self.bids, asks)
+        self.symbol = symbol
+        self.volume = volume
+        self.sl_pips = sl_pips
+        self.tp_pips = tp_pips
+        self.max_seconds = max_seconds
+        self.point = point
+        self.contract_size = contract_size
+        self.trailing_drop = trailing_drop
+        self.min_trailing_ticks = min_trailing_ticks
+
+    def get_quote_index(self, arrival_times):
+        """Índice del tick vigente cuando llega cada orden (-1 si aún no hay ticks)"""
+        return np.searchsorted(self.times, arrival_times, side="right") - 1
+
+    def run(self, decision_times, directions):
+        """
+        Ejecuta las órdenes y las sigue tick a tick hasta su cierre.
+
+        :param decision_times: segundo en que se decide cada orden (cierre de la vela de la señal)
+        :param directions: 1 LONG / -1 SHORT por orden
+        :return: dict de arrays por operación como simulate_trades (índices de tick
+                 en entry_index / exit_index) más entry_time / exit_time, en orden
+                 de llegada de las órdenes
+        """
+        decision_times = np.asarray(decision_times, dtype=np.float64)
+        directions = np.asarray(directions, dtype=np.int8)
+
+        # Entradas (vectorizado): el precio pedido es el tick vigente al decidir
+        # (SL / TP sobre él, como OrderTemplate) y la ejecución el vigente al llegar
+        arrival = decision_times + self.execution.get_latencies(len(decision_times))
+        order = np.argsort(arrival, kind="stable")  # con latencia variable pueden adelantarse
+        decision_times, directions, arrival = decision_times[order], directions[order], arrival[order]
+        request_index = self.get_quote_index(decision_times)
+        fill_index = self.get_quote_index(arrival)
+        usable = request_index >= 0
+        num_skipped = int((~usable).sum())
+        directions, arrival = directions[usable], arrival[usable]
+        request_index, fill_index = request_index[usable], fill_index[usable]
+
+        is_long = directions > 0
+        sign = directions.astype(np.float64)
+        request_price = np.where(is_long, self.asks[request_index], self.bids[request_index])
+        entry_price = (np.where(is_long, self.asks[fill_index], self.bids[fill_index])
+                       + sign * self.execution.get_slippages(len(directions)))
+        sl = request_price - sign * self.sl_pips * self.point
+        tp = request_price + sign * self.tp_pips * self.point
+
+        exit_time, exit_code = self.replay_exits(arrival, fill_index, is_long, entry_price, sl, tp)
+
+        # Salidas: se ejecutan con el tick vigente al llegar la orden de cierre
+        exit_index = self.get_quote_index(exit_time + self.execution.get_latencies(len(exit_time)))
+        exit_index = np.maximum(exit_index, fill_index)
+        exit_price = (np.where(is_long, self.bids[exit_index], self.asks[exit_index])
+                      - sign * self.execution.get_slippages(len(directions)))
+        pnl_pips = (exit_price - entry_price) * sign / self.point
+
+        return {
+            "entry_index": fill_index,
+            "exit_index": exit_index,
+            "entry_time": arrival,
+            "exit_time": exit_time,
+            "direction": directions,
+            "entry_price": entry_price,
+            "exit_price": exit_price,
+            "exit_code": exit_code,
+            "pnl_pips": pnl_pips,
+            "num_skipped": num_skipped,
+        }
+
+    def replay_exits(self, arrival, fill_index, is_long, entry_price, sl, tp):
+        """
+        Bucle de eventos: cada posición entra en ExitEngine al ejecutarse y
+        recibe los ticks posteriores. Sin posiciones abiertas se salta hasta
+        la siguiente entrada. El cierre por tiempo sin ticks se
+        aplica en el segundo exacto en que vence la posición.
+
+        :return: (exit_time, exit_code): segundo en que se decide el cierre de
+                 cada posición y su motivo (EXIT_CODES)
+        """
+        engine = ExitEngine(trailing_drop=self.trailing_drop, min_trailing_ticks=self.min_trailing_ticks,
+                            max_seconds=self.max_seconds)
+        symbol = self.symbol
+        num_trades = len(arrival)
+        num_ticks = len(self.times)
+        exit_time = np.empty(num_trades)
+        exit_code = np.full(num_trades, EXIT_CODES[EXIT_TIME], dtype=np.int8)
+
+        open_times = {}  # trade -> hora de apertura (para el próximo vencimiento)
+        orders = {}  # trade -> orden vigilada por el motor
+
+        def close(exits, decision_time):
+            for order, reason in exits:
+                exit_time[order.trade] = decision_time
+                exit_code[order.trade] = EXIT_CODES[reason]
+                del open_times[order.trade]
+                del orders[order.trade]
+
+        def expire(deadline):
+            # Se cierran directamente las posiciones que vencen en deadline: con
+            # max_seconds fraccionario on_clock puede no verlas vencidas por redondeo
+            # (deadline - open_time < max_seconds) y el bucle no avanzaría
+            due = [orders[trade] for trade, open_time in open_times.items()
+                   if open_time + self.max_seconds <= deadline]
+            for order in due:
+                engine.remove(order)
+            close([(order, EXIT_TIME) for order in due], deadline)
+
+        next_trade = 0
+        tick = 0
+        while next_trade < num_trades or open_times:
+            if not open_times:
+                tick = max(tick, int(fill_index[next_trade]) + 1)
+
+            # Entradas ejecutadas antes del tick actual
+            while next_trade < num_trades and fill_index[next_trade] < tick:
+                trade = next_trade
+                order = ReplayOrder(symbol, "long" if is_long[trade] else "short", float(entry_price[trade]), self.volume,
+                                    float(sl[trade]), float(tp[trade]), trade)
+                engine.add(order, self.contract_size, open_time=float(arrival[trade]))
+                open_times[trade] = float(arrival[trade])
+                orders[trade] = order
+                next_trade += 1
+
+            if tick >= num_ticks:
+                # Sin más ticks: lo que queda abierto se cierra por tiempo
+                for open_time in sorted(open_times.values()):
+                    deadline = open_time + self.max_seconds
+                    expire(deadline)
+                continue
+
+            # Tramo hasta el tick de la siguiente entrada (o hasta el final)
+            end = int(fill_index[next_trade]) + 1 if next_trade < num_trades else num_ticks
+            deadline = min(open_times.values()) + self.max_seconds
+            for tick_time, bid, ask in zip(self.times[tick:end].tolist(), self.bids[tick:end].tolist(),
+                                           self.asks[tick:end].tolist()):
+                tick += 1
+                # Vencimientos sin ticks entre medias: se cierran en su segundo exacto
+                while tick_time > deadline:
+                    expire(deadline)
+                    deadline = min(open_times.values()) + self.max_seconds if open_times else np.inf
+                if not open_times:
+                    tick -= 1  # el tick vuelve a contar para la siguiente entrada
+                    break
+                exits = engine.on_tick(symbol, tick_time, bid, ask)
+                if exits:
+                    close(exits, tick_time)
+                    if not open_times:
+                        break
+                    deadline = min(open_times.values()) + self.max_seconds
+        return exit_time, exit_code
+
+
+def run_tick_replay(path, execution=None, bar_seconds=60, require_rejection=True, **replay_options):
+    """
+    Backtest completo de un fichero de ticks: velas M1 bid con los ticks,
+    señales ULTRACONSERV vectorizadas y ejecución de cada señal al cierre
+    de su vela con TickReplay.
+
+    :param replay_options: symbol, volume, sl_pips, tp_pips, max_seconds, point... de TickReplay
+    :return: (trades, resumen de summarize_trades)
+    """
+    start = time.perf_counter()
+    times, bids, asks = open_ticks(path)
+    candles = ticks_to_bars(times, bids, bar_seconds)
+    signals, _, _ = compute_ultraconserv_signals(
+        candles.open, candles.high, candles.low, candles.close,
+        stats=load_wick_stats(default=ULTRACONSERV_STATS), require_rejection=require_rejection)
+
+    # La señal de la vela i se decide al cerrarse (la última vela no tiene siguiente)
+    entries = np.flatnonzero(signals[:-1] != DIR_NONE)
+    replay = TickReplay(times, bids, asks, execution=execution, **replay_options)
+    trades = replay.run(candles.time[entries] + bar_seconds, signals[entries])
+    summary = summarize_trades(trades, volume=replay.volume, contract_size=replay.contract_size, point=replay.point)
+
+    seconds = time.perf_counter() - start
+    print(f"⏱️ {len(times)} ticks ({len(candles)} velas) en {seconds:.2f} s "
+          f"→ {len(times) / seconds * 60 / 1e6:.1f} M ticks/min")
+    return trades, summary
+
+
+if __name__ == "__main__":
+    # Uso: python -m offline.tick_replay ticks.csv [--latency S] [--latency-jitter S] [--slippage N]
+    #      [--slippage-jitter N] [--spread N] [--sl N] [--tp N] [--max-seconds N] [--point X]
+    #      [--volume X] [--seed N] [--no-rejection]
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python -m offline.tick_replay ticks.csv [--latency S] [--latency-jitter S] [--slippage N] "
+              "[--slippage-jitter N] [--spread N] [--sl N] [--tp N] [--max-seconds N] [--point X] "
+              "[--volume X] [--seed N] [--no-rejection]")
+        sys.exit(1)
+
+    def get_option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    tick_point = float(get_option("--point", POINT))
+    spread = get_option("--spread")
+    model = ExecutionModel(
+        spread_pips=float(spread) if spread is not None else None,
+        latency=float(get_option("--latency", 0.0)),
+        latency_jitter=float(get_option("--latency-jitter", 0.0)),
+        slippage_pips=float(get_option("--slippage", 0.0)),
+        slippage_jitter=float(get_option("--slippage-jitter", 0.0)),
+        point=tick_point,
+        seed=int(get_option("--seed", 0)),
+    )
+    _, trade_summary = run_tick_replay(
+        args[0], execution=model, require_rejection="--no-rejection" not in args,
+        volume=float(get_option("--volume", 1.0)), point=tick_point,
+        sl_pips=float(get_option("--sl", SL_PIPS)), tp_pips=float(get_option("--tp", TP_PIPS)),
+        max_seconds=float(get_option("--max-seconds", MAX_SECONDS)),
+    )
+    print_trade_summary(trade_summary)
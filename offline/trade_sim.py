@@ -0,0 +1,199 @@
+"""
+Simulador vectorizado del resultado de las operaciones (P&L offline).
+A partir del array de señales y de las columnas OHLC resuelve la salida de
+cada operación como lo haría MarketSimulator en vivo: entrada en la
+apertura de la vela siguiente a la señal, SL / TP a sl_pips / tp_pips
+puntos y cierre por tiempo a los max_seconds segundos. Las velas
+siguientes se miran de una vez (matriz operaciones × velas), sin recorrer
+las operaciones una a una.
+
+Con velas no se puede saber el orden de los precios dentro de una vela:
+si SL y TP se tocan en la misma vela se cuenta el SL (criterio prudente),
+el cierre por tiempo usa el cierre de la última vela dentro del plazo y
+el trailing (caída del 10% del máximo) no se simula; para eso está la
+reproducción por ticks con ExitEngine.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from offline.backtest import compute_ultraconserv_signals, DIR_NONE
+from offline.candle_store import open_bar_source
+from offline.candle_stick import ULTRACONSERV_STATS
+from bot_console.exit_engine import EXIT_SL, EXIT_TP, EXIT_TIME, EXIT_TRAILING
+from bot_console.pattern_stats import load_wick_stats
+
+# Motivos de salida codificados como enteros (nombres de exit_engine)
+EXIT_CODE_SL = 0
+EXIT_CODE_TP = 1
+EXIT_CODE_TIME = 2
+EXIT_CODE_TRAILING = 3  # solo en la reproducción por ticks (offline/tick_replay.py)
+EXIT_NAMES = (EXIT_SL, EXIT_TP, EXIT_TIME, EXIT_TRAILING)
+EXIT_CODES = {name: code for code, name in enumerate(EXIT_NAMES)}
+
+# Valores por defecto de MarketSimulator.open_long / open_short y ExitEngine
+SL_PIPS = 200
+TP_PIPS = 300
+MAX_SECONDS = 49
+POINT = 0.00001  # EURUSD con 5 decimales
+CONTRACT_SIZE = 100000.0
+
+
+def simulate_trades(signals, time_, open_, high, low, close, sl_pips=SL_PIPS, tp_pips=TP_PIPS,
+                    max_seconds=MAX_SECONDS, point=POINT, spread_pips=0, bar_seconds=60):
+    """
+    Resuelve la salida de todas las operaciones.
+    La señal de la vela i abre en la apertura de la vela i+1; las velas
+    se consideran dentro del plazo si empiezan antes de max_seconds desde
+    la entrada (con huecos en el histórico el plazo se mide en tiempo).
+    Los precios de las velas son bid: los largos entran al ask
+    (bid + spread) y los cortos salen al ask.
+
+    :return: dict de arrays por operación: entry_index, exit_index, direction,
+             entry_price, exit_price, exit_code, pnl_pips, y num_skipped
+             (operaciones descartadas por velas con precios a 0)
+    """
+    time_ = np.asarray(time_, dtype=np.int64)
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    signals = np.asarray(signals)
+    n = len(close)
+
+    # Ventana de velas siguientes que puede durar una operación
+    horizon = max(int(np.ceil(max_seconds / bar_seconds)), 1)
+    entries = np.flatnonzero(signals[:n - 1] != DIR_NONE) + 1
+    window = entries[:, None] + np.arange(horizon)
+    in_range = window < n
+    window = np.minimum(window, n - 1)
+    in_time = in_range & (time_[window] - time_[entries][:, None] < max_seconds)
+    in_time[:, 0] = True  # la vela de entrada siempre cuenta
+
+    # Se descartan las operaciones con alguna vela inválida dentro del plazo
+    valid_bar = (open_ != 0) & (high != 0) & (low != 0) & (close != 0)
+    usable = np.all(valid_bar[window] | ~in_time, axis=1)
+    num_skipped = int((~usable).sum())
+    entries, window, in_time = entries[usable], window[usable], in_time[usable]
+
+    direction = signals[entries - 1].astype(np.int8)
+    is_long = direction > 0
+    sign = direction.astype(np.float64)
+    spread = spread_pips * point
+    entry_price = open_[entries] + np.where(is_long, spread, 0.0)
+    sl = entry_price - sign * sl_pips * point
+    tp = entry_price + sign * tp_pips * point
+
+    # Precio al que se cerraría cada posición: bid en largos, ask en cortos
+    exit_spread = np.where(is_long, 0.0, spread)[:, None]
+    worst = np.where(is_long[:, None], low[window], high[window] + exit_spread)
+    best = np.where(is_long[:, None], high[window], low[window] + exit_spread)
+    hit_sl = in_time & ((worst - sl[:, None]) * sign[:, None] <= 0)
+    hit_tp = in_time & ((best - tp[:, None]) * sign[:, None] >= 0)
+
+    # Primera vela que toca cada nivel (horizon si no se toca)
+    first_sl = np.where(hit_sl.any(axis=1), hit_sl.argmax(axis=1), horizon)
+    first_tp = np.where(hit_tp.any(axis=1), hit_tp.argmax(axis=1), horizon)
+    last_in_time = in_time.sum(axis=1) - 1
+
+    exit_code = np.full(len(entries), EXIT_CODE_TIME, dtype=np.int8)
+    exit_code[first_tp < horizon] = EXIT_CODE_TP
+    exit_code[(first_sl < horizon) & (first_sl <= first_tp)] = EXIT_CODE_SL  # misma vela: cuenta el SL
+    exit_offset = np.select([exit_code == EXIT_CODE_SL, exit_code == EXIT_CODE_TP],
+                            [first_sl, first_tp], default=last_in_time)
+    exit_index = entries + exit_offset
+
+    time_exit_price = close[exit_index] + np.where(is_long, 0.0, spread)
+    exit_price = np.select([exit_code == EXIT_CODE_SL, exit_code == EXIT_CODE_TP], [sl, tp], default=time_exit_price)
+    pnl_pips = (exit_price - entry_price) * sign / point
+
+    return {
+        "entry_index": entries,
+        "exit_index": exit_index,
+        "direction": direction,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "exit_code": exit_code,
+        "pnl_pips": pnl_pips,
+        "num_skipped": num_skipped,
+    }
+
+
+def get_max_drawdown(pnl):
+    """Máxima caída de la curva de resultados acumulados (en las mismas unidades que pnl)"""
+    if len(pnl) == 0:
+        return 0.0
+    equity = np.concatenate(([0.0], np.cumsum(pnl)))
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+def summarize_trades(trades, volume=1.0, contract_size=CONTRACT_SIZE, point=POINT):
+    """Resumen de simulate_trades: operaciones, % acierto, P&L, drawdown y salidas por motivo"""
+    pnl = trades["pnl_pips"]
+    money = pnl * point * contract_size * volume
+    wins = pnl > 0
+    losses = pnl < 0
+    gross_win = float(pnl[wins].sum())
+    gross_loss = float(-pnl[losses].sum())
+    num_trades = int(len(pnl))
+    return {
+        "num_trades": num_trades,
+        "num_wins": int(wins.sum()),
+        "num_losses": int(losses.sum()),
+        "hit_rate": float(wins.mean()) if num_trades else 0.0,
+        "pnl_pips": float(pnl.sum()),
+        "avg_pips": float(pnl.mean()) if num_trades else 0.0,
+        "pnl_money": float(money.sum()),
+        "max_drawdown_pips": get_max_drawdown(pnl),
+        "max_drawdown_money": get_max_drawdown(money),
+        "profit_factor": gross_win / gross_loss if gross_loss else float("inf") if gross_win else 0.0,
+        "exits": {name: int((trades["exit_code"] == code).sum()) for code, name in enumerate(EXIT_NAMES)},
+        "num_skipped": trades["num_skipped"],
+    }
+
+
+def print_trade_summary(summary, printer=print):
+    printer("================== OPERACIONES ==========================")
+    printer(f"Operaciones: {summary['num_trades']} (ganadas {summary['num_wins']}, perdidas {summary['num_losses']}, "
+            f"acierto {summary['hit_rate'] * 100:.2f}%)")
+    printer(f"P&L: {summary['pnl_pips']:+.1f} puntos ({summary['avg_pips']:+.2f} por operación), "
+            f"{summary['pnl_money']:+.2f} en dinero")
+    printer(f"Drawdown máximo: {summary['max_drawdown_pips']:.1f} puntos ({summary['max_drawdown_money']:.2f})")
+    printer(f"Profit factor: {summary['profit_factor']:.2f}")
+    printer("Salidas: " + ", ".join(f"{name}={count}" for name, count in summary["exits"].items()))
+    if summary["num_skipped"]:
+        printer(f"⚠️ {summary['num_skipped']} operaciones descartadas por velas sin precio")
+    printer("=======================================================")
+
+
+if __name__ == "__main__":
+    # Uso: python -m offline.trade_sim fichero.csv [--sl N] [--tp N] [--max-seconds N] [--spread N]
+    #      [--point X] [--volume X] [--timeframe M5] [--no-rejection]
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python -m offline.trade_sim fichero.csv [--sl N] [--tp N] [--max-seconds N] [--spread N] "
+              "[--point X] [--volume X] [--timeframe M5] [--no-rejection]")
+        sys.exit(1)
+
+    def get_option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    timeframe = get_option("--timeframe")
+    candles = open_bar_source(args[0], timeframe=timeframe)
+    bar_seconds = int(np.median(np.diff(candles.time[:1000]))) if len(candles) > 1 else 60
+    point = float(get_option("--point", POINT))
+
+    start = time.perf_counter()
+    signals, _, _ = compute_ultraconserv_signals(
+        candles.open, candles.high, candles.low, candles.close,
+        stats=load_wick_stats(default=ULTRACONSERV_STATS), require_rejection="--no-rejection" not in args)
+    trades = simulate_trades(
+        signals, candles.time, candles.open, candles.high, candles.low, candles.close,
+        sl_pips=float(get_option("--sl", SL_PIPS)), tp_pips=float(get_option("--tp", TP_PIPS)),
+        max_seconds=float(get_option("--max-seconds", MAX_SECONDS)), point=point,
+        spread_pips=float(get_option("--spread", 0)), bar_seconds=bar_seconds)
+    summary = summarize_trades(trades, volume=float(get_option("--volume", 1.0)), point=point)
+    print(f"⏱️ {len(candles)} velas en {time.perf_counter() - start:.2f} s")
+    print_trade_summary(summary)
@@ -0,0 +1,237 @@
+"""
+Walk-forward de la estrategia ULTRACONSERV.
+Divide el histórico en ventanas móviles de entrenamiento / prueba por meses.
+En cada ventana de entrenamiento recalcula la tabla de mechas y elige los
+umbrales (la rejilla de sweep.py); después puntúa esa configuración en la
+ventana de prueba siguiente, que no ha visto. Las ventanas se reparten
+entre procesos que comparten el mismo .candles (np.memmap de solo lectura)
+y los resultados se muestran según van terminando.
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from offline.backtest import compute_ultraconserv_signals, evaluate_trades, get_directions
+from offline.candle_stick import ULTRACONSERV_STATS, MIN_BODY, MIN_STAT_CONF
+from offline.candle_store import open_bar_source, StoreBarSource
+from offline.stats_miner import count_next_outcomes, get_wick_stats
+from offline.sweep import PARAM_GRID, get_combinations
+from bot_console.pattern_stats import load_wick_stats
+
+# Configuración actual de CandleStickOffline (referencia fuera de muestra)
+BASELINE_PARAMS = {
+    "min_body": MIN_BODY,
+    "min_stat_conf": MIN_STAT_CONF,
+    "require_trend": True,
+    "require_prev": True,
+    "require_rejection": True,
+}
+
+# Datos del proceso (los prepara init_worker una vez por proceso)
+_worker = {}
+
+
+def get_windows(times, train_months=12, test_months=3):
+    """
+    Ventanas por meses naturales: entrenamiento de train_months y prueba de
+    los test_months siguientes, avanzando test_months cada vez.
+
+    :return: lista de (train_start, train_end, test_end) como índices de vela
+    """
+    if len(times) == 0:
+        return []
+    months = np.asarray(times, dtype="int64").astype("datetime64[s]").astype("datetime64[M]")
+    first, last = months[0], months[-1]
+    num_months = int((last - first).astype(int)) + 1
+    month_starts = first + np.arange(num_months + 1)
+    bounds = np.searchsorted(months, month_starts)  # índice de la primera vela de cada mes
+
+    windows = []
+    start = 0
+    while start + train_months < num_months:
+        train_end = start + train_months
+        test_end = min(train_end + test_months, num_months)
+        windows.append((int(bounds[start]), int(bounds[train_end]), int(bounds[test_end])))
+        start += test_months
+    return windows
+
+
+def init_worker(source, combinations, baseline_stats, min_trades):
+    if isinstance(source, str):
+        candles = StoreBarSource(source)
+        source = (candles.time, candles.open, candles.high, candles.low, candles.close)
+    _worker["bars"] = source
+    _worker["combinations"] = combinations
+    _worker["baseline_stats"] = baseline_stats
+    _worker["min_trades"] = min_trades
+
+
+def score(prices, stats, params):
+    """Resultado de las operaciones de una configuración en un tramo de velas"""
+    open_, high, low, close = prices
+    signals, _, _ = compute_ultraconserv_signals(open_, high, low, close, stats=stats, **params)
+    return evaluate_trades(signals, get_directions(open_, close))
+
+
+def run_window(window):
+    """
+    Entrena y prueba una ventana (se ejecuta en el proceso).
+    La prueba empieza una vela antes para que la primera vela de prueba
+    tenga penúltima; esa vela previa es INIT y no opera.
+    """
+    index, (train_start, train_end, test_end) = window
+    times, open_, high, low, close = _worker["bars"]
+    train = slice(train_start, train_end)
+    test = slice(max(train_end - 1, 0), test_end)
+    train_prices = (open_[train], high[train], low[train], close[train])
+    test_prices = (open_[test], high[test], low[test], close[test])
+
+    # 1. Tabla de mechas con las velas de entrenamiento
+    wick_counts, _, _ = count_next_outcomes(*train_prices, patterns=False)
+    stats = get_wick_stats(wick_counts)
+
+    # 2. Mejores umbrales en entrenamiento
+    best_params, best_train = None, None
+    for params in _worker["combinations"]:
+        result = score(train_prices, stats, params)
+        if result["num_trades"] < _worker["min_trades"]:
+            continue
+        if best_train is None or (result["win_rate"], result["num_trades"]) > (best_train["win_rate"], best_train["num_trades"]):
+            best_params, best_train = params, result
+
+    # 3. Prueba fuera de muestra (y la configuración actual como referencia)
+    test_result = score(test_prices, stats, best_params) if best_params else None
+    baseline = score(test_prices, _worker["baseline_stats"], BASELINE_PARAMS)
+
+    return {
+        "window": index,
+        "train_from": bar_date(times[train_start]),
+        "test_from": bar_date(times[train_end]),
+        "test_to": bar_date(times[test_end - 1]),
+        "params": best_params,
+        "stats": {counts["id"]: [counts["LONG"], counts["SHORT"], counts["NEUTRAL"]] for counts in stats.values()},
+        "train": best_train,
+        "test": test_result,
+        "baseline": baseline,
+    }
+
+
+def bar_date(epoch):
+    return str(np.datetime64(int(epoch), "s").astype("datetime64[D]"))
+
+
+def run_walk_forward(path, train_months=12, test_months=3, grid=PARAM_GRID, workers=None,
+                     min_trades=30, output=None, timeframe=None):
+    """
+    Walk-forward completo sobre un fichero de velas.
+
+    :param output: fichero JSONL donde se añade cada ventana al terminar
+    :param timeframe: timeframe al que se remuestrean las velas M1 ("5", "M15", "H1"...)
+    :return: resultados de las ventanas ordenados por fecha
+    """
+    candles = open_bar_source(path, build_store=True, timeframe=timeframe)
+    windows = get_windows(candles.time, train_months, test_months)
+    if not windows:
+        print("⚠️ No hay velas suficientes para una ventana de entrenamiento y otra de prueba")
+        return []
+
+    if isinstance(candles, StoreBarSource):
+        source = candles.store.path  # los procesos solo reciben la ruta
+    else:
+        source = (candles.time, candles.open, candles.high, candles.low, candles.close)
+    combinations = get_combinations(grid)
+    baseline_stats = load_wick_stats(default=ULTRACONSERV_STATS)
+    workers = min(workers or os.cpu_count() or 1, len(windows))
+    print(f"🚶 Walk-forward: {len(windows)} ventanas ({train_months} meses / {test_months} meses), "
+          f"{len(combinations)} combinaciones, {workers} procesos")
+
+    start = time.perf_counter()
+    results = []
+    initargs = (source, combinations, baseline_stats, min_trades)
+    out = open(output, "a", encoding="utf-8") if output else None
+    executor = None
+    try:
+        if workers == 1:
+            init_worker(*initargs)
+            finished = (run_window(window) for window in enumerate(windows))
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs)
+            futures = [executor.submit(run_window, window) for window in enumerate(windows)]
+            finished = (future.result() for future in as_completed(futures))
+
+        for result in finished:
+            results.append(result)
+            print_window(result)
+            if out:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+    finally:
+        if out:
+            out.close()
+        # El pool puede no haberse creado si falla antes (p. ej. al arrancar los procesos)
+        if executor is not None:
+            executor.shutdown()
+
+    results.sort(key=lambda r: r["window"])
+    print(f"⏱️ {time.perf_counter() - start:.1f} s")
+    print_summary(results)
+    return results
+
+
+def print_window(result):
+    test, baseline = result["test"], result["baseline"]
+    if result["params"] is None:
+        tuned = "sin configuración con operaciones suficientes"
+    else:
+        p = result["params"]
+        tuned = (f"body={p['min_body']:.5f} conf={p['min_stat_conf']:.2f} trend={p['require_trend']} "
+                 f"prev={p['require_prev']} rech={p['require_rejection']} | "
+                 f"train {result['train']['win_rate'] * 100:.1f}% ({result['train']['num_trades']} ops) → "
+                 f"test {test['win_rate'] * 100:.1f}% ({test['num_trades']} ops)")
+    print(f"#{result['window']:>3} {result['test_from']}..{result['test_to']} | {tuned} | "
+          f"actual {baseline['win_rate'] * 100:.1f}% ({baseline['num_trades']} ops)")
+
+
+def sum_trades(results):
+    trades = sum(r["num_trades"] for r in results)
+    wins = sum(r["num_wins"] for r in results)
+    return trades, wins, (wins / trades if trades else 0.0)
+
+
+def print_summary(results):
+    """Totales dentro de muestra, fuera de muestra y de la configuración actual"""
+    in_sample = sum_trades([r["train"] for r in results if r["train"]])
+    out_sample = sum_trades([r["test"] for r in results if r["test"]])
+    baseline = sum_trades([r["baseline"] for r in results])
+    print("================== WALK-FORWARD ========================")
+    print(f"Entrenamiento (optimizado):  {in_sample[0]} ops, {in_sample[2] * 100:.2f}% ganadas")
+    print(f"Prueba (fuera de muestra):   {out_sample[0]} ops, {out_sample[2] * 100:.2f}% ganadas")
+    print(f"Configuración actual:        {baseline[0]} ops, {baseline[2] * 100:.2f}% ganadas")
+    print("=======================================================")
+
+
+if __name__ == "__main__":
+    # Uso: python -m offline.walk_forward fichero.csv [--train N] [--test N] [--workers N] [--min-trades N] [--jsonl salida.jsonl] [--timeframe M5]
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python -m offline.walk_forward fichero.csv [--train N] [--test N] [--workers N] "
+              "[--min-trades N] [--jsonl salida.jsonl] [--timeframe M5]")
+        sys.exit(1)
+
+    def get_option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    run_walk_forward(
+        args[0],
+        train_months=int(get_option("--train", 12)),
+        test_months=int(get_option("--test", 3)),
+        workers=int(get_option("--workers", 0)) or None,
+        min_trades=int(get_option("--min-trades", 30)),
+        output=get_option("--jsonl"),
+        timeframe=get_option("--timeframe"),
+    )
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Los tests importan bot_console y offline desde la raíz del repositorio (como main.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_console.bar_source import MemoryBarSource  # noqa: E402
+
+START = 1_700_000_000  # múltiplo de 60 y de 300 (velas M1 y M5 alineadas)
+
+
+def random_bars(n=3000, seed=1, bar_seconds=60, wick_probability=0.7):
+    """
+    Velas M1 sintéticas (paseo aleatorio) redondeadas a 5 decimales: hay
+    velas sin mecha, dojis y empates como en los históricos reales.
+    """
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 2e-4, n))
+    open_ = np.r_[1.1, close[:-1]]
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 1.5e-4, n)) * (rng.random(n) < wick_probability)
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 1.5e-4, n)) * (rng.random(n) < wick_probability)
+    time = START + bar_seconds * np.arange(n, dtype=np.int64)
+    volume = rng.integers(1, 100, n)
+    return MemoryBarSource(time, np.round(open_, 5), np.round(high, 5), np.round(low, 5), np.round(close, 5), volume)
+
+
+@pytest.fixture
+def bars():
+    return random_bars()
+
+
+@pytest.fixture
+def make_bars():
+    return random_bars
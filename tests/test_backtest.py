@@ -0,0 +1,56 @@
+from bot_console.bar_source import CandleCursor
+from bot_console.timeframe import TimeframeContext
+from offline.backtest import CandleStickBacktest
+from offline.candle_stick import CandleStickOffline, ULTRACONSERV_STATS
+
+# Tabla con señales claras en tres configuraciones (la incluida casi no opera con datos aleatorios)
+ACTIVE_STATS = {
+    (True, True): {"LONG": 5, "SHORT": 1, "NEUTRAL": 1, "id": "P11"},
+    (True, False): {"LONG": 1, "SHORT": 9, "NEUTRAL": 0, "id": "P10"},
+    (False, True): {"LONG": 9, "SHORT": 1, "NEUTRAL": 0, "id": "P01"},
+    (False, False): {"LONG": 1, "SHORT": 1, "NEUTRAL": 9, "id": "P00"},
+}
+
+
+def run_loop(source, stats, context_timeframes=()):
+    """Señal y motivo vela a vela con la estrategia (como mainoff con OFFLINE_ENGINE=loop)"""
+    context = TimeframeContext(context_timeframes) if context_timeframes else None
+    strategy = CandleStickOffline(cursor=CandleCursor(source), stats=stats, context=context)
+    signals, reasons = [], []
+    while True:
+        signal, reason = strategy.get_signal_for_new_candle()
+        if reason == "END":
+            return signals, reasons
+        signals.append(signal)
+        reasons.append(reason)
+
+
+def test_vectorized_matches_loop(bars):
+    for stats in (ULTRACONSERV_STATS, ACTIVE_STATS):
+        signals, reasons = run_loop(bars, stats)
+        backtest = CandleStickBacktest(candles=bars, stats=stats)
+        backtest.run()
+
+        assert list(backtest.get_signal_names()) == signals
+        assert list(backtest.get_reason_codes()) == reasons
+
+
+def test_vectorized_matches_loop_with_context(bars):
+    signals, reasons = run_loop(bars, ACTIVE_STATS, context_timeframes=("5", "15"))
+    backtest = CandleStickBacktest(candles=bars, stats=ACTIVE_STATS, context_timeframes=("5", "15"))
+    backtest.run()
+
+    assert list(backtest.get_signal_names()) == signals
+    assert list(backtest.get_reason_codes()) == reasons
+    assert any(reason.endswith("HTFTREND") for reason in reasons)
+
+
+def test_loop_starts_with_init(bars):
+    _, reasons = run_loop(bars, ACTIVE_STATS)
+    assert reasons[0] == "INIT"
+    assert "INIT" not in reasons[1:]
+
+
+def test_active_stats_trade(bars):
+    signals, _ = run_loop(bars, ACTIVE_STATS)
+    assert {"LONG", "SHORT"} <= set(signals)
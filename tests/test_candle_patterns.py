@@ -0,0 +1,47 @@
+import numpy as np
+
+from bot_console.bar_features import BarFeatures
+from bot_console.candle_patterns import CandlePatterns1M, PATTERN_INDEX, PATTERN_NAMES, count_patterns, scan_patterns
+from bot_console.pattern_stream import WINDOW_PATTERNS, PatternStream, SWING_TRIPLE_TOP, SWING_TRIPLE_BOTTOM
+
+
+def scan(source):
+    return scan_patterns(source.open, source.high, source.low, source.close)
+
+
+def test_scan_matches_scalar_detectors(bars):
+    matrix = scan(bars)
+    detector = CandlePatterns1M()
+    features = [BarFeatures.from_bar(bars.get_bar(i)) for i in range(len(bars))]
+
+    for name, required, detect in WINDOW_PATTERNS:
+        column = PATTERN_INDEX[name]
+        size = len(required)
+        for i in range(len(bars)):
+            expected = i + 1 >= size and bool(detect(detector, features[max(i - 2, 0):i + 1]))
+            assert matrix[i, column] == expected, (name, i)
+
+
+def test_scan_matches_stream(make_bars):
+    source = make_bars(n=5000, seed=7)
+    matrix = scan(source)
+    stream = PatternStream()
+    for i in range(len(source)):
+        found = set(stream.push(source.get_bar(i)))
+        assert found == {PATTERN_NAMES[j] for j in np.flatnonzero(matrix[i])}, i
+
+
+def test_swing_triples_are_selective(bars):
+    # Solo pueden aparecer en las velas que confirman un máximo / mínimo local
+    counts = count_patterns(scan(bars))
+    assert 0 < counts[SWING_TRIPLE_TOP] < len(bars) / 3
+    assert 0 < counts[SWING_TRIPLE_BOTTOM] < len(bars) / 3
+
+
+def test_swing_triple_top_on_known_series():
+    #            máximo      máximo      máximo
+    high = [1.0, 1.2, 1.0, 1.0, 1.2, 1.0, 1.0, 1.2, 1.0]
+    low = [0.9] * len(high)
+    matrix = scan_patterns(low, high, low, low)
+    # El tercer máximo (vela 7) se confirma al cerrar la vela 8
+    assert list(np.flatnonzero(matrix[:, PATTERN_INDEX[SWING_TRIPLE_TOP]])) == [8]
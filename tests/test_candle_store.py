@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+
+from offline.candle_store import (
+    PRICE_FLOAT64, PRICE_INT32, StoreBarSource, get_store_path, open_bar_source, write_store,
+)
+
+
+@pytest.mark.parametrize("price_kind", [PRICE_FLOAT64, PRICE_INT32])
+def test_round_trip(tmp_path, bars, price_kind):
+    path = write_store(bars, str(tmp_path / "bars.candles"), price_kind=price_kind, digits=5)
+    store = StoreBarSource(path)
+
+    assert len(store) == len(bars)
+    assert np.array_equal(store.time, bars.time)
+    assert np.array_equal(store.volume, bars.volume)
+    for name in ("open", "high", "low", "close"):
+        # Con int32 los precios a 5 decimales se recuperan exactos tras el reescalado
+        np.testing.assert_allclose(getattr(store, name), getattr(bars, name), rtol=0, atol=1e-12)
+    assert os.listdir(tmp_path) == ["bars.candles"]  # sin temporales
+
+
+def test_empty_store(tmp_path, bars):
+    empty = type(bars)(*(np.empty(0),) * 5)
+    store = StoreBarSource(write_store(empty, str(tmp_path / "empty.candles")))
+    assert len(store) == 0
+
+
+def test_csv_store_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv("CANDLE_STORE", raising=False)
+    csv_path = tmp_path / "chart.csv"
+    csv_path.write_text(
+        "Date,Open,High,Low,Close,Volume\n"
+        "2024-01-02 00:00:00,1.10000,1.10020,1.09990,1.10010,5\n"
+        "2024-01-02 00:01:00,1.10010,1.10030,1.10000,1.10005,7\n",
+        encoding="utf-8")
+
+    source = open_bar_source(str(csv_path))
+    assert not os.path.exists(get_store_path(str(csv_path)))
+
+    stored = open_bar_source(str(csv_path), build_store=True)
+    assert isinstance(stored, StoreBarSource)
+    assert np.array_equal(stored.close, source.close)
@@ -0,0 +1,81 @@
+from bot_console.exit_engine import ExitEngine, EXIT_SL, EXIT_TP, EXIT_TRAILING, EXIT_TIME
+
+CONTRACT_SIZE = 100000
+
+
+class Order:
+    """Orden mínima con los campos que usa ExitEngine"""
+
+    def __init__(self, order_type="long", price_open=1.1000, sl=1.0990, tp=1.1020, volume=1.0):
+        self.symbol = "EURUSD"
+        self.type = order_type
+        self.price_open = price_open
+        self.volume = volume
+        self.sl = sl
+        self.tp = tp
+        self.profit = 0.0
+
+
+def watch(order, **options):
+    engine = ExitEngine(**options)
+    engine.add(order, CONTRACT_SIZE, open_time=0.0)
+    return engine
+
+
+def feed(engine, quotes, spread=0.0001):
+    """Pasa ticks (segundo, bid) hasta el primer cierre: (segundo, motivo) o None"""
+    for tick_time, bid in quotes:
+        exits = engine.on_tick("EURUSD", tick_time, bid, bid + spread)
+        if exits:
+            return tick_time, exits[0][1]
+    return None
+
+
+def test_long_stop_loss_updates_profit():
+    order = Order()
+    engine = watch(order)
+    assert feed(engine, [(1, 1.0995), (2, 1.0990)]) == (2, EXIT_SL)
+    # El beneficio es el del tick de salida (al bid) y la posición deja de vigilarse
+    assert round(order.profit, 2) == -100.0
+    assert not engine.has_positions()
+
+
+def test_long_take_profit():
+    engine = watch(Order())
+    assert feed(engine, [(1, 1.1010), (2, 1.1020)]) == (2, EXIT_TP)
+
+
+def test_short_exits_at_ask():
+    order = Order("short", price_open=1.1000, sl=1.1010, tp=1.0980)
+    # ask = bid + spread: el SL salta con el ask aunque el bid no lo toque
+    assert feed(watch(order), [(1, 1.1005), (2, 1.1009)]) == (2, EXIT_SL)
+    assert feed(watch(Order("short", sl=1.1010, tp=1.0980)), [(1, 1.0979)]) == (1, EXIT_TP)
+
+
+def test_trailing_after_min_ticks():
+    engine = watch(Order(sl=0, tp=0), trailing_drop=0.10, min_trailing_ticks=4)
+    quotes = [(1, 1.1002), (2, 1.1004), (3, 1.1006), (4, 1.1010), (5, 1.10095), (6, 1.1008)]
+    # Máximo 100 USD; con 80 USD ya ha perdido más del 10%
+    assert feed(engine, quotes) == (6, EXIT_TRAILING)
+
+
+def test_no_trailing_before_min_ticks():
+    engine = watch(Order(sl=0, tp=0), trailing_drop=0.10, min_trailing_ticks=4)
+    assert feed(engine, [(1, 1.1010), (2, 1.1001)]) is None
+
+
+def test_time_exit_on_tick_and_on_clock():
+    engine = watch(Order(sl=0, tp=0), max_seconds=49)
+    assert feed(engine, [(10, 1.1000), (49, 1.1000)]) == (49, EXIT_TIME)
+
+    engine = watch(Order(sl=0, tp=0), max_seconds=49)
+    assert engine.on_clock("EURUSD", 48.9) == []
+    exits = engine.on_clock("EURUSD", 49.0)
+    assert [reason for _, reason in exits] == [EXIT_TIME]
+    assert not engine.has_positions("EURUSD")
+
+
+def test_open_time_from_first_tick():
+    engine = ExitEngine(max_seconds=10)
+    engine.add(Order(sl=0, tp=0), CONTRACT_SIZE)
+    assert feed(engine, [(100, 1.1000), (109, 1.1000), (110, 1.1000)]) == (110, EXIT_TIME)
@@ -0,0 +1,92 @@
+import json
+import time
+
+import pytest
+
+from bot_console.logger import DEBUG, INFO
+from bot_console.resumes import ResumeJsonL
+
+
+@pytest.fixture
+def make_resume(tmp_path):
+    created = []
+
+    def make(**options):
+        resume = ResumeJsonL("test", **options)
+        resume.log_path = str(tmp_path / "test.jsonl")  # el directorio resumes/ del paquete no se toca
+        created.append(resume)
+        return resume
+
+    yield make
+    for resume in created:
+        resume.close()
+
+
+def read_lines(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+    except FileNotFoundError:
+        return []
+
+
+def test_close_writes_everything_in_order(make_resume):
+    resume = make_resume(buffer_size=1000, flush_interval=60)
+    for i in range(200):
+        resume.info("registro %d", i)
+    resume.close()
+
+    lines = read_lines(resume.log_path)
+    assert [line["message"] for line in lines] == [f"registro {i}" for i in range(200)]
+    assert all("_time" in line for line in lines)
+
+
+def test_flush_interval_without_close(make_resume):
+    resume = make_resume(buffer_size=1000, flush_interval=0.05)
+    resume.log({"message": "hola", "type": "info"})
+
+    deadline = time.monotonic() + 5
+    while not read_lines(resume.log_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert read_lines(resume.log_path)[0]["message"] == "hola"
+
+
+def test_caller_dict_is_not_modified(make_resume):
+    resume = make_resume()
+    data = {"message": "fijo", "type": "info"}
+    resume.log(data)
+    resume.close()
+    assert data == {"message": "fijo", "type": "info"}
+
+
+def test_format_error_keeps_writer_alive(make_resume):
+    resume = make_resume()
+    resume.info("dos valores %s %s", 1)
+    resume.info("después")
+    resume.close()
+
+    first, second = read_lines(resume.log_path)
+    assert "format_error" in first
+    assert second["message"] == "después"
+
+
+def test_level_and_blocked(make_resume):
+    resume = make_resume(level=INFO)
+    resume.debug("no se guarda")
+    resume.info("sí")
+    resume.close()
+    assert [line["message"] for line in read_lines(resume.log_path)] == ["sí"]
+
+    blocked = make_resume(blockMessages=True)
+    blocked.log({"message": "nada"})
+    assert not blocked.is_enabled(DEBUG)
+    assert blocked.thread is None
+
+
+def test_close_is_idempotent_and_later_logs_are_ignored(make_resume):
+    resume = make_resume()
+    resume.info("uno")
+    resume.close()
+    resume.close()
+    resume.info("tarde")
+    assert [line["message"] for line in read_lines(resume.log_path)] == ["uno"]
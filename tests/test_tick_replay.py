@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from bot_console.exit_engine import EXIT_SL, EXIT_TP, EXIT_TIME
+from offline.trade_sim import EXIT_CODES
+from offline.tick_replay import TickReplay
+
+START = 1.7e9
+
+
+def gap_ticks():
+    """4 ticks planos con un hueco de 199 s entre el segundo y el tercero"""
+    times = START + np.array([0.0, 1.0, 200.0, 201.0])
+    bids = np.full(4, 1.1)
+    return times, bids, bids + 0.0001
+
+
+@pytest.mark.parametrize("max_seconds", [49, 49.3, 30.7])
+def test_time_exit_inside_gap(max_seconds):
+    # Con max_seconds fraccionario el vencimiento no debe quedarse en bucle
+    times, bids, asks = gap_ticks()
+    trades = TickReplay(times, bids, asks, max_seconds=max_seconds).run([START + 0.2], [1])
+
+    # Vence sin ticks: se cierra en el segundo exacto del vencimiento
+    assert trades["exit_code"][0] == EXIT_CODES[EXIT_TIME]
+    assert trades["exit_time"][0] == pytest.approx(START + 0.2 + max_seconds)
+    assert trades["exit_index"][0] == 1
+
+
+def test_time_exit_after_last_tick():
+    times, bids, asks = gap_ticks()
+    trades = TickReplay(times, bids, asks, max_seconds=60.5).run([START + 200.5], [-1])
+
+    assert trades["exit_code"][0] == EXIT_CODES[EXIT_TIME]
+    assert trades["exit_time"][0] == pytest.approx(START + 261.0)
+    assert trades["exit_index"][0] == 3
+
+
+def test_sl_and_tp_on_ticks():
+    times = START + np.arange(5, dtype=np.float64)
+    bids = np.array([1.1000, 1.1000, 1.1010, 1.0980, 1.0980])
+    asks = bids + 0.0001
+    replay = TickReplay(times, bids, asks, sl_pips=10, tp_pips=5, point=0.0001, max_seconds=100)
+    trades = replay.run([START + 0.5, START + 0.5], [1, -1])
+
+    # El corto pierde con la subida (SL) y el largo gana (TP) en el mismo tick
+    codes = {int(d): int(c) for d, c in zip(trades["direction"], trades["exit_code"])}
+    assert codes[1] == EXIT_CODES[EXIT_TP]
+    assert codes[-1] == EXIT_CODES[EXIT_SL]
+    assert (trades["exit_index"] == 2).all()
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from bot_console.bar_source import MemoryBarSource
+from bot_console.timeframe import (
+    BarResampler, TimeframeContext, get_context_trend, get_timeframe_name, get_timeframe_seconds, resample_columns,
+)
+
+
+def with_gaps(source, seed=3):
+    """Quita ~5% de las velas (huecos del histórico) y pone una a precio 0 (dato inválido)"""
+    keep = np.random.default_rng(seed).random(len(source)) > 0.05
+    columns = [np.array(getattr(source, name))[keep] for name in ("time", "open", "high", "low", "close", "volume")]
+    columns[1][10] = 0.0
+    return MemoryBarSource(*columns)
+
+
+def columns(source):
+    return source.time, source.open, source.high, source.low, source.close, source.volume
+
+
+@pytest.mark.parametrize("timeframe", ["5", "M15", "H1"])
+def test_incremental_resampler_matches_vectorized(bars, timeframe):
+    source = with_gaps(bars)
+    resampler = BarResampler(timeframe)
+    closed = []
+    for i in range(len(source)):
+        closed.extend(resampler.push(source.get_bar(i)))
+
+    expected = list(zip(*resample_columns(*columns(source), seconds=get_timeframe_seconds(timeframe))))
+    # La última vela superior sigue abierta si no ha llegado su última vela M1
+    if resampler.current is not None:
+        expected = expected[:-1]
+    assert [tuple(bar) for bar in closed] == [tuple(row) for row in expected]
+
+
+@pytest.mark.parametrize("timeframe", ["5", "15"])
+def test_context_trend_matches_streaming_context(bars, timeframe):
+    source = with_gaps(bars)
+    trend = get_context_trend(source.time, source.open, source.high, source.low, source.close, timeframe)
+    context = TimeframeContext([timeframe], depth=2)
+    for i in range(len(source)):
+        context.push(source.get_bar(i))
+        assert context.get_trend(timeframe) == trend[i], i
+
+
+def test_timeframe_names():
+    assert get_timeframe_name("5") == get_timeframe_name("M5") == "M5"
+    assert get_timeframe_seconds("H1") == 3600
+    with pytest.raises(ValueError):
+        get_timeframe_name("M7")
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from offline.backtest import DIR_LONG, DIR_NONE, DIR_SHORT
+from offline.trade_sim import EXIT_CODE_SL, EXIT_CODE_TIME, EXIT_CODE_TP, simulate_trades, summarize_trades
+
+POINT = 0.0001
+START = 1_700_000_000
+
+
+def simulate(signals, opens, highs, lows, closes, times=None, **options):
+    times = START + 60 * np.arange(len(opens)) if times is None else np.asarray(times)
+    options = {"sl_pips": 10, "tp_pips": 20, "max_seconds": 150, "point": POINT, **options}
+    return simulate_trades(np.array(signals, dtype=np.int8), times, opens, highs, lows, closes, **options)
+
+
+def flat(n, price=1.1000):
+    return [price] * n
+
+
+def test_take_profit_then_stop_loss_order():
+    # Largo desde 1.1000: TP (1.1020) en la 2ª vela, antes que el SL
+    trades = simulate([DIR_LONG, DIR_NONE, DIR_NONE, DIR_NONE], flat(4),
+                      [1.1005, 1.1005, 1.1020, 1.1000], [1.0995, 1.0995, 1.0995, 1.0980], flat(4))
+    assert trades["exit_code"].tolist() == [EXIT_CODE_TP]
+    assert trades["exit_index"].tolist() == [2]
+    assert trades["pnl_pips"] == pytest.approx([20.0])
+
+
+def test_same_bar_counts_stop_loss():
+    trades = simulate([DIR_LONG, DIR_NONE, DIR_NONE], flat(3), [1.1000, 1.1030, 1.1000],
+                      [1.1000, 1.0980, 1.1000], flat(3))
+    assert trades["exit_code"].tolist() == [EXIT_CODE_SL]
+    assert trades["pnl_pips"] == pytest.approx([-10.0])
+
+
+def test_time_exit_at_close_of_last_bar_in_time():
+    closes = [1.1000, 1.1001, 1.1002, 1.1003, 1.1004]
+    # max_seconds=150: cuentan la vela de entrada y las dos siguientes (empiezan a 60 y 120 s)
+    trades = simulate([DIR_SHORT, DIR_NONE, DIR_NONE, DIR_NONE, DIR_NONE], flat(5), flat(5), flat(5), closes)
+    assert trades["exit_code"].tolist() == [EXIT_CODE_TIME]
+    assert trades["exit_index"].tolist() == [3]
+    assert trades["pnl_pips"] == pytest.approx([-3.0])
+
+
+def test_gap_shortens_the_window():
+    times = START + np.array([0, 60, 180, 240])  # falta la vela de 120 s
+    trades = simulate([DIR_LONG, DIR_NONE, DIR_NONE, DIR_NONE], flat(4), flat(4), flat(4),
+                      [1.1000, 1.1001, 1.1002, 1.1003], times=times, max_seconds=100)
+    assert trades["exit_index"].tolist() == [1]
+
+
+def test_short_pays_the_spread():
+    trades = simulate([DIR_SHORT, DIR_NONE, DIR_NONE], flat(3), flat(3), flat(3), flat(3), spread_pips=2)
+    assert trades["exit_price"] == pytest.approx([1.1002])
+    assert trades["pnl_pips"] == pytest.approx([-2.0])
+
+
+def test_zero_price_bars_are_skipped():
+    opens = [1.1, 1.1, 0.0, 1.1]
+    trades = simulate([DIR_LONG, DIR_NONE, DIR_NONE, DIR_NONE], opens, opens, opens, opens)
+    assert trades["num_skipped"] == 1
+    assert len(trades["pnl_pips"]) == 0
+    assert summarize_trades(trades)["num_trades"] == 0
+
+
+def reference(signals, source, sl_pips, tp_pips, max_seconds):
+    """Operación a operación, vela a vela (mismas reglas que simulate_trades)"""
+    codes, pnl = [], []
+    for i in np.flatnonzero(signals[:-1] != DIR_NONE):
+        entry = i + 1
+        sign = float(signals[i])
+        price = source.open[entry]
+        sl, tp = price - sign * sl_pips * POINT, price + sign * tp_pips * POINT
+        code, exit_price = EXIT_CODE_TIME, None
+        j = entry
+        while j < len(source) and (j == entry or source.time[j] - source.time[entry] < max_seconds):
+            worst, best = (source.low[j], source.high[j]) if sign > 0 else (source.high[j], source.low[j])
+            if (worst - sl) * sign <= 0:
+                code, exit_price = EXIT_CODE_SL, sl
+                break
+            if (best - tp) * sign >= 0:
+                code, exit_price = EXIT_CODE_TP, tp
+                break
+            j += 1
+        if exit_price is None:
+            exit_price = source.close[j - 1]
+        codes.append(code)
+        pnl.append((exit_price - price) * sign / POINT)
+    return codes, pnl
+
+
+def test_matches_reference_loop(bars):
+    signals = np.random.default_rng(5).choice([DIR_SHORT, DIR_NONE, DIR_LONG], len(bars)).astype(np.int8)
+    options = {"sl_pips": 3, "tp_pips": 4, "max_seconds": 300}
+    trades = simulate(signals, bars.open, bars.high, bars.low, bars.close, times=bars.time, **options)
+    codes, pnl = reference(signals, bars, **options)
+
+    assert trades["exit_code"].tolist() == codes
+    np.testing.assert_allclose(trades["pnl_pips"], pnl, atol=1e-6)
+    assert set(codes) == {EXIT_CODE_SL, EXIT_CODE_TP, EXIT_CODE_TIME}